@@ -0,0 +1,173 @@
+"""
+按榜单变动自适应的轮询间隔：间隔任务开启“自适应”后，每个渠道各有一个有效间隔，
+每次抓取后按该渠道榜单相对本任务上一次看到的榜单的变动率（rank_delta.churn_between：
+新上榜占比 + 其余条目的顺序颠倒比例）调整。只对比本任务自己的上一次，其他任务或手动抓取同一渠道不影响：
+
+    新间隔 = 间隔 × sqrt(目标变动率 / 本次变动率)，单次最多缩短一半或延长一倍，并限制在任务的上下限内
+
+变动剧烈（突发新闻）时轮询加快，榜单几乎不动（深夜）时放慢；抓取失败或没有变动率时间隔不变。
+各渠道的有效间隔、最近变动率、上一次榜单与下一次时间保存在 adaptive_poll.json，重启后继续使用。
+"""
+import os
+import json
+import math
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from history_store import normalize_title
+from rank_delta import churn_between
+
+ADAPTIVE_POLL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "adaptive_poll.json")
+
+# 每次轮询期望看到的榜单变动率
+TARGET_CHURN = 0.1
+# 单次调整的倍数范围
+MIN_STEP = 0.5
+MAX_STEP = 2.0
+# 变动率为 0 时按这个值计算（即按 MAX_STEP 放慢）
+_CHURN_EPS = 1e-3
+
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+POLL_INTERVAL = metrics.REGISTRY.register(metrics.Gauge(
+    "hot_poll_interval_seconds", "自适应轮询的当前有效间隔（秒）", ("task", "channel"),
+))
+BOARD_CHURN = metrics.REGISTRY.register(metrics.Gauge(
+    "hot_board_churn_ratio", "最近一次抓取的榜单变动率", ("task", "channel"),
+))
+
+
+def next_interval(interval_s: float, churn: Optional[float], bounds: Tuple[float, float], target: float = TARGET_CHURN) -> float:
+    """按本次变动率算出下一次间隔（限制在 bounds 内）；churn 为 None 时只做限制。"""
+    lo, hi = bounds
+    if churn is not None:
+        step = math.sqrt(target / max(churn, _CHURN_EPS))
+        interval_s *= min(max(step, MIN_STEP), MAX_STEP)
+    return min(max(interval_s, lo), hi)
+
+
+class PollController:
+    def __init__(self, path: str = ADAPTIVE_POLL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        # "任务/渠道" -> {"interval_s", "churn", "last_run", "next_run", "ranks": {归一化标题: 排名}}
+        self._state: Dict[str, Dict] = {}
+        self.load()
+
+    @staticmethod
+    def _key(task_id: str, channel: str) -> str:
+        return f"{task_id}/{channel}"
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self._state = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except Exception as e:
+            print(f"读取自适应轮询状态失败: {e}")
+
+    def _save(self) -> None:
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"保存自适应轮询状态失败: {e}")
+
+    def interval(self, task_id: str, channel: str, initial_s: float, bounds: Tuple[float, float]) -> float:
+        """该渠道当前的有效间隔；尚未调整过时为任务的初始间隔（都限制在 bounds 内）。"""
+        with self._lock:
+            st = self._state.get(self._key(task_id, channel)) or {}
+        return next_interval(float(st.get("interval_s") or initial_s), None, bounds)
+
+    def due(self, task_id: str, channels: List[str], now: Optional[datetime] = None) -> Dict[str, datetime]:
+        """各渠道下一次应运行的时间；从未运行过的渠道为 now。"""
+        now = now or datetime.now()
+        out: Dict[str, datetime] = {}
+        with self._lock:
+            for ch in channels:
+                st = self._state.get(self._key(task_id, ch)) or {}
+                try:
+                    out[ch] = datetime.strptime(st["next_run"], TIME_FMT)
+                except (KeyError, TypeError, ValueError):
+                    out[ch] = now
+        return out
+
+    def measure(self, task_id: str, channel: str, items: List[Dict]) -> Optional[float]:
+        """
+        本次完整榜单相对本任务该渠道上一次榜单的变动率，并记下本次榜单；
+        第一次（没有上一次榜单）返回 None。不完整或失败的抓取不要调用。
+        """
+        if not items:
+            return None
+        key = self._key(task_id, channel)
+        ranks = {normalize_title(it.get("title") or ""): it.get("rank") for it in items}
+        with self._lock:
+            st = self._state.setdefault(key, {})
+            prev = st.get("ranks")
+            st["ranks"] = ranks
+        return round(churn_between(prev, items), 4) if prev else None
+
+    def observe(
+        self,
+        task_id: str,
+        channel: str,
+        churn: Optional[float],
+        started_at: datetime,
+        initial_s: float,
+        bounds: Tuple[float, float],
+        jitter_s: float = 0.0,
+    ) -> float:
+        """记下一次抓取的变动率，调整该渠道的间隔并排定下一次时间（加 ±jitter_s 抖动）；返回新间隔。"""
+        key = self._key(task_id, channel)
+        with self._lock:
+            st = self._state.get(key) or {}
+            interval_s = next_interval(float(st.get("interval_s") or initial_s), churn, bounds)
+            jitter_s = min(max(0.0, jitter_s), interval_s / 2)
+            next_run = started_at + timedelta(seconds=interval_s + random.uniform(-jitter_s, jitter_s))
+            self._state[key] = {
+                "interval_s": round(interval_s, 1),
+                "churn": churn if churn is not None else st.get("churn"),
+                "last_run": started_at.strftime(TIME_FMT),
+                "next_run": next_run.strftime(TIME_FMT),
+                "ranks": st.get("ranks") or {},
+            }
+            self._save()
+        POLL_INTERVAL.set(interval_s, task=task_id, channel=channel)
+        if churn is not None:
+            BOARD_CHURN.set(churn, task=task_id, channel=channel)
+        return interval_s
+
+    def snapshot(self, task_id: str) -> Dict[str, Dict]:
+        """任务各渠道的状态 {渠道: {interval_s, churn, last_run, next_run, ranks}}。"""
+        prefix = f"{task_id}/"
+        with self._lock:
+            return {k[len(prefix):]: dict(v) for k, v in self._state.items() if k.startswith(prefix)}
+
+    def forget(self, task_id: str) -> None:
+        prefix = f"{task_id}/"
+        with self._lock:
+            keys = [k for k in self._state if k.startswith(prefix)]
+            for k in keys:
+                del self._state[k]
+            if keys:
+                self._save()
+
+
+_controller: Optional[PollController] = None
+_controller_lock = threading.Lock()
+
+
+def get_poll_controller() -> PollController:
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = PollController()
+        return _controller
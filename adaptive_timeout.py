@@ -0,0 +1,265 @@
+"""
+按实测延迟自适应的步骤超时。
+
+每个抓取步骤（浏览器启动、页面跳转、等待选择器、HTTP 请求、页面内请求）按
+渠道 × 抓取方式 × 步骤 × 代理 记录最近的耗时样本；样本足够时超时取
+“高分位耗时 × 倍数 + 余量”，并限制在该步骤的下限与上限之间，样本不足时沿用调用处给出的默认值。
+超时的步骤以当时的超时值作为样本记入（截尾样本），超时偏紧时分位数随之上升、超时自动放宽。
+
+策略可在 timeout_policy.json 中调整（不存在时使用下方默认值）：
+
+    {
+      "percentile": 0.95,
+      "margin_ratio": 1.5,
+      "margin_s": 0.5,
+      "min_samples": 10,
+      "steps": {
+        "goto": {"floor_s": 3, "ceiling_s": 45},
+        "*": {"floor_s": 2, "ceiling_s": 30}
+      }
+    }
+
+样本保存在 timeout_stats.json，重启后继续使用；当前超时见 hot_step_timeout_seconds 指标，
+也可运行 `python adaptive_timeout.py` 查看。
+"""
+import os
+import sys
+import json
+import math
+import time
+import threading
+from collections import deque
+from typing import List, Dict, Optional, Tuple
+
+import metrics
+from deadline import Deadline, unbounded
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TIMEOUT_POLICY_FILE = os.path.join(BASE_DIR, "timeout_policy.json")
+TIMEOUT_STATS_FILE = os.path.join(BASE_DIR, "timeout_stats.json")
+
+# 每个键保留的最近样本数
+MAX_SAMPLES = 200
+# 耗时达到超时的这个比例仍失败时，视为超时（记一个截尾样本）
+TIMED_OUT_RATIO = 0.9
+
+DEFAULT_POLICY: Dict = {
+    "percentile": 0.95,
+    "margin_ratio": 1.5,
+    "margin_s": 0.5,
+    "min_samples": 10,
+    "steps": {
+        "launch": {"floor_s": 5, "ceiling_s": 60},
+        "goto": {"floor_s": 3, "ceiling_s": 45},
+        "wait_for_selector": {"floor_s": 2, "ceiling_s": 30},
+        "request": {"floor_s": 2, "ceiling_s": 30},
+        "evaluate": {"floor_s": 2, "ceiling_s": 30},
+        "*": {"floor_s": 2, "ceiling_s": 30},
+    },
+}
+
+STEP_TIMEOUT = metrics.REGISTRY.register(metrics.Gauge(
+    "hot_step_timeout_seconds", "当前使用的步骤超时（秒）", ("channel", "method", "stage", "proxy"),
+))
+
+Key = Tuple[str, str, str, str]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    """最近秩法分位数。"""
+    ordered = sorted(samples)
+    idx = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class TimeoutBook:
+    def __init__(self, policy_path: str = TIMEOUT_POLICY_FILE, stats_path: str = TIMEOUT_STATS_FILE):
+        self.policy_path = policy_path
+        self.stats_path = stats_path
+        self.policy: Dict = json.loads(json.dumps(DEFAULT_POLICY))
+        self._samples: Dict[Key, deque] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        # 不为 None 时 record() 的样本同时追加到这里（进程池的工作进程据此把样本转给父进程）
+        self.journal: Optional[List[tuple]] = None
+        self.load()
+
+    def load(self) -> None:
+        if os.path.exists(self.policy_path):
+            try:
+                with open(self.policy_path, "r", encoding="utf-8") as f:
+                    cfg = json.load(f)
+                steps = cfg.pop("steps", None) or {}
+                self.policy.update({k: v for k, v in cfg.items() if k in DEFAULT_POLICY})
+                for step, limits in steps.items():
+                    self.policy["steps"].setdefault(step, {}).update(limits)
+            except Exception as e:
+                print(f"读取超时策略失败: {e}")
+        if os.path.exists(self.stats_path):
+            try:
+                with open(self.stats_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                with self._lock:
+                    for d in data:
+                        key = (d["channel"], d["method"], d["stage"], d.get("proxy") or "")
+                        self._samples[key] = deque((float(x) for x in d.get("samples") or []), maxlen=MAX_SAMPLES)
+            except Exception as e:
+                print(f"读取超时样本失败: {e}")
+
+    def save(self) -> None:
+        """有新样本时写回样本文件（原子替换）。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = [
+                {"channel": k[0], "method": k[1], "stage": k[2], "proxy": k[3], "samples": [round(x, 3) for x in v]}
+                for k, v in self._samples.items()
+            ]
+            self._dirty = False
+        try:
+            tmp = self.stats_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.stats_path)
+        except Exception as e:
+            print(f"保存超时样本失败: {e}")
+
+    def limits(self, step: str) -> Tuple[float, float]:
+        steps = self.policy["steps"]
+        lim = {**steps.get("*", {}), **steps.get(step, {})}
+        return float(lim.get("floor_s", 0.0)), float(lim.get("ceiling_s", float("inf")))
+
+    def learned(self, stage: str, samples: List[float]) -> Optional[float]:
+        """按分位数算出的超时（已限制在上下限之间）；样本不足时返回 None。"""
+        if len(samples) < int(self.policy["min_samples"]):
+            return None
+        p = _percentile(samples, float(self.policy["percentile"]))
+        floor_s, ceiling_s = self.limits(stage)
+        return min(max(p * float(self.policy["margin_ratio"]) + float(self.policy["margin_s"]), floor_s), ceiling_s)
+
+    def timeout_for(self, key: Key, default_s: float) -> float:
+        """该步骤当前应使用的超时（秒）：样本足够时按分位数计算，否则用默认值（同样限制在上下限之间）。"""
+        with self._lock:
+            samples = list(self._samples.get(key) or ())
+        value = self.learned(key[2], samples)
+        if value is None:
+            floor_s, ceiling_s = self.limits(key[2])
+            value = min(max(default_s, floor_s), ceiling_s)
+        STEP_TIMEOUT.set(value, channel=key[0], method=key[1], stage=key[2], proxy=key[3])
+        return value
+
+    def record(self, key: Key, seconds: float) -> None:
+        with self._lock:
+            q = self._samples.get(key)
+            if q is None:
+                q = self._samples[key] = deque(maxlen=MAX_SAMPLES)
+            q.append(seconds)
+            self._dirty = True
+            if self.journal is not None:
+                self.journal.append((key, seconds))
+
+    def snapshot(self) -> List[Dict]:
+        """各步骤的样本数、p50、高分位与学到的超时（样本不足、仍用默认值时为 None）。"""
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._samples.items())
+        rows = []
+        for key, samples in items:
+            learned = self.learned(key[2], samples)
+            rows.append({
+                "channel": key[0], "method": key[1], "stage": key[2], "proxy": key[3],
+                "samples": len(samples),
+                "p50_s": round(_percentile(samples, 0.5), 3) if samples else None,
+                "p_high_s": round(_percentile(samples, float(self.policy["percentile"])), 3) if samples else None,
+                "timeout_s": round(learned, 3) if learned is not None else None,
+            })
+        return rows
+
+
+class StepTimer:
+    """
+    一个带自适应超时的抓取步骤。构造时确定超时（并受 deadline 剩余预算约束，预算用完时抛出
+    DeadlineExceeded）；作为上下文管理器记录耗时与 metrics 阶段：成功时记入耗时样本，
+    超时失败时记入截尾样本（被剩余预算截短的超时不记），其他失败不记。
+    """
+
+    def __init__(
+        self,
+        book: TimeoutBook,
+        channel: str,
+        method: str,
+        stage: str,
+        proxy: str,
+        default_s: float,
+        deadline: Optional[Deadline] = None,
+    ):
+        self.book = book
+        self.key: Key = (channel, method, stage, proxy or "")
+        self.learned_s = book.timeout_for(self.key, default_s)
+        self.timeout_s = (deadline or unbounded()).timeout_s(self.learned_s, stage)
+        self.truncated = self.timeout_s < self.learned_s
+        self._stage = metrics.stage(stage, channel, method)
+        self._t0 = 0.0
+
+    @property
+    def timeout_ms(self) -> float:
+        return self.timeout_s * 1000.0
+
+    def __enter__(self) -> "StepTimer":
+        self._t0 = time.perf_counter()
+        self._stage.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._t0
+        self._stage.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self.book.record(self.key, elapsed)
+        elif exc_type is not GeneratorExit and not self.truncated and elapsed >= self.timeout_s * TIMED_OUT_RATIO:
+            self.book.record(self.key, self.timeout_s)
+        return False
+
+
+_book: Optional[TimeoutBook] = None
+_book_lock = threading.Lock()
+
+
+def get_timeout_book() -> TimeoutBook:
+    global _book
+    with _book_lock:
+        if _book is None:
+            _book = TimeoutBook()
+        return _book
+
+
+def step(
+    channel: str,
+    method: str,
+    stage: str,
+    proxy: str,
+    default_s: float,
+    deadline: Optional[Deadline] = None,
+) -> StepTimer:
+    return StepTimer(get_timeout_book(), channel, method, stage, proxy, default_s, deadline)
+
+
+def save() -> None:
+    get_timeout_book().save()
+
+
+def main() -> int:
+    rows = get_timeout_book().snapshot()
+    if not rows:
+        print("尚无样本")
+        return 0
+    print(f"{'渠道':<12} {'方式':<8} {'步骤':<18} {'代理':<8} {'样本':>4} {'p50':>7} {'高分位':>7} {'超时':>7}")
+    for r in rows:
+        timeout = f"{r['timeout_s']:>6.2f}s" if r["timeout_s"] is not None else f"{'默认':>6}"
+        print(
+            f"{r['channel']:<12} {r['method']:<8} {r['stage']:<18} {r['proxy']:<8} {r['samples']:>4} "
+            f"{r['p50_s']:>6.2f}s {r['p_high_s']:>6.2f}s {timeout}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+快照归档基准：对比紧凑归档、JSON 与 xlsx 的文件大小和全量扫描耗时。
+
+    python bench_archive.py [快照数] [每快照条数]
+
+数据为合成数据：标题从有限的话题池中抽取，模拟分钟级轮询时标题大量重复的情况。
+xlsx 需要安装 openpyxl，未安装时跳过。
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Dict
+
+from snapshot_archive import ArchiveWriter, ArchiveReader
+
+CHANNELS = ["微博", "头条", "Reddit", "Hacker News"]
+
+
+def make_snapshots(n_snapshots: int, per_snapshot: int, seed: int = 42) -> List[List[Dict]]:
+    rnd = random.Random(seed)
+    pool = [f"热点话题 {i} 的标题内容示例" for i in range(per_snapshot * 8)]
+    start = datetime(2026, 1, 1)
+    snapshots = []
+    for s in range(n_snapshots):
+        ch = CHANNELS[s % len(CHANNELS)]
+        ts = (start + timedelta(minutes=s)).strftime("%Y-%m-%d %H:%M:%S")
+        titles = rnd.sample(pool, per_snapshot)
+        snapshots.append([
+            {
+                "rank": i + 1,
+                "title": t,
+                "link": f"https://s.weibo.com/weibo?q={pool.index(t)}",
+                "channel": ch,
+                "fetched_at": ts,
+            }
+            for i, t in enumerate(titles)
+        ])
+    return snapshots
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main() -> int:
+    n_snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_snapshot = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    snapshots = make_snapshots(n_snapshots, per_snapshot)
+    total = n_snapshots * per_snapshot
+    tmp = tempfile.mkdtemp(prefix="bench_archive_")
+    rows = []
+
+    # 紧凑归档
+    arc_path = os.path.join(tmp, "snapshots.hotarc")
+    writer = ArchiveWriter(arc_path)
+    _, t_write = timed(lambda: [writer.append_items(s) for s in snapshots])
+    count, t_scan = timed(lambda: sum(1 for _ in ArchiveReader(arc_path).iter_items()))
+    assert count == total
+    _, t_col = timed(lambda: ArchiveReader(arc_path).count_rows())
+    rows.append(("归档(.hotarc)", os.path.getsize(arc_path), t_write, t_scan))
+    rows.append(("归档-仅列扫描", os.path.getsize(arc_path), t_write, t_col))
+
+    # JSON（每快照一行 JSONL）
+    json_path = os.path.join(tmp, "snapshots.jsonl")
+
+    def write_json():
+        with open(json_path, "w", encoding="utf-8") as f:
+            for s in snapshots:
+                f.write(json.dumps(s, ensure_ascii=False) + "\n")
+
+    def scan_json():
+        n = 0
+        with open(json_path, "r", encoding="utf-8") as f:
+            for line in f:
+                n += len(json.loads(line))
+        return n
+
+    _, t_write = timed(write_json)
+    count, t_scan = timed(scan_json)
+    assert count == total
+    rows.append(("JSONL", os.path.getsize(json_path), t_write, t_scan))
+
+    # xlsx（可选）
+    try:
+        from openpyxl import Workbook, load_workbook
+    except ImportError:
+        Workbook = None
+    if Workbook is not None:
+        xlsx_path = os.path.join(tmp, "snapshots.xlsx")
+
+        def write_xlsx():
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("history")
+            ws.append(["排名", "标题", "链接", "渠道", "抓取时间"])
+            for s in snapshots:
+                for it in s:
+                    ws.append([it["rank"], it["title"], it["link"], it["channel"], it["fetched_at"]])
+            wb.save(xlsx_path)
+
+        def scan_xlsx():
+            wb = load_workbook(xlsx_path, read_only=True)
+            n = sum(1 for _ in wb.active.iter_rows(min_row=2, values_only=True))
+            wb.close()
+            return n
+
+        _, t_write = timed(write_xlsx)
+        count, t_scan = timed(scan_xlsx)
+        assert count == total
+        rows.append(("xlsx", os.path.getsize(xlsx_path), t_write, t_scan))
+    else:
+        print("未安装 openpyxl，跳过 xlsx 对比。")
+
+    print(f"快照 {n_snapshots} 个 × {per_snapshot} 条 = {total} 行")
+    print(f"{'格式':<16}{'大小(KB)':>12}{'写入(s)':>10}{'扫描(s)':>10}{'字节/行':>10}")
+    for name, size, t_w, t_s in rows:
+        print(f"{name:<16}{size / 1024:>12.1f}{t_w:>10.3f}{t_s:>10.3f}{size / total:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
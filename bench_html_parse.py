@@ -0,0 +1,130 @@
+"""
+热搜汇总页 HTML 解析基准与等价性校验：对比原先的整页 html.parser 解析与各解析后端
+（selectolax / lxml / html.parser，整页或只解析热搜表格片段）的输出与耗时。
+
+    python bench_html_parse.py [-n 次数] [--html 页面文件 ...]
+
+默认使用 bench_fixtures/weibo_summary.html，并额外构造几种变体（嵌套表格、单引号属性、
+缺少锚点）校验截取片段的回退逻辑。任一组合的输出与原实现不一致时以退出码 1 结束。
+未安装的后端自动跳过。
+"""
+import os
+import sys
+import time
+import argparse
+from statistics import median
+from typing import List, Dict, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from weibo_hot import HTML_BACKENDS, html_backend_available, parse_summary_html
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HTML = os.path.join(BASE_DIR, "bench_fixtures", "weibo_summary.html")
+
+
+def reference_parse(html: str) -> List[Tuple]:
+    """原 fetch_hot_via_html 的解析逻辑（整页 html.parser），作为等价性基准。"""
+    soup = BeautifulSoup(html, "html.parser")
+    rows = soup.select("#pl_top_realtimehot table tbody tr")
+    results = []
+    for tr in rows:
+        tds = tr.find_all("td")
+        if len(tds) < 3:
+            continue
+        rank_text = tds[0].get_text(strip=True)
+        if not rank_text.isdigit():
+            continue
+        a = tds[1].find("a")
+        if not a:
+            continue
+        title = a.get_text(strip=True)
+        href = a.get("href", "")
+        if href.startswith("//"):
+            link = "https:" + href
+        else:
+            link = urljoin("https://s.weibo.com", href)
+        results.append((int(rank_text), title, link))
+        if len(results) >= 30:
+            break
+    return results
+
+
+def _key(items) -> List[Tuple]:
+    return [(it.rank, it.title, it.link) for it in items]
+
+
+def variants(html: str) -> Dict[str, str]:
+    """在原页面基础上构造的变体，覆盖片段截取的各个回退分支。"""
+    out = {"原页面": html}
+    # 表格内嵌套表格：不能在第一个 </table> 处截断
+    out["嵌套表格"] = html.replace(
+        '<td class="td-03">', '<td class="td-03"><table><tr><td>x</td></tr></table>', 3
+    )
+    out["单引号属性"] = html.replace('id="pl_top_realtimehot"', "id='pl_top_realtimehot'")
+    out["无锚点"] = html.replace('id="pl_top_realtimehot"', 'id="other"')
+    return out
+
+
+def check_equivalence(pages: Dict[str, str], backends: List[str]) -> int:
+    failures = 0
+    for name, html in pages.items():
+        expected = reference_parse(html)
+        for backend in backends:
+            for scoped in (True, False):
+                got = _key(parse_summary_html(html, backend, scoped))
+                ok = got == expected
+                if not ok:
+                    failures += 1
+                print(f"  {name:<8} {backend:<12} {'片段' if scoped else '整页'}  {len(got):>2} 条  {'一致' if ok else '不一致'}")
+    return failures
+
+
+def bench(html: str, backends: List[str], runs: int) -> None:
+    cases = [("原实现（整页 html.parser）", lambda: reference_parse(html))]
+    for backend in backends:
+        cases.append((f"{backend} 整页", lambda b=backend: parse_summary_html(html, b, scoped=False)))
+        cases.append((f"{backend} 片段", lambda b=backend: parse_summary_html(html, b, scoped=True)))
+    base = None
+    print(f"\n解析耗时（{len(html) // 1024} KB，{runs} 次中位数）")
+    for label, fn in cases:
+        fn()  # 预热
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t0) * 1000)
+        med = median(times)
+        base = base or med
+        print(f"  {label:<28} {med:8.2f} ms  {base / med:5.1f}x")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="热搜汇总页 HTML 解析基准")
+    ap.add_argument("-n", "--runs", type=int, default=20, help="每种组合的测量次数")
+    ap.add_argument("--html", nargs="*", default=[DEFAULT_HTML], help="保存的汇总页 HTML 文件")
+    args = ap.parse_args()
+
+    backends = [b for b in HTML_BACKENDS if html_backend_available(b)]
+    skipped = [b for b in HTML_BACKENDS if b not in backends]
+    if skipped:
+        print(f"未安装，跳过：{', '.join(skipped)}")
+
+    failures = 0
+    for path in args.html:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        print(f"等价性校验：{os.path.basename(path)}")
+        failures += check_equivalence(variants(html), backends)
+        bench(html, backends, args.runs)
+
+    if failures:
+        print(f"\n{failures} 个组合与原实现输出不一致")
+        return 1
+    print("\n全部组合与原实现输出一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
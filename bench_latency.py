@@ -0,0 +1,334 @@
+"""
+离线端到端延迟基准：用本地 HTTP 服务回放 bench_fixtures/ 中录制的响应，
+通过 HOT_BASE_URL_* 把各抓取函数指向本地，按渠道 × 抓取方式测量延迟。
+
+    python bench_latency.py [-n 次数] [--channels 微博,头条] [--methods api,dom,http,scrape]
+                            [--delay-ms 0] [--out bench_results] [--fail-on-regression]
+
+抓取方式：
+    http    仅 HTTP 请求（weibo_hot.py 的 JSON 接口、HN Firebase API）；
+            http_html / http_mirror 为 weibo_hot.py 的 HTML 解析与镜像服务
+    api     Playwright 浏览器内请求 JSON 接口
+    dom     Playwright 打开页面解析 DOM / __INITIAL_STATE__
+    scrape  hot_sources.scrape_items 完整路径（含回退与历史库，历史库写入临时文件）
+
+结果写入 <out>/latency_<时间>.json，并追加到 <out>/latency_history.jsonl；
+与历史中上一次结果相比 p50 变慢超过阈值时标记为回归。
+未安装 Playwright 浏览器时自动跳过 api/dom/scrape。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Callable, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BASE_DIR, "bench_fixtures")
+RESULTS_DIR = os.path.join(BASE_DIR, "bench_results")
+# p50 比上一次慢超过该比例（且超过 REGRESSION_MIN_MS）视为回归
+REGRESSION_RATIO = 0.20
+REGRESSION_MIN_MS = 5.0
+
+# (端点键, 路径前缀, 夹具文件, Content-Type)；按前缀最长匹配
+ROUTES: List[Tuple[str, str, str, str]] = [
+    ("weibo", "/ajax/side/hotSearch", "weibo_hotsearch.json", "application/json"),
+    ("weibo", "/", "weibo_home.html", "text/html"),
+    ("weibo_s", "/top/summary", "weibo_summary.html", "text/html"),
+    ("weibo_mirror", "/http://weibo.com/ajax/side/hotSearch", "weibo_hotsearch.json", "text/plain"),
+    ("toutiao", "/hot-event/hot-board/", "toutiao_hot_board.json", "application/json"),
+    ("toutiao", "/hot-event/hotboard/", "toutiao_hotboard.html", "text/html"),
+    ("toutiao", "/", "toutiao_home.html", "text/html"),
+    ("reddit", "/r/all/hot.json", "reddit_hot.json", "application/json"),
+    ("reddit", "/r/popular.json", "reddit_hot.json", "application/json"),
+    ("hn_api", "/v0/topstories.json", "hn_topstories.json", "application/json"),
+    ("hn", "/", "hn_front.html", "text/html"),
+]
+
+
+class FixtureServer:
+    """本地替身服务：/<端点键>/<原始路径> 返回对应夹具，delay_ms 模拟网络往返。"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, delay_ms: float = 0.0):
+        self.fixtures_dir = fixtures_dir
+        self.delay_ms = delay_ms
+        self.requests = 0
+        self._cache: Dict[str, bytes] = {}
+        self._hn_items: Dict[str, Dict] = json.loads(self._read("hn_items.json"))
+        routes = sorted(ROUTES, key=lambda r: -len(r[1]))
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                if server.delay_ms:
+                    time.sleep(server.delay_ms / 1000.0)
+                body, ctype = server.resolve(self.path, routes)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _read(self, name: str) -> bytes:
+        data = self._cache.get(name)
+        if data is None:
+            with open(os.path.join(self.fixtures_dir, name), "rb") as f:
+                data = self._cache[name] = f.read()
+        return data
+
+    def resolve(self, raw_path: str, routes) -> Tuple[Optional[bytes], str]:
+        key, _, rest = raw_path.lstrip("/").partition("/")
+        path = "/" + rest
+        if key == "hn_api" and path.startswith("/v0/item/"):
+            item = self._hn_items.get(path[len("/v0/item/"):].split(".")[0])
+            return (json.dumps(item).encode("utf-8") if item else b"null"), "application/json"
+        for k, prefix, name, ctype in routes:
+            if k == key and path.startswith(prefix):
+                return self._read(name), ctype
+        return None, "text/plain"
+
+    def base_url(self, key: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{key}"
+
+    def start(self) -> "FixtureServer":
+        import endpoints
+
+        self._thread.start()
+        for key in endpoints.DEFAULT_BASE_URLS:
+            os.environ[endpoints.env_key(key)] = self.base_url(key)
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def percentile(sorted_vals: List[float], p: float) -> float:
+    """最近秩百分位（样本已排序）。"""
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals) - 1, int(round(p / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def summarize(latencies_ms: List[float]) -> Dict:
+    vals = sorted(latencies_ms)
+    if not vals:
+        return {"runs": 0}
+    return {
+        "runs": len(vals),
+        "min_ms": round(vals[0], 2),
+        "p50_ms": round(percentile(vals, 50), 2),
+        "p90_ms": round(percentile(vals, 90), 2),
+        "p99_ms": round(percentile(vals, 99), 2),
+        "max_ms": round(vals[-1], 2),
+        "mean_ms": round(sum(vals) / len(vals), 2),
+    }
+
+
+def build_cases(playwright_ok: bool) -> List[Tuple[str, str, Callable[[], list]]]:
+    """(渠道, 方式, 调用) 列表；Playwright 相关方式在浏览器可用时才加入。"""
+    import weibo_hot
+    from hn_hot_playwright import fetch_hn_via_api
+
+    cases: List[Tuple[str, str, Callable[[], list]]] = [
+        ("微博", "http", weibo_hot.fetch_hot_via_api),
+        ("微博", "http_html", weibo_hot.fetch_hot_via_html),
+        ("微博", "http_mirror", weibo_hot.fetch_hot_via_mirror),
+        ("Hacker News", "http", lambda: fetch_hn_via_api(None, limit=30)),
+    ]
+    if not playwright_ok:
+        return cases
+
+    from playwright.sync_api import sync_playwright
+    from weibo_hot_playwright import fetch_top_via_api, fetch_top_via_dom
+    from toutiao_hot_playwright import fetch_toutiao_via_api, fetch_toutiao_via_dom
+    from reddit_hot_playwright import fetch_reddit_via_api, fetch_reddit_via_dom
+    from hn_hot_playwright import fetch_hn_via_dom
+    from hot_sources import scrape_items
+
+    def with_browser(fn):
+        def run():
+            with sync_playwright() as p:
+                return fn(p.chromium, headless=True, limit=30)
+        return run
+
+    for ch, api, dom in (
+        ("微博", fetch_top_via_api, fetch_top_via_dom),
+        ("头条", fetch_toutiao_via_api, fetch_toutiao_via_dom),
+        ("Reddit", fetch_reddit_via_api, fetch_reddit_via_dom),
+        ("Hacker News", None, fetch_hn_via_dom),
+    ):
+        if api is not None:
+            cases.append((ch, "api", with_browser(api)))
+        cases.append((ch, "dom", with_browser(dom)))
+        cases.append((ch, "scrape", lambda ch=ch: scrape_items(30, True, ch)))
+    return cases
+
+
+def playwright_available() -> Tuple[bool, str]:
+    try:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+        return True, ""
+    except Exception as e:
+        return False, str(e).splitlines()[0] if str(e) else type(e).__name__
+
+
+def run_case(fn: Callable[[], list], runs: int, warmup: int = 1) -> Dict:
+    latencies: List[float] = []
+    counts: List[int] = []
+    errors: List[str] = []
+    for i in range(warmup + runs):
+        t0 = time.perf_counter()
+        try:
+            items = fn() or []
+        except Exception as e:
+            errors.append(str(e).splitlines()[0] if str(e) else type(e).__name__)
+            continue
+        dt = (time.perf_counter() - t0) * 1000.0
+        if i < warmup:
+            continue
+        if not items:
+            errors.append("无数据")
+            continue
+        latencies.append(dt)
+        counts.append(len(items))
+    res = summarize(latencies)
+    res["items"] = max(counts) if counts else 0
+    if errors:
+        res["errors"] = errors[:3]
+    return res
+
+
+def load_previous(history_path: str) -> Dict[str, Dict]:
+    """历史文件中每个（渠道, 方式）最近一次的结果。"""
+    prev: Dict[str, Dict] = {}
+    try:
+        with open(history_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    run = json.loads(line)
+                except ValueError:
+                    continue
+                for r in run.get("results", []):
+                    prev[f"{r['channel']}/{r['method']}"] = r
+    except FileNotFoundError:
+        pass
+    return prev
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="离线端到端延迟基准")
+    ap.add_argument("-n", "--runs", type=int, default=5, help="每个用例的测量次数（另有 1 次预热）")
+    ap.add_argument("--channels", default="", help="只测这些渠道，逗号分隔")
+    ap.add_argument("--methods", default="", help="只测这些方式，逗号分隔：http,http_html,http_mirror,api,dom,scrape")
+    ap.add_argument("--delay-ms", type=float, default=0.0, help="每个请求附加的模拟网络延迟")
+    ap.add_argument("--out", default=RESULTS_DIR, help="结果目录")
+    ap.add_argument("--fail-on-regression", action="store_true", help="出现回归时以退出码 1 结束")
+    args = ap.parse_args()
+
+    # 基准只访问本地服务：清除代理设置（未配置代理池时各抓取函数使用环境变量中的代理）
+    for k in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(k, None)
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+
+    server = FixtureServer(delay_ms=args.delay_ms).start()
+    tmp_dir = tempfile.mkdtemp(prefix="bench_latency_")
+    try:
+        pw_ok, pw_err = playwright_available()
+        if not pw_ok:
+            print(f"Playwright 浏览器不可用，跳过 api/dom/scrape：{pw_err}")
+        else:
+            # scrape_items 的历史快照写入临时库，不污染本地历史
+            import hot_sources
+            from history_store import HistoryStore
+
+            hot_sources._history_store = HistoryStore(os.path.join(tmp_dir, "bench_history.db"))
+
+        # 熔断状态与超时样本同样写入临时文件：本地熔断的方式不应在基准中被跳过，
+        # 本地回放的延迟也不应混入真实环境学到的超时
+        import adaptive_timeout
+        import circuit_breaker
+
+        circuit_breaker._board = circuit_breaker.BreakerBoard(os.path.join(tmp_dir, "bench_circuit.json"))
+        adaptive_timeout._book = adaptive_timeout.TimeoutBook(stats_path=os.path.join(tmp_dir, "bench_timeouts.json"))
+
+        want_ch = {c.strip() for c in args.channels.split(",") if c.strip()}
+        want_m = {m.strip() for m in args.methods.split(",") if m.strip()}
+        cases = [
+            c for c in build_cases(pw_ok)
+            if (not want_ch or c[0] in want_ch) and (not want_m or c[1] in want_m)
+        ]
+
+        os.makedirs(args.out, exist_ok=True)
+        history_path = os.path.join(args.out, "latency_history.jsonl")
+        previous = load_previous(history_path)
+
+        results: List[Dict] = []
+        regressions: List[str] = []
+        print(f"{'渠道':<14}{'方式':<10}{'条数':>6}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'均值(ms)':>10}  对比上次")
+        for ch, method, fn in cases:
+            res = run_case(fn, args.runs)
+            res.update({"channel": ch, "method": method})
+            results.append(res)
+            note = ""
+            prev = previous.get(f"{ch}/{method}")
+            if prev and prev.get("p50_ms") and res.get("p50_ms"):
+                change = (res["p50_ms"] - prev["p50_ms"]) / prev["p50_ms"]
+                note = f"{change:+.0%}"
+                if change > REGRESSION_RATIO and res["p50_ms"] - prev["p50_ms"] > REGRESSION_MIN_MS:
+                    note += " 回归"
+                    regressions.append(f"{ch}/{method}")
+            if res.get("errors"):
+                note += f" 错误: {res['errors'][0]}"
+            print(
+                f"{ch:<14}{method:<10}{res['items']:>6}{res.get('p50_ms', 0):>10.1f}"
+                f"{res.get('p90_ms', 0):>10.1f}{res.get('p99_ms', 0):>10.1f}{res.get('mean_ms', 0):>10.1f}  {note}"
+            )
+
+        run = {
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "runs": args.runs,
+            "delay_ms": args.delay_ms,
+            "python": sys.version.split()[0],
+            "playwright": pw_ok,
+            "requests_served": server.requests,
+            "results": results,
+        }
+        out_path = os.path.join(args.out, f"latency_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(run, f, ensure_ascii=False, indent=2)
+        with open(history_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+        print(f"结果已保存: {out_path}")
+        if regressions:
+            print("回归: " + ", ".join(regressions))
+            if args.fail_on_regression:
+                return 1
+        return 0
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""
+进程池抓取吞吐基准：本地回放 bench_fixtures/ 中的录制响应，模拟多个定时任务同时触发（每个任务抓取全部渠道），
+对比在本进程的线程中抓取（现有方式，每个渠道各启动一个浏览器）与 ScrapePool 在不同进程数下的总耗时与吞吐，
+并校验两种方式得到的条目（排名、标题、链接）一致。
+
+    python bench_scrape_pool.py [--tasks 4] [--workers 1,2,4] [--delay-ms 0]
+
+进程池先做一轮预热（工作进程启动、浏览器常驻），计时只含稳定状态下的抓取。需要 Playwright 浏览器。
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+
+from bench_latency import FixtureServer, playwright_available
+
+CHANNELS = ("微博", "头条", "Reddit", "Hacker News")
+
+
+def _bench_worker_init(tmp_dir: str) -> None:
+    """工作进程初始化：历史库、熔断状态与超时样本写入临时文件，不污染本地状态。"""
+    import hot_sources
+    import adaptive_timeout
+    import circuit_breaker
+    from history_store import HistoryStore
+
+    hot_sources._history_store = HistoryStore(os.path.join(tmp_dir, "bench_history.db"))
+    circuit_breaker._board = circuit_breaker.BreakerBoard(os.path.join(tmp_dir, f"bench_circuit_{os.getpid()}.json"))
+    adaptive_timeout._book = adaptive_timeout.TimeoutBook(stats_path=os.path.join(tmp_dir, f"bench_timeouts_{os.getpid()}.json"))
+
+
+def _key(items) -> List[Tuple]:
+    return [(it.get("rank"), it.get("title"), it.get("link")) for it in items]
+
+
+def run_threads(jobs: List[str], parallel: int) -> Tuple[float, Dict[str, List[Tuple]]]:
+    from hot_sources import scrape_items
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel) as ex:
+        results = list(ex.map(lambda ch: (ch, scrape_items(30, True, ch)), jobs))
+    return time.perf_counter() - t0, {ch: _key(items) for ch, items in results}
+
+
+def run_pool(jobs: List[str], workers: int, tmp_dir: str) -> Tuple[float, Dict[str, List[Tuple]], Dict]:
+    from scrape_pool import ScrapePool
+
+    pool = ScrapePool(workers=workers, initializer=_bench_worker_init, initargs=(tmp_dir,))
+    try:
+        # 预热：每个工作进程至少抓取一次
+        for f in [pool.submit(CHANNELS[i % len(CHANNELS)], 30) for i in range(workers)]:
+            f.result()
+        t0 = time.perf_counter()
+        futures = [(ch, pool.submit(ch, 30)) for ch in jobs]
+        results = {ch: f.result() for ch, f in futures}
+        elapsed = time.perf_counter() - t0
+        out = {}
+        for ch, (tuples, _report, error) in results.items():
+            if error:
+                print(f"  {ch} 抓取失败: {error}")
+            out[ch] = [t[:3] for t in tuples]
+        return elapsed, out, pool.snapshot()
+    finally:
+        pool.shutdown()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="进程池抓取吞吐基准")
+    ap.add_argument("--tasks", type=int, default=4, help="同时触发的任务数（每个任务抓取全部渠道）")
+    ap.add_argument("--workers", default="", help="要测的进程数，逗号分隔；缺省为 1、2、CPU 核数")
+    ap.add_argument("--delay-ms", type=float, default=0.0, help="每个请求附加的模拟网络延迟")
+    args = ap.parse_args()
+
+    for k in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(k, None)
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+
+    pw_ok, pw_err = playwright_available()
+    if not pw_ok:
+        print(f"Playwright 浏览器不可用，无法运行：{pw_err}")
+        return 1
+
+    cores = os.cpu_count() or 1
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()] or sorted({1, 2, cores})
+    jobs = [ch for _ in range(args.tasks) for ch in CHANNELS]
+
+    server = FixtureServer(delay_ms=args.delay_ms).start()
+    tmp_dir = tempfile.mkdtemp(prefix="bench_scrape_pool_")
+    try:
+        # 本进程的线程抓取同样写入临时状态
+        _bench_worker_init(tmp_dir)
+        print(f"{len(jobs)} 次渠道抓取（{args.tasks} 个任务 × {len(CHANNELS)} 个渠道），CPU 核数 {cores}")
+        print(f"{'方式':<16}{'耗时(s)':>10}{'吞吐(次/s)':>12}  一致性")
+        base_s, base = run_threads(jobs, min(len(jobs), args.tasks * 4))
+        print(f"{'线程':<16}{base_s:>10.2f}{len(jobs) / base_s:>12.2f}")
+        for n in worker_counts:
+            elapsed, got, stats = run_pool(jobs, n, tmp_dir)
+            same = all(got.get(ch) == base.get(ch) for ch in CHANNELS)
+            note = "一致" if same else "不一致: " + ",".join(ch for ch in CHANNELS if got.get(ch) != base.get(ch))
+            print(f"{f'进程池 ×{n}':<16}{elapsed:>10.2f}{len(jobs) / elapsed:>12.2f}  {note}（回收 {stats['recycled']}）")
+        return 0
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+头条页面内投影基准：对比“整棵 __INITIAL_STATE__ / 完整接口响应经 IPC 传回再在 Python 中提取”
+与“在页面内投影出标题/链接/排名/热度后传回”的传输大小和 page.evaluate 耗时，并校验两者
+标准化后的结果一致。
+
+    python bench_toutiao_projection.py [-n 次数] [--delay-ms 0]
+
+页面与接口由本地替身服务回放 bench_fixtures/ 中保存的 toutiao_hotboard.html、
+toutiao_hot_board.json（见 bench_latency.FixtureServer）。需要 Playwright 浏览器，未安装时跳过。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from statistics import median
+from typing import Callable, List, Tuple
+
+from bench_latency import FixtureServer, playwright_available
+import endpoints
+from hot_item import normalize_records
+from toutiao_hot_playwright import PROJECT_API_JS, PROJECT_STATE_JS, _toutiao_records
+
+# 投影前的写法：整体传回
+FULL_STATE_JS = "(() => { try { return window.__INITIAL_STATE__ || null } catch(e){ return null } })()"
+FULL_API_JS = """
+async (url) => {
+  try {
+    const res = await fetch(url, { headers: { 'Accept': 'application/json' } });
+    if (!res.ok) return null;
+    return await res.json();
+  } catch (e) { return null; }
+}
+"""
+
+
+def _key(data, limit: int) -> List[Tuple]:
+    items = normalize_records("头条", _toutiao_records(data), "bench", limit, fetched_at="-")
+    return [(it.rank, it.title, it.link, it.hot_value) for it in items]
+
+
+def measure(fn: Callable[[], object], runs: int) -> Tuple[float, int, object]:
+    result = fn()  # 预热
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    size = len(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    return median(times), size, result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="头条页面内投影基准")
+    ap.add_argument("-n", "--runs", type=int, default=20, help="每种写法的测量次数")
+    ap.add_argument("--limit", type=int, default=30, help="条数")
+    ap.add_argument("--delay-ms", type=float, default=0.0, help="接口请求附加的模拟网络延迟")
+    args = ap.parse_args()
+
+    ok, err = playwright_available()
+    if not ok:
+        print(f"Playwright 浏览器不可用，跳过：{err}")
+        return 0
+
+    from playwright.sync_api import sync_playwright
+
+    for k in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(k, None)
+    server = FixtureServer(delay_ms=args.delay_ms).start()
+    mismatches = 0
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            page = browser.new_page()
+            api_url = endpoints.url("toutiao", "/hot-event/hot-board/?origin=toutiao_pc")
+
+            page.goto(endpoints.url("toutiao", "/hot-event/hotboard/?origin=toutiao_pc"), wait_until="domcontentloaded")
+            state_cases = [
+                ("__INITIAL_STATE__ 整体传回", lambda: page.evaluate(FULL_STATE_JS)),
+                ("__INITIAL_STATE__ 页面内投影", lambda: page.evaluate(PROJECT_STATE_JS, args.limit)),
+            ]
+            page_api = browser.new_page()
+            page_api.goto(endpoints.url("toutiao"), wait_until="domcontentloaded")
+            api_cases = [
+                ("接口响应 整体传回", lambda: page_api.evaluate(FULL_API_JS, api_url)),
+                ("接口响应 页面内投影", lambda: page_api.evaluate(PROJECT_API_JS, [api_url, args.limit])),
+            ]
+
+            print(f"{'写法':<26} {'evaluate p50':>12} {'传输大小':>10}")
+            for cases in (state_cases, api_cases):
+                results = []
+                for label, fn in cases:
+                    p50, size, result = measure(fn, args.runs)
+                    results.append(result)
+                    print(f"{label:<26} {p50:9.2f} ms {size / 1024:8.1f} KB")
+                same = _key(results[0], args.limit) == _key(results[1], args.limit)
+                if not same:
+                    mismatches += 1
+                print(f"  标准化结果{'一致' if same else '不一致'}（{len(_key(results[1], args.limit))} 条）")
+            browser.close()
+    finally:
+        server.stop()
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
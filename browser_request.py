@@ -0,0 +1,48 @@
+import json
+from typing import Dict, Optional
+
+from playwright.sync_api import BrowserContext
+
+import adaptive_timeout
+import metrics
+from deadline import Deadline, DeadlineExceeded
+
+
+def request_json(
+    context: BrowserContext,
+    url: str,
+    channel: str,
+    method: str,
+    headers: Optional[Dict[str, str]] = None,
+    proxy: str = "",
+    deadline: Optional[Deadline] = None,
+):
+    """
+    通过浏览器上下文的请求接口（context.request）获取 JSON：与页面共享 Cookie、代理和 UA，
+    但不创建页面、不渲染，也不经过页面内 JS 往返；响应体字节直接在 Python 中解析。
+    非 2xx 或不是 JSON 时返回 None，由调用方决定是否回退到页面内请求；
+    请求因时间预算用完而超时时抛出 DeadlineExceeded（不是该请求或代理的失败）。
+    超时按该渠道 × 代理的实测延迟自适应（默认 10 秒），并受 deadline 剩余预算约束。
+    """
+    # 预算用完时在这里抛出 DeadlineExceeded，不当作一次普通的请求失败
+    step = adaptive_timeout.step(channel, method, "request", proxy, 10, deadline)
+    try:
+        with step:
+            resp = context.request.get(
+                url,
+                headers={"Accept": "application/json", **(headers or {})},
+                timeout=step.timeout_ms,
+            )
+            body = resp.body()
+        if not resp.ok:
+            return None
+        with metrics.stage("parse", channel, method):
+            return json.loads(body)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        if deadline is not None and deadline.expired():
+            # 超时是被剩余预算截短的：按预算用完上抛，代理租约与熔断都不把它记为失败
+            raise DeadlineExceeded(f"超出时间预算 {deadline.budget_s:g}s（{channel} 请求）") from e
+        print(f"{channel} 请求 {url} 失败: {e}")
+        return None
@@ -0,0 +1,147 @@
+"""
+高频轮询的变化输出：按 任务 × 渠道 记住上一次输出时的榜单（归一化标题 -> 排名）和榜单哈希，
+本次只放行新上榜或排名变化的条目；榜单与上次完全相同时什么也不输出（哈希一致，记为无变化）。
+
+只比较排名与标题，热度值的变化不算变化（否则热度每分钟都在变，榜单永远“有变化”）。
+状态保存在 change_feed.json；渠道被时间预算截断时只合并已看到的条目，不更新榜单哈希。
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from history_store import normalize_title
+from hot_item import HotItem
+
+CHANGE_FEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "change_feed.json")
+
+
+def board_hash(items: Iterable[Dict]) -> str:
+    """榜单哈希：按顺序的 (排名, 归一化标题)。"""
+    h = hashlib.sha1()
+    for it in items:
+        h.update(f"{it.get('rank')}\t{normalize_title(it.get('title') or '')}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class ChangeFeed:
+    def __init__(self, path: str = CHANGE_FEED_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        # "任务/渠道" -> {"hash", "ranks": {归一化标题: 排名}, "updated_at"}
+        self._boards: Dict[str, Dict] = {}
+        self.load()
+
+    @staticmethod
+    def _key(task_id: str, channel: str) -> str:
+        return f"{task_id}/{channel}"
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self._boards = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except Exception as e:
+            print(f"读取变化状态失败: {e}")
+
+    def _save(self) -> None:
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._boards, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"保存变化状态失败: {e}")
+
+    def board(self, task_id: str, channel: str) -> Dict:
+        with self._lock:
+            return dict(self._boards.get(self._key(task_id, channel)) or {})
+
+    def commit(self, task_id: str, channel: str, items: List[Dict], complete: bool = True) -> None:
+        """记下本次看到的榜单；complete 为 False（不完整）时只合并这些条目，保留原哈希。"""
+        ranks = {normalize_title(it.get("title") or ""): it.get("rank") for it in items}
+        key = self._key(task_id, channel)
+        with self._lock:
+            prev = self._boards.get(key) or {}
+            if complete:
+                state = {"hash": board_hash(items), "ranks": ranks}
+            else:
+                state = {"hash": prev.get("hash"), "ranks": {**(prev.get("ranks") or {}), **ranks}}
+            state["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._boards[key] = state
+            self._save()
+
+    def forget(self, task_id: str) -> None:
+        """删除任务时清掉它的状态。"""
+        prefix = f"{task_id}/"
+        with self._lock:
+            keys = [k for k in self._boards if k.startswith(prefix)]
+            for k in keys:
+                del self._boards[k]
+            if keys:
+                self._save()
+
+
+class ChangeRun:
+    """
+    一次运行的变化过滤：iter_changes() 逐渠道包装条目流，commit() 记下本次看到的榜单。
+    记录与过滤分开，由调用方在写入端全部成功后再 commit()；写入失败或运行出错时不调用，
+    下次照常对比上一次的榜单，本次放行过的变化会再次输出。
+    """
+
+    def __init__(self, feed: ChangeFeed, task_id: str):
+        self.feed = feed
+        self.task_id = task_id
+        self._lock = threading.Lock()
+        # 渠道 -> (完整消费到的条目, 是否完整)
+        self._seen: Dict[str, tuple] = {}
+
+    def iter_changes(self, channel: str, items: Iterable[HotItem], report: Optional[Dict] = None) -> Iterator[HotItem]:
+        """
+        只产出相对上一次新上榜或排名变化的条目，逐条放行、不等整榜。
+        完整消费后在 report 中写入 scraped（抓到的条数）、emitted（放行的条数）、
+        unchanged（榜单与上次完全相同），并把本次榜单留待 commit()；中途放弃时不留。
+        """
+        if report is None:
+            report = {}
+        prev = self.feed.board(self.task_id, channel)
+        prev_ranks: Dict[str, Optional[int]] = prev.get("ranks") or {}
+        seen: List[HotItem] = []
+        emitted = 0
+        for it in items:
+            seen.append(it)
+            norm = normalize_title(it.get("title") or "")
+            if norm in prev_ranks and prev_ranks[norm] == it.get("rank"):
+                continue
+            emitted += 1
+            yield it
+        complete = not report.get("partial")
+        unchanged = complete and bool(seen) and board_hash(seen) == prev.get("hash")
+        report.update({"scraped": len(seen), "emitted": emitted, "unchanged": unchanged})
+        if seen:
+            with self._lock:
+                self._seen[channel] = (seen, complete)
+
+    def commit(self) -> None:
+        """记下各渠道本次的榜单（只在输出已成功写入后调用）。"""
+        with self._lock:
+            seen, self._seen = self._seen, {}
+        for channel, (items, complete) in seen.items():
+            self.feed.commit(self.task_id, channel, items, complete)
+
+
+_feed: Optional[ChangeFeed] = None
+_feed_lock = threading.Lock()
+
+
+def get_change_feed() -> ChangeFeed:
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = ChangeFeed()
+        return _feed
@@ -0,0 +1,203 @@
+"""
+按渠道 × 抓取方式的熔断器：某条抓取路径连续失败后熔断，之后的运行直接跳到下一级回退，
+不再为它付出完整的超时；熔断到期后半开，放行一次探测，成功即恢复，失败则重新熔断且时长翻倍。
+
+状态：closed（正常）→ 连续失败 FAILURE_THRESHOLD 次 → open（跳过）→ 到期 → half_open（放行一次探测）
+→ 成功回到 closed / 失败回到 open。
+
+状态保存在 circuit_state.json，重启后仍然有效；当前状态见 hot_breaker_state 指标
+（0 正常、1 半开、2 熔断），被跳过的次数见 hot_breaker_skipped_total。
+"""
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Optional
+
+import metrics
+
+CIRCUIT_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "circuit_state.json")
+
+# 连续失败多少次后熔断
+FAILURE_THRESHOLD = 3
+# 熔断时长：base * 2^(连续熔断次数-1)，封顶 cap 秒
+OPEN_BASE_S = 120.0
+OPEN_CAP_S = 1800.0
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = metrics.REGISTRY.register(metrics.Gauge(
+    "hot_breaker_state", "熔断器状态（0 正常、1 半开、2 熔断）", ("channel", "method"),
+))
+BREAKER_SKIPPED = metrics.REGISTRY.register(metrics.Counter(
+    "hot_breaker_skipped_total", "因熔断而跳过的抓取次数", ("channel", "method"),
+))
+
+
+class CircuitBreaker:
+    def __init__(self, channel: str, method: str):
+        self.channel = channel
+        self.method = method
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.last_error = ""
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN and not self.probing:
+            # 半开时只放行一次探测，结果出来前其余调用仍跳过
+            self.probing = True
+            return True
+        return False
+
+    def record(self, ok: bool, error: str = "") -> None:
+        self.probing = False
+        if ok:
+            self.state = CLOSED
+            self.failures = 0
+            self.opens = 0
+            return
+        self.failures += 1
+        self.last_error = error
+        # 熔断期间被强制尝试（见 hot_sources）的失败只计数，不再延长熔断
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= FAILURE_THRESHOLD):
+            self.opens += 1
+            hold = min(OPEN_BASE_S * (2 ** (self.opens - 1)), OPEN_CAP_S)
+            self.state = OPEN
+            self.open_until = time.time() + hold
+            print(f"熔断 {self.channel}/{self.method} {hold:.0f}s：{error}")
+
+    def to_dict(self) -> Dict:
+        return {
+            "channel": self.channel,
+            "method": self.method,
+            "state": self.state,
+            "failures": self.failures,
+            "opens": self.opens,
+            "open_until": self.open_until,
+            "last_error": self.last_error,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "CircuitBreaker":
+        b = cls(d["channel"], d["method"])
+        # 探测进行中退出的半开状态：重启后重新放行探测
+        b.state = d.get("state") if d.get("state") in _STATE_VALUE else CLOSED
+        b.failures = int(d.get("failures") or 0)
+        b.opens = int(d.get("opens") or 0)
+        b.open_until = float(d.get("open_until") or 0.0)
+        b.last_error = d.get("last_error") or ""
+        return b
+
+
+class BreakerBoard:
+    def __init__(self, path: str = CIRCUIT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # 不为 None 时 record() 的结果同时追加到这里（进程池的工作进程据此把结果转给父进程）
+        self.journal: Optional[List[tuple]] = None
+        self.load()
+
+    @staticmethod
+    def _key(channel: str, method: str) -> str:
+        return f"{channel}/{method}"
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                for d in data:
+                    b = CircuitBreaker.from_dict(d)
+                    self._breakers[self._key(b.channel, b.method)] = b
+                    BREAKER_STATE.set(_STATE_VALUE[b.state], channel=b.channel, method=b.method)
+        except Exception as e:
+            print(f"读取熔断状态失败: {e}")
+
+    def _save(self) -> None:
+        try:
+            data = [b.to_dict() for b in self._breakers.values()]
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"保存熔断状态失败: {e}")
+
+    def _get(self, channel: str, method: str) -> CircuitBreaker:
+        key = self._key(channel, method)
+        b = self._breakers.get(key)
+        if b is None:
+            b = self._breakers[key] = CircuitBreaker(channel, method)
+        return b
+
+    def allow(self, channel: str, method: str) -> bool:
+        """该路径是否可以尝试；熔断中返回 False 并计入跳过次数。"""
+        with self._lock:
+            b = self._get(channel, method)
+            before = b.state
+            allowed = b.allow(time.time())
+            state = b.state
+            if state != before:
+                self._save()
+        BREAKER_STATE.set(_STATE_VALUE[state], channel=channel, method=method)
+        if not allowed:
+            BREAKER_SKIPPED.inc(channel=channel, method=method)
+        return allowed
+
+    def record(self, channel: str, method: str, ok: bool, error: str = "") -> None:
+        with self._lock:
+            b = self._get(channel, method)
+            before = (b.state, b.failures)
+            b.record(ok, error)
+            state = b.state
+            if (b.state, b.failures) != before:
+                self._save()
+            if self.journal is not None:
+                self.journal.append((channel, method, ok, error))
+        BREAKER_STATE.set(_STATE_VALUE[state], channel=channel, method=method)
+
+    def release(self, channel: str, method: str) -> None:
+        """放行后未得出结果（调用方中途放弃）：不计成败，半开时允许下一次探测。"""
+        with self._lock:
+            self._get(channel, method).probing = False
+
+    def state(self, channel: str, method: str) -> str:
+        with self._lock:
+            return self._get(channel, method).state
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [b.to_dict() for b in self._breakers.values()]
+
+    def absorb(self, snapshot: List[Dict]) -> None:
+        """以另一进程的状态（snapshot() 的结果）为准覆盖本进程的熔断器。"""
+        with self._lock:
+            for d in snapshot:
+                b = CircuitBreaker.from_dict(d)
+                self._breakers[self._key(b.channel, b.method)] = b
+                BREAKER_STATE.set(_STATE_VALUE[b.state], channel=b.channel, method=b.method)
+            self._save()
+
+
+_board: Optional[BreakerBoard] = None
+_board_lock = threading.Lock()
+
+
+def get_breaker_board() -> BreakerBoard:
+    global _board
+    with _board_lock:
+        if _board is None:
+            _board = BreakerBoard()
+        return _board
@@ -0,0 +1,267 @@
+"""
+微博 Cookie 池：多组登录 Cookie 轮换使用，按健康状况自动冷却。
+
+配置文件 weibo_cookies.json（不存在时使用环境变量 WEIBO_COOKIE 作为唯一一组，与原行为一致）：
+
+    {
+      "strategy": "lru",
+      "cookies": [
+        {"name": "acc1", "cookie": "SUB=...; SUBP=..."},
+        {"name": "acc2", "cookie": "SUB=...; SUBP=..."}
+      ]
+    }
+
+也可直接写成字符串数组。strategy 为 round_robin（轮询）或 lru（最久未用优先，默认）。
+
+每次抓取取一组 Cookie，结束后上报：成功、一般失败（网络等，只计数）、或被冷却的失败
+（遇到登录墙、热搜列表为空）。冷却时长按连续冷却次数翻倍（封顶），成功一次即清零。
+全部处于冷却时不带 Cookie 请求（访客模式）。健康状态保存在 weibo_cookie_state.json，
+重启后冷却仍然有效。
+"""
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Optional
+
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COOKIE_POOL_FILE = os.path.join(BASE_DIR, "weibo_cookies.json")
+COOKIE_STATE_FILE = os.path.join(BASE_DIR, "weibo_cookie_state.json")
+
+# 冷却时长：base * 2^(连续冷却次数-1)，封顶 cap 秒
+BENCH_BASE_S = 600.0
+BENCH_CAP_S = 7200.0
+
+# 出现在页面地址中即视为被重定向到登录页
+LOGIN_URL_MARKERS = ("passport.weibo.com", "login.sina.com.cn", "/login", "visitor/visitor")
+
+COOKIE_BENCHED = metrics.REGISTRY.register(metrics.Gauge(
+    "hot_cookie_benched", "Cookie 是否处于冷却期（1/0）", ("cookie",),
+))
+COOKIE_REQUESTS = metrics.REGISTRY.register(metrics.Counter(
+    "hot_cookie_requests_total", "各组 Cookie 的使用次数", ("cookie", "outcome"),
+))
+
+
+def is_login_url(url: str) -> bool:
+    url = (url or "").lower()
+    return any(m in url for m in LOGIN_URL_MARKERS)
+
+
+def report_hot_search(lease: "CookieLease", data) -> None:
+    """
+    按热搜接口响应上报 Cookie 结果：有热搜记为成功；要求登录（ok=-100）或 realtime 为空时冷却；
+    非 JSON 对象（请求失败等）记为一般失败。
+    """
+    if not isinstance(data, dict):
+        lease.fail("未返回热搜数据")
+    elif data.get("ok") == -100:
+        lease.bench("需要登录")
+    elif not data.get("realtime"):
+        lease.bench("热搜列表为空")
+    else:
+        lease.ok()
+
+
+class CookieSet:
+    def __init__(self, name: str, cookie: str):
+        self.name = name
+        self.cookie = cookie
+        self.successes = 0
+        self.failures = 0
+        self.bench_count = 0
+        self.benched_until = 0.0
+        self.last_used = 0.0
+        self.last_error = ""
+
+    def available(self, now: float) -> bool:
+        return now >= self.benched_until
+
+    def state(self) -> Dict:
+        # 不保存 Cookie 值本身
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "bench_count": self.bench_count,
+            "benched_until": self.benched_until,
+            "last_used": self.last_used,
+            "last_error": self.last_error,
+        }
+
+    def restore(self, st: Dict) -> None:
+        for k in ("successes", "failures", "bench_count"):
+            setattr(self, k, int(st.get(k) or 0))
+        for k in ("benched_until", "last_used"):
+            setattr(self, k, float(st.get(k) or 0.0))
+        self.last_error = st.get("last_error") or ""
+
+
+class CookieLease:
+    """一次抓取使用的 Cookie；ok()/fail()/bench() 以第一次上报为准。"""
+
+    def __init__(self, pool: "CookiePool", cs: CookieSet):
+        self.pool = pool
+        self.cookie_set = cs
+        self.name = cs.name
+        self.cookie = cs.cookie
+        self._done = False
+
+    def ok(self) -> None:
+        self._finish("ok")
+
+    def fail(self, error: str = "") -> None:
+        """一般失败（网络、超时等）：只计数，不冷却。"""
+        self._finish("error", error)
+
+    def bench(self, reason: str) -> None:
+        """登录墙、空热搜等与账号相关的失败：冷却该组 Cookie。"""
+        self._finish("benched", reason)
+
+    def _finish(self, outcome: str, error: str = "") -> None:
+        if self._done:
+            return
+        self._done = True
+        self.pool.report(self.cookie_set, outcome, error)
+
+
+class CookiePool:
+    def __init__(self, path: str = COOKIE_POOL_FILE, state_path: str = COOKIE_STATE_FILE):
+        self.path = path
+        self.state_path = state_path
+        self.strategy = "lru"
+        self.sets: List[CookieSet] = []
+        self._rr = 0
+        self._lock = threading.Lock()
+        # 不为 None 时 report() 的结果同时追加到这里（进程池的工作进程据此把结果转给父进程）
+        self.journal: Optional[List[tuple]] = None
+        self.load()
+
+    def load(self) -> None:
+        sets: List[CookieSet] = []
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    cfg = json.load(f)
+                entries = cfg.get("cookies", []) if isinstance(cfg, dict) else cfg
+                if isinstance(cfg, dict) and cfg.get("strategy") in ("round_robin", "lru"):
+                    self.strategy = cfg["strategy"]
+                for i, e in enumerate(entries or []):
+                    if isinstance(e, str):
+                        e = {"cookie": e}
+                    cookie = (e.get("cookie") or "").strip() if isinstance(e, dict) else ""
+                    if cookie:
+                        sets.append(CookieSet(str(e.get("name") or f"cookie{i + 1}"), cookie))
+            except Exception as e:
+                print(f"读取 Cookie 池配置失败: {e}")
+        if not sets:
+            env_cookie = (os.environ.get("WEIBO_COOKIE") or "").strip()
+            if env_cookie:
+                sets.append(CookieSet("env", env_cookie))
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                for cs in sets:
+                    if cs.name in state:
+                        cs.restore(state[cs.name])
+        except Exception as e:
+            print(f"读取 Cookie 状态失败: {e}")
+        with self._lock:
+            self.sets = sets
+
+    def _save_state(self) -> None:
+        try:
+            data = {cs.name: cs.state() for cs in self.sets}
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.state_path)
+        except Exception as e:
+            print(f"保存 Cookie 状态失败: {e}")
+
+    def acquire(self) -> Optional[CookieLease]:
+        """取一组可用 Cookie；池为空或全部处于冷却时返回 None（不带 Cookie 请求）。"""
+        now = time.time()
+        with self._lock:
+            ready = [cs for cs in self.sets if cs.available(now)]
+            if not ready:
+                return None
+            if self.strategy == "round_robin":
+                cs = ready[self._rr % len(ready)]
+                self._rr += 1
+            else:
+                cs = min(ready, key=lambda c: c.last_used)
+            cs.last_used = now
+            if self.journal is not None:
+                self.journal.append((cs.name, "used", ""))
+        return CookieLease(self, cs)
+
+    def report(self, cs: CookieSet, outcome: str, error: str = "") -> None:
+        benched = self._apply(cs, outcome, error)
+        if self.journal is not None:
+            self.journal.append((cs.name, outcome, error))
+        COOKIE_REQUESTS.inc(cookie=cs.name, outcome=outcome)
+        COOKIE_BENCHED.set(benched, cookie=cs.name)
+
+    def replay(self, name: str, outcome: str, error: str = "") -> None:
+        """应用其他进程上报的结果（请求计数已随其指标增量汇总，这里不再计数）。"""
+        cs = next((c for c in self.sets if c.name == name), None)
+        if cs is None:
+            return
+        if outcome == "used":
+            # 轮换用的最近使用时间，让各进程按同一个 LRU 顺序取 Cookie
+            with self._lock:
+                cs.last_used = time.time()
+            return
+        COOKIE_BENCHED.set(self._apply(cs, outcome, error), cookie=name)
+
+    def _apply(self, cs: CookieSet, outcome: str, error: str) -> int:
+        with self._lock:
+            if outcome == "ok":
+                cs.successes += 1
+                cs.bench_count = 0
+            else:
+                cs.failures += 1
+                cs.last_error = error
+                if outcome == "benched":
+                    cs.bench_count += 1
+                    hold = min(BENCH_BASE_S * (2 ** (cs.bench_count - 1)), BENCH_CAP_S)
+                    cs.benched_until = time.time() + hold
+                    print(f"微博 Cookie {cs.name} 冷却 {hold / 60:.0f} 分钟：{error}")
+            self._save_state()
+            return 0 if cs.available(time.time()) else 1
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [dict(name=cs.name, **cs.state()) for cs in self.sets]
+
+    def states(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {cs.name: cs.state() for cs in self.sets}
+
+    def absorb(self, states: Dict[str, Dict]) -> None:
+        """以另一进程的状态（states() 的结果）为准覆盖同名 Cookie 的冷却与计数。"""
+        now = time.time()
+        with self._lock:
+            for cs in self.sets:
+                if cs.name in states:
+                    cs.restore(states[cs.name])
+                    COOKIE_BENCHED.set(0 if cs.available(now) else 1, cookie=cs.name)
+
+
+_pool: Optional[CookiePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_cookie_pool() -> CookiePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CookiePool()
+        return _pool
+
+
+def acquire() -> Optional[CookieLease]:
+    return get_cookie_pool().acquire()
@@ -0,0 +1,63 @@
+"""
+任务级时间预算：一次运行（例如定时任务）给定总预算，沿 scrape_items 传给每个抓取函数，
+各步骤（浏览器启动、页面跳转、等待选择器、HTTP 请求……）的超时取“本步骤默认超时”与
+“剩余预算”中的较小者；预算用完时步骤之间抛出 DeadlineExceeded，已完成的渠道照常返回，
+进行中的渠道标记为不完整（partial）。
+
+默认预算由环境变量 HOT_RUN_BUDGET_S 指定（秒，默认 45；设为 0 表示不限）。
+"""
+import os
+import time
+from typing import Optional
+
+DEFAULT_BUDGET_S = 45.0
+
+# 传给 Playwright 的超时不能为 0（0 表示不限时），至少给 1 毫秒
+_MIN_TIMEOUT_S = 0.001
+
+
+class DeadlineExceeded(TimeoutError):
+    """运行的时间预算已用完。"""
+
+
+class Deadline:
+    """截止时间；budget_s 为 None 或 0 时不限时，各步骤使用其默认超时。"""
+
+    def __init__(self, budget_s: Optional[float] = None):
+        self.budget_s = budget_s if budget_s and budget_s > 0 else None
+        self.expires_at = time.monotonic() + self.budget_s if self.budget_s else None
+
+    @classmethod
+    def from_env(cls, budget_s: Optional[float] = None) -> "Deadline":
+        """budget_s 未指定时读取 HOT_RUN_BUDGET_S，缺省为 DEFAULT_BUDGET_S。"""
+        if budget_s is None:
+            try:
+                budget_s = float(os.environ.get("HOT_RUN_BUDGET_S", DEFAULT_BUDGET_S))
+            except ValueError:
+                budget_s = DEFAULT_BUDGET_S
+        return cls(budget_s)
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, what: str = "") -> None:
+        if self.expired():
+            raise DeadlineExceeded(f"超出时间预算 {self.budget_s:g}s" + (f"（{what}）" if what else ""))
+
+    def timeout_s(self, step_s: float, what: str = "") -> float:
+        """本步骤可用的超时（秒）：默认超时与剩余预算取小；预算已用完时抛出 DeadlineExceeded。"""
+        self.check(what)
+        return max(_MIN_TIMEOUT_S, min(step_s, self.remaining()))
+
+    def timeout_ms(self, step_ms: float, what: str = "") -> float:
+        """同 timeout_s，单位毫秒（Playwright 接口使用）。"""
+        return self.timeout_s(step_ms / 1000.0, what) * 1000.0
+
+
+def unbounded() -> Deadline:
+    return Deadline(None)
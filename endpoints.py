@@ -0,0 +1,27 @@
+import os
+
+# 各抓取目标的基础地址。可通过环境变量 HOT_BASE_URL_<KEY>（如 HOT_BASE_URL_WEIBO）覆盖，
+# 用于把抓取函数指向本地替身服务（离线基准测试）或自建镜像。
+# 仅影响请求地址；写入结果中的条目链接仍指向真实站点。
+DEFAULT_BASE_URLS = {
+    "weibo": "https://weibo.com",
+    "weibo_s": "https://s.weibo.com",
+    "weibo_mirror": "https://r.jina.ai",
+    "toutiao": "https://www.toutiao.com",
+    "reddit": "https://www.reddit.com",
+    "hn_api": "https://hacker-news.firebaseio.com",
+    "hn": "https://news.ycombinator.com",
+}
+
+
+def env_key(key: str) -> str:
+    return "HOT_BASE_URL_" + key.upper()
+
+
+def base_url(key: str) -> str:
+    return (os.environ.get(env_key(key)) or DEFAULT_BASE_URLS[key]).rstrip("/")
+
+
+def url(key: str, path: str = "/") -> str:
+    """拼接请求地址：url("weibo", "/ajax/side/hotSearch")。"""
+    return base_url(key) + path
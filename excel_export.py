@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import tempfile
+from datetime import datetime
+from typing import List, Dict, Iterable, Tuple, Optional
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+# (表头, item 字段)
+DEFAULT_COLUMNS: List[Tuple[str, str]] = [
+    ("排名", "rank"),
+    ("标题", "title"),
+    ("链接", "link"),
+    ("渠道", "channel"),
+    ("抓取时间", "fetched_at"),
+]
+# 已标注排名变化时追加的列
+DELTA_COLUMNS: List[Tuple[str, str]] = [
+    ("排名变化", "rank_delta"),
+    ("是否新上榜", "is_new"),
+    ("首次上榜时间", "first_seen"),
+    ("在榜分钟", "minutes_on_board"),
+]
+MAX_COL_WIDTH = 80
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _sheet_title(name: str) -> str:
+    return (_INVALID_SHEET_CHARS.sub("_", name or "Sheet") or "Sheet")[:31]
+
+
+def _cell_value(it: Dict, key: str, ts: str, default_channel: str):
+    if key == "channel":
+        return it.get("channel") or default_channel
+    if key == "fetched_at":
+        return it.get("fetched_at") or ts
+    if key == "is_new":
+        v = it.get("is_new")
+        return "" if v is None else ("是" if v else "否")
+    return it.get(key)
+
+
+class _SheetSpool:
+    """单个工作表的临时行缓存：边写入边统计列宽，内存占用与行数无关。"""
+
+    def __init__(self, title: str, headers: List[str]):
+        self.title = title
+        self.file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self.rows = 0
+        self.widths = [len(h) for h in headers]
+
+    def add(self, row: list) -> None:
+        for i, v in enumerate(row):
+            if v:
+                n = len(str(v))
+                if n > self.widths[i]:
+                    self.widths[i] = n
+        self.file.write(json.dumps(row, ensure_ascii=False))
+        self.file.write("\n")
+        self.rows += 1
+
+    def iter_rows(self) -> Iterable[list]:
+        self.file.seek(0)
+        for line in self.file:
+            yield json.loads(line)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ExcelStreamWriter:
+    """
+    增量写入 xlsx：add() 逐条接收 item（写入临时文件并统计列宽），save() 时按已知列宽
+    以 openpyxl write-only 模式流式写出。内存占用与行数无关。
+    """
+
+    def __init__(
+        self,
+        columns: Optional[List[Tuple[str, str]]] = None,
+        sheet_per_channel: bool = False,
+        sheet_title: str = "Top30",
+        default_channel: str = "微博",
+    ):
+        self.base_columns = list(columns or DEFAULT_COLUMNS)
+        self.all_columns = self.base_columns + [c for c in DELTA_COLUMNS if c not in self.base_columns]
+        self.headers = [h for h, _ in self.all_columns]
+        self.keys = [k for _, k in self.all_columns]
+        self.sheet_per_channel = sheet_per_channel
+        self.sheet_title = sheet_title
+        self.default_channel = default_channel
+        self.ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.with_delta = False
+        self.rows = 0
+        self._spools: Dict[str, _SheetSpool] = {}
+
+    def add(self, it: Dict) -> None:
+        if not self.with_delta and "is_new" in it:
+            self.with_delta = True
+        name = (it.get("channel") or self.default_channel) if self.sheet_per_channel else self.sheet_title
+        spool = self._spools.get(name)
+        if spool is None:
+            spool = self._spools[name] = _SheetSpool(_sheet_title(name), self.headers)
+        spool.add([_cell_value(it, k, self.ts, self.default_channel) for k in self.keys])
+        self.rows += 1
+
+    def save(self, path: str) -> int:
+        """写出工作簿并释放临时文件，返回写入行数。"""
+        try:
+            n_cols = len(self.all_columns) if self.with_delta else len(self.base_columns)
+            wb = Workbook(write_only=True)
+            if not self._spools:
+                self._spools[self.sheet_title] = _SheetSpool(_sheet_title(self.sheet_title), self.headers)
+            for spool in self._spools.values():
+                ws = wb.create_sheet(spool.title)
+                # 列宽与冻结首行必须在写入第一行之前设置
+                for i in range(n_cols):
+                    col = ws.column_dimensions[get_column_letter(i + 1)]
+                    col.width = min(spool.widths[i] * 1.2, MAX_COL_WIDTH)
+                ws.freeze_panes = "A2"
+                ws.append(self.headers[:n_cols])
+                for row in spool.iter_rows():
+                    ws.append(row[:n_cols])
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            wb.save(path)
+            return self.rows
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for spool in self._spools.values():
+            spool.close()
+        self._spools = {}
+
+
+def export_items_to_excel(
+    items: Iterable[Dict],
+    path: str,
+    columns: Optional[List[Tuple[str, str]]] = None,
+    sheet_per_channel: bool = False,
+    sheet_title: str = "Top30",
+    default_channel: str = "微博",
+) -> int:
+    """
+    流式导出 items 到 xlsx（openpyxl write-only 模式），返回写入行数。
+
+    items 可以是任意迭代器（如历史库查询结果）。行先写入临时文件并同时统计列宽，
+    随后按已知列宽流式写出，整个过程内存占用恒定。
+    sheet_per_channel=True 时每个渠道单独一个工作表。
+    若 items 标注了排名变化（is_new），自动追加对应列。
+    """
+    writer = ExcelStreamWriter(columns, sheet_per_channel, sheet_title, default_channel)
+    try:
+        for it in items:
+            writer.add(it)
+    except Exception:
+        writer.close()
+        raise
+    return writer.save(path)
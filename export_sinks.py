@@ -0,0 +1,209 @@
+import os
+import io
+import csv
+import json
+from datetime import datetime
+from typing import List, Dict, Iterable, Optional, Tuple
+
+from excel_export import ExcelStreamWriter, DEFAULT_COLUMNS, DELTA_COLUMNS
+
+# 机器消费格式统一使用的字段（按顺序）
+SINK_FIELDS = [k for _, k in DEFAULT_COLUMNS + DELTA_COLUMNS] + ["hot_value"]
+
+
+class ExportSink:
+    """
+    导出目标的统一接口：write() 逐条接收 item，close() 完成写出。
+    rows / bytes_written 报告已写入的行数与字节数。
+    """
+
+    kind = ""
+    extension = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._bytes = 0
+        self._ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @property
+    def bytes_written(self) -> int:
+        return self._bytes
+
+    def _normalize(self, it: Dict) -> Dict:
+        row = dict(it)
+        row.setdefault("fetched_at", self._ts)
+        if not row.get("channel"):
+            row["channel"] = "微博"
+        return row
+
+    def write(self, it: Dict) -> None:
+        raise NotImplementedError
+
+    def write_many(self, items: Iterable[Dict]) -> int:
+        n = 0
+        for it in items:
+            self.write(it)
+            n += 1
+        return n
+
+    def close(self) -> None:
+        pass
+
+    def summary(self) -> str:
+        return f"{self.rows} 行 / {self.bytes_written / 1024:.1f} KB"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class JsonlSink(ExportSink):
+    """每行一个 JSON 对象，逐条落盘。"""
+
+    kind = "jsonl"
+    extension = ".jsonl"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._f = open(path, "wb")
+
+    def write(self, it: Dict) -> None:
+        data = (json.dumps(self._normalize(it), ensure_ascii=False) + "\n").encode("utf-8")
+        self._f.write(data)
+        self._bytes += len(data)
+        self.rows += 1
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class CsvSink(ExportSink):
+    """UTF-8（带 BOM，便于 Excel 直接打开）CSV，表头为固定字段名。"""
+
+    kind = "csv"
+    extension = ".csv"
+
+    def __init__(self, path: str, fields: Optional[List[str]] = None):
+        super().__init__(path)
+        self.fields = fields or SINK_FIELDS
+        self._f = open(path, "wb")
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf)
+        self._emit(b"\xef\xbb\xbf" + self._encode_row(self.fields))
+
+    def _encode_row(self, row: list) -> bytes:
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._writer.writerow(row)
+        return self._buf.getvalue().encode("utf-8")
+
+    def _emit(self, data: bytes) -> None:
+        self._f.write(data)
+        self._bytes += len(data)
+
+    def write(self, it: Dict) -> None:
+        row = self._normalize(it)
+        values = []
+        for k in self.fields:
+            v = row.get(k)
+            if isinstance(v, bool):
+                v = int(v)
+            values.append("" if v is None else v)
+        self._emit(self._encode_row(values))
+        self.rows += 1
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class ColumnarSink(ExportSink):
+    """列式归档（snapshot_archive 格式），每 segment_rows 行或关闭时写出一个段。"""
+
+    kind = "columnar"
+    extension = ".hotarc"
+
+    def __init__(self, path: str, segment_rows: int = 1000):
+        super().__init__(path)
+        from snapshot_archive import ArchiveWriter
+
+        self._start_size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._writer = ArchiveWriter(path)
+        self._segment_rows = segment_rows
+        self._pending: List[Dict] = []
+
+    @property
+    def bytes_written(self) -> int:
+        try:
+            return os.path.getsize(self.path) - self._start_size
+        except OSError:
+            return 0
+
+    def write(self, it: Dict) -> None:
+        self._pending.append(self._normalize(it))
+        self.rows += 1
+        if len(self._pending) >= self._segment_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._writer.append_items(self._pending)
+            self._pending = []
+
+    def close(self) -> None:
+        self._flush()
+
+
+class ExcelSink(ExportSink):
+    """xlsx（流式 write-only）；行在 close() 时写出。"""
+
+    kind = "excel"
+    extension = ".xlsx"
+
+    def __init__(self, path: str, columns: Optional[List[Tuple[str, str]]] = None, sheet_per_channel: bool = False):
+        super().__init__(path)
+        self._writer = ExcelStreamWriter(columns, sheet_per_channel=sheet_per_channel)
+        self._closed = False
+
+    def write(self, it: Dict) -> None:
+        self._writer.add(it)
+        self.rows += 1
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.save(self.path)
+        self._bytes = os.path.getsize(self.path)
+
+
+SINKS = {cls.kind: cls for cls in (ExcelSink, CsvSink, JsonlSink, ColumnarSink)}
+# 界面显示名称 -> 类型
+SINK_LABELS = {"Excel": "excel", "CSV": "csv", "JSONL": "jsonl", "列式归档": "columnar"}
+
+
+def sink_kind_for_path(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    for kind, cls in SINKS.items():
+        if cls.extension == ext:
+            return kind
+    return "excel"
+
+
+def open_sink(kind: str, path: str, **kwargs) -> ExportSink:
+    """
+    按类型创建导出目标。path 未带扩展名时自动补全；kwargs 仅传给支持的类型
+    （Excel 的 columns / sheet_per_channel）。
+    """
+    cls = SINKS.get(kind or "excel", ExcelSink)
+    if not os.path.splitext(path)[1]:
+        path += cls.extension
+    if cls is ExcelSink:
+        return cls(path, **kwargs)
+    return cls(path)
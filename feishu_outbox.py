@@ -0,0 +1,399 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import metrics
+from feishu_utils import (
+    SDK_AVAILABLE,
+    CLIENT_TOKEN_SUPPORTED,
+    ensure_fields_exist,
+    build_record_fields,
+    build_sample_fields,
+    create_bitable_record,
+    route_items,
+)
+
+try:
+    from baseopensdk import BaseClient
+except ImportError:
+    BaseClient = None
+
+# 发件箱目录：抓取结果先落盘，再异步写入多维表
+OUTBOX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox")
+
+# 重试退避：base * 2^attempts，封顶 cap 秒，并加入少量抖动
+BACKOFF_BASE_S = 5.0
+BACKOFF_CAP_S = 600.0
+# 排他锁超过该时长未刷新视为进程已崩溃，可被接管
+LOCK_STALE_S = 600.0
+
+# 幂等键命名空间：client_token = uuid5(NS, "<batch_id>:<index>")
+_TOKEN_NS = uuid.UUID("5f0b7c1e-3a57-4f0e-9a53-7e1f1d0c2b6a")
+
+
+def _fsync_write(path: str, data: str) -> None:
+    """原子写入：先写临时文件并 fsync，再 os.replace 覆盖。"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class FeishuOutbox:
+    """
+    多维表写入的持久化发件箱。
+
+    每个批次保存为 <id>.json（目标 + items + 重试状态），已写入的行号逐条追加到 <id>.done
+    日志并 fsync。进程崩溃或重启后从日志断点继续；每行带确定性的 client_token，
+    即使“写入成功但日志未落盘”也不会产生重复记录。
+
+    SDK 不支持 client_token 时，每行发送前先在日志中记一行 "?<行号>"，接口明确返回失败时记 "!<行号>" 撤销，
+    该行照常退避重试；只有调用中抛出异常或进程崩溃（结果未知）的行，之后不再重发（可能重复），
+    而是计入结果的 uncertain 并告警，需要人工核对。
+    """
+
+    def __init__(self, directory: str = OUTBOX_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    # ----- 路径 -----
+    def _batch_path(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.json")
+
+    def _done_path(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.done")
+
+    def _lock_path(self) -> str:
+        return os.path.join(self.directory, ".drain.lock")
+
+    # ----- 入队 -----
+    def enqueue(self, items: List[Dict], dest: Dict) -> Optional[str]:
+        """将一批 items 提交到发件箱（落盘后返回批次 ID）。"""
+        if not items:
+            return None
+        batch_id = datetime.now().strftime("%Y%m%d%H%M%S") + "_" + uuid.uuid4().hex[:8]
+        batch = {
+            "id": batch_id,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            # 抓取时间在入队时固定，重试不改变记录内容
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "dest": {
+                "app_token": dest["app_token"],
+                "table_id": dest["table_id"],
+                "pbt": dest["pbt"],
+            },
+            "items": [dict(it) for it in items],
+            "attempts": 0,
+            "next_attempt_at": 0,
+            "last_error": "",
+        }
+        _fsync_write(self._batch_path(batch_id), json.dumps(batch, ensure_ascii=False))
+        return batch_id
+
+    def enqueue_destinations(self, items: List[Dict], destinations: List[Dict]) -> List[str]:
+        """按目标路由规则拆分后分别入队。"""
+        ids = []
+        for dest in destinations:
+            batch_id = self.enqueue(route_items(items, dest), dest)
+            if batch_id:
+                ids.append(batch_id)
+        return ids
+
+    # ----- 读取状态 -----
+    def _load_batch(self, batch_id: str) -> Optional[Dict]:
+        try:
+            with open(self._batch_path(batch_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _load_journal(self, batch_id: str):
+        """
+        读取日志：返回 (已写入的行号, 已发送但未确认的行号)。
+        按顺序回放："<行号>" 已写入，"?<行号>" 已发送，"!<行号>" 接口明确返回失败（撤销发送标记，照常重试）。
+        """
+        done, sent = set(), set()
+        try:
+            with open(self._done_path(batch_id), "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.isdigit():
+                        done.add(int(line))
+                    elif line[:1] in ("?", "!") and line[1:].isdigit():
+                        if line[0] == "?":
+                            sent.add(int(line[1:]))
+                        else:
+                            sent.discard(int(line[1:]))
+        except FileNotFoundError:
+            pass
+        return done, sent - done
+
+    def _load_done(self, batch_id: str) -> set:
+        return self._load_journal(batch_id)[0]
+
+    def batch_ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-5] for n in names if n.endswith(".json"))
+
+    def backlog(self) -> Dict:
+        """返回积压情况：批次数、待写入条数、最近一次错误。"""
+        batches = 0
+        rows = 0
+        last_error = ""
+        for batch_id in self.batch_ids():
+            batch = self._load_batch(batch_id)
+            if not batch:
+                continue
+            pending = len(batch.get("items", [])) - len(self._load_done(batch_id))
+            if pending <= 0:
+                continue
+            batches += 1
+            rows += pending
+            last_error = batch.get("last_error") or last_error
+        return {"batches": batches, "rows": rows, "last_error": last_error}
+
+    # ----- 排他锁（跨进程：GUI 与后台进程不会同时写同一批次） -----
+    def _acquire_lock(self) -> bool:
+        path = self._lock_path()
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            fd = self._take_over_stale_lock(path)
+            if fd is None:
+                return False
+        except OSError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+
+    def _take_over_stale_lock(self, path: str) -> Optional[int]:
+        """
+        接管过期的锁。接管本身用另一个 O_EXCL 文件互斥：多个进程同时发现锁过期时只有一个能拿到
+        接管权，并在拿到后重新确认锁仍是过期的那一把，再删除重建；其余进程直接放弃。
+        """
+        guard = path + ".takeover"
+        try:
+            if time.time() - os.path.getmtime(path) < LOCK_STALE_S:
+                return None
+            gfd = os.open(guard, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # 接管者在删除接管文件前崩溃：接管文件同样过期后清理，下一轮再抢
+            try:
+                if time.time() - os.path.getmtime(guard) >= LOCK_STALE_S:
+                    os.remove(guard)
+            except OSError:
+                pass
+            return None
+        except OSError:
+            return None
+        try:
+            os.close(gfd)
+            try:
+                if time.time() - os.path.getmtime(path) < LOCK_STALE_S:
+                    return None  # 别人已在我们之前接管并刷新了锁
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            try:
+                return os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except OSError:
+                return None
+        finally:
+            try:
+                os.remove(guard)
+            except OSError:
+                pass
+
+    def _touch_lock(self) -> None:
+        try:
+            os.utime(self._lock_path(), None)
+        except OSError:
+            pass
+
+    def _release_lock(self) -> None:
+        try:
+            os.remove(self._lock_path())
+        except OSError:
+            pass
+
+    # ----- 投递 -----
+    def _drain_batch(self, batch_id: str) -> Dict:
+        batch = self._load_batch(batch_id)
+        res = {"id": batch_id, "ok": 0, "total": 0, "error": "", "uncertain": 0}
+        if not batch:
+            return res
+        dest = batch["dest"]
+        items = batch.get("items", [])
+        done, sent = self._load_journal(batch_id)
+        res["total"] = len(items)
+        try:
+            client = BaseClient.builder().app_token(dest["app_token"]).personal_base_token(dest["pbt"]).build()
+            field_types = {}
+            if items:
+                field_types = ensure_fields_exist(client, dest["app_token"], dest["table_id"], build_sample_fields(items[0], batch["ts"]))
+            with open(self._done_path(batch_id), "a", encoding="utf-8") as journal:
+                for idx, it in enumerate(items):
+                    if idx in done:
+                        continue
+                    if not CLIENT_TOKEN_SUPPORTED:
+                        if idx in sent:
+                            # 上次已发出但未确认，没有幂等键时重发可能重复：跳过并告警
+                            print(f"发件箱批次 {batch_id} 第 {idx} 行状态未知，SDK 不支持 client_token，不自动重发，请人工核对")
+                            journal.write(f"{idx}\n")
+                            journal.flush()
+                            os.fsync(journal.fileno())
+                            res["uncertain"] += 1
+                            continue
+                        journal.write(f"?{idx}\n")
+                        journal.flush()
+                        os.fsync(journal.fileno())
+                    token = str(uuid.uuid5(_TOKEN_NS, f"{batch_id}:{idx}"))
+                    fields = build_record_fields(it, batch["ts"], field_types)
+                    if not create_bitable_record(client, dest["app_token"], dest["table_id"], fields, client_token=token):
+                        # 接口已明确答复未创建记录：不是“状态未知”，撤销发送标记，退避后重试该行
+                        if not CLIENT_TOKEN_SUPPORTED:
+                            journal.write(f"!{idx}\n")
+                            journal.flush()
+                            os.fsync(journal.fileno())
+                        raise RuntimeError("写入失败（接口未返回 record_id，可能限频或授权失效）")
+                    journal.write(f"{idx}\n")
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    res["ok"] += 1
+                    self._touch_lock()
+        except Exception as e:
+            attempts = int(batch.get("attempts", 0)) + 1
+            delay = min(BACKOFF_BASE_S * (2 ** (attempts - 1)), BACKOFF_CAP_S)
+            batch["attempts"] = attempts
+            batch["next_attempt_at"] = time.time() + delay * random.uniform(0.8, 1.2)
+            batch["last_error"] = str(e)
+            _fsync_write(self._batch_path(batch_id), json.dumps(batch, ensure_ascii=False))
+            res["error"] = str(e)
+            return res
+        # 全部写完：删除批次文件与日志
+        for path in (self._batch_path(batch_id), self._done_path(batch_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return res
+
+    def drain(self, force: bool = False, max_workers: int = 4) -> List[Dict]:
+        """
+        投递到期的批次。不同文档并行，同一文档内按批次顺序串行。
+        force=True 时忽略退避时间，立即重试全部批次。返回每个批次的结果；
+        发件箱正被其他进程投递时不做任何事，返回一条 locked 为 True 的结果（批次已落盘，由持锁者或下一轮写入）。
+        """
+        if not SDK_AVAILABLE or BaseClient is None:
+            raise RuntimeError("BaseOpenSDK 未安装，无法写入飞书。")
+        with self._lock:
+            if not self._acquire_lock():
+                return [{"id": "", "ok": 0, "total": 0, "error": "", "uncertain": 0, "locked": True}]
+            try:
+                now = time.time()
+                groups: Dict[str, List[str]] = {}
+                for batch_id in self.batch_ids():
+                    batch = self._load_batch(batch_id)
+                    if not batch:
+                        continue
+                    if not force and batch.get("next_attempt_at", 0) > now:
+                        continue
+                    groups.setdefault(batch["dest"]["app_token"], []).append(batch_id)
+                if not groups:
+                    return []
+
+                def drain_group(ids: List[str]) -> List[Dict]:
+                    out = []
+                    for batch_id in ids:
+                        r = self._drain_batch(batch_id)
+                        out.append(r)
+                        if r["error"]:
+                            # 同一文档出错（多为限频/授权），后续批次等下一轮再试
+                            break
+                    return out
+
+                results: List[Dict] = []
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as pool:
+                    for group_res in pool.map(drain_group, groups.values()):
+                        results.extend(group_res)
+                return results
+            finally:
+                self._release_lock()
+
+
+class OutboxStream:
+    """
+    流式入队：边抓取边 write()，每满 batch_size 条或渠道切换时落盘为一个批次，
+    并在后台单线程中投递，使写入与尚未完成的抓取重叠。close() 落盘剩余条目、
+    等待投递结束并返回全部结果。
+    """
+
+    def __init__(self, outbox: FeishuOutbox, destinations: List[Dict], batch_size: int = 50):
+        self.outbox = outbox
+        self.destinations = destinations
+        self.batch_size = max(1, batch_size)
+        self.rows = 0
+        self._buf: List[Dict] = []
+        self._channel = None
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    def write(self, it: Dict) -> None:
+        ch = it.get("channel")
+        if self._buf and ch != self._channel:
+            self.flush()
+        self._channel = ch
+        self._buf.append(it)
+        self.rows += 1
+        if len(self._buf) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        self.outbox.enqueue_destinations(self._buf, self.destinations)
+        self._buf = []
+        self._futures.append(self._pool.submit(self.outbox.drain))
+
+    def close(self) -> List[Dict]:
+        self.flush()
+        results: List[Dict] = []
+        try:
+            for fut in self._futures:
+                try:
+                    results.extend(fut.result())
+                except Exception as e:
+                    print(f"飞书投递失败: {e}")
+        finally:
+            self._futures = []
+            self._pool.shutdown(wait=True)
+            metrics.write_textfile()
+        if any(r.get("locked") for r in results):
+            print("发件箱正由其他进程投递，部分批次已落盘，稍后写入")
+        return results
+
+
+def summarize_outbox_results(results: List[Dict], backlog: Dict) -> str:
+    ok = sum(r["ok"] for r in results)
+    msg = f"成功写入 {ok} 条记录"
+    if any(r.get("locked") for r in results):
+        msg += "，部分批次由其他进程投递中"
+    uncertain = sum(r.get("uncertain", 0) for r in results)
+    if uncertain:
+        msg += f"，{uncertain} 条状态未知未重发（SDK 不支持幂等写入，请人工核对）"
+    if backlog.get("rows"):
+        msg += f"，待重试 {backlog['rows']} 条（{backlog['batches']} 批）"
+    return msg
@@ -1,6 +1,13 @@
 import os
+import threading
+import time
+from typing import List, Dict
+
+import metrics
 
 try:
+    from baseopensdk.api.base.v1.model.app_table_record import AppTableRecord
+    from baseopensdk.api.base.v1.model.create_app_table_record_request import CreateAppTableRecordRequest
     from baseopensdk.api.base.v1.model.app_table_field import AppTableField
     from baseopensdk.api.base.v1.model.create_app_table_field_request import CreateAppTableFieldRequest
     from baseopensdk.api.base.v1.model.list_app_table_field_request import ListAppTableFieldRequest
@@ -8,11 +15,27 @@ try:
 except ImportError:
     SDK_AVAILABLE = False
 
+# 旧版 SDK 的写入请求没有 client_token（幂等键）：此时重发可能产生重复记录，发件箱会拒绝自动重发未确认的行
+CLIENT_TOKEN_SUPPORTED = False
+if SDK_AVAILABLE:
+    try:
+        CLIENT_TOKEN_SUPPORTED = hasattr(CreateAppTableRecordRequest.builder(), "client_token")
+    except Exception:
+        CLIENT_TOKEN_SUPPORTED = False
+    if not CLIENT_TOKEN_SUPPORTED:
+        print("警告：当前 BaseOpenSDK 不支持 client_token，写入无法幂等；"
+              "发件箱不会自动重发状态未知的记录，请升级 SDK。")
+
 def ensure_fields_exist(client, app_token, table_id, sample_data):
     """
     检查多维表中是否存在 sample_data 中的字段，如果不存在则自动创建。
     返回现有字段的名称和类型字典 {name: type}。
     """
+    with metrics.stage("ensure_fields", sample_data.get("渠道") or "", "bitable"):
+        return _ensure_fields_exist(client, app_token, table_id, sample_data)
+
+
+def _ensure_fields_exist(client, app_token, table_id, sample_data):
     if not SDK_AVAILABLE:
         print("BaseOpenSDK 未安装，无法执行字段检查。")
         return {}
@@ -70,3 +93,158 @@ def ensure_fields_exist(client, app_token, table_id, sample_data):
     except Exception as e:
         print(f"检查或创建字段时发生错误: {e}")
         return {}
+
+
+# PBT 单文档限频 2 QPS：同一 app_token 下的所有表共享一个限速器
+DOC_QPS = 2.0
+_doc_limiters: Dict[str, "DocRateLimiter"] = {}
+_doc_limiters_lock = threading.Lock()
+
+
+class DocRateLimiter:
+    """简单的间隔限速器，保证同一文档的请求间隔不小于 1/qps 秒（线程安全）。"""
+
+    def __init__(self, qps: float = DOC_QPS):
+        self.interval = 1.0 / qps if qps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait_s = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait_s > 0:
+            time.sleep(wait_s)
+
+
+def get_doc_limiter(app_token: str) -> DocRateLimiter:
+    with _doc_limiters_lock:
+        lim = _doc_limiters.get(app_token)
+        if lim is None:
+            lim = DocRateLimiter()
+            _doc_limiters[app_token] = lim
+        return lim
+
+
+def build_record_fields(it: Dict, ts: str, field_types: Dict) -> Dict:
+    """将一条抓取结果转换为多维表记录字段。"""
+    fields = {
+        "排名": it.get("rank"),
+        "标题": it.get("title"),
+        "链接": it.get("link"),  # 默认使用纯文本链接
+        "渠道": it.get("channel") or "微博",
+        "抓取时间": it.get("fetched_at") or ts,
+    }
+    # 如果确定是超链接字段(15)，则使用对象格式
+    if field_types.get("链接") == 15:
+        fields["链接"] = {"text": it.get("title"), "link": it.get("link")}
+    if "hot_value" in it:
+        fields["热度"] = it["hot_value"]
+    fields.update(rank_delta_fields(it))
+    return fields
+
+
+def rank_delta_fields(it: Dict) -> Dict:
+    """排名变化相关的可选字段（仅当 item 已标注时写入）。"""
+    fields = {}
+    if it.get("rank_delta") is not None:
+        fields["排名变化"] = it["rank_delta"]
+    if "is_new" in it:
+        fields["是否新上榜"] = "是" if it["is_new"] else "否"
+    if it.get("first_seen"):
+        fields["首次上榜时间"] = it["first_seen"]
+    if it.get("minutes_on_board") is not None:
+        fields["在榜分钟"] = it["minutes_on_board"]
+    return fields
+
+
+def build_sample_fields(first_item: Dict, ts: str) -> Dict:
+    """构造样本数据，优先使用复杂类型以触发字段自动创建。"""
+    sample_fields = {
+        "排名": first_item.get("rank"),
+        "标题": first_item.get("title"),
+        "链接": {"text": first_item.get("title"), "link": first_item.get("link")},
+        "渠道": first_item.get("channel") or "微博",
+        "抓取时间": ts,
+    }
+    if "hot_value" in first_item:
+        sample_fields["热度"] = first_item["hot_value"]
+    if "is_new" in first_item:
+        # 新上榜条目的排名变化为空，样本用 0 以便创建数字字段
+        sample_fields.update({"排名变化": 0, "是否新上榜": "是", "首次上榜时间": ts, "在榜分钟": 0})
+    return sample_fields
+
+
+def create_bitable_record(client, app_token: str, table_id: str, fields: Dict, client_token: str | None = None) -> bool:
+    """
+    写入一条记录（受文档级限速控制），成功返回 True。
+    client_token 为幂等键：同一 token 重复提交时服务端只会创建一条记录（仅 CLIENT_TOKEN_SUPPORTED 时生效）。
+    """
+    channel = fields.get("渠道") or ""
+    with metrics.stage("rate_limit_wait", channel, "bitable"):
+        get_doc_limiter(app_token).acquire()
+    body = AppTableRecord.builder().fields(fields).build()
+    builder = (
+        CreateAppTableRecordRequest
+        .builder()
+        .app_token(app_token)
+        .table_id(table_id)
+        .request_body(body)
+    )
+    if client_token and CLIENT_TOKEN_SUPPORTED:
+        builder = builder.client_token(client_token)
+    req = builder.build()
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        resp = client.base.v1.app_table_record.create(req)
+        data = getattr(resp, "data", None)
+        rec = getattr(data, "record", None) if data else None
+        ok = bool(rec and getattr(rec, "record_id", None))
+        return ok
+    finally:
+        outcome = "ok" if ok else "error"
+        metrics.observe("create", time.perf_counter() - t0, channel, "bitable", outcome)
+        metrics.FEISHU_RECORDS_TOTAL.inc(channel=channel, outcome=outcome)
+
+
+# ===== 多目标分发 =====
+def normalize_destinations(task: Dict, fallback: Dict | None = None) -> List[Dict]:
+    """
+    从任务配置中解析写入目标列表。
+    新格式：task["destinations"] = [{"app_token", "table_id", "pbt", "channels": [...]}]，
+    channels 为空表示接收全部渠道；旧格式的单一 app_token/table_id/pbt 视为一个目标（主目标），
+    主目标的渠道规则为 task["primary_channels"]（缺省为全部渠道）。
+    fallback 用于补齐缺失的 app_token/pbt（例如全局配置）。
+    """
+    fallback = fallback or {}
+    dests: List[Dict] = []
+    primary = {
+        "app_token": task.get("app_token") or fallback.get("app_token") or "",
+        "table_id": task.get("table_id") or fallback.get("table_id") or "",
+        "pbt": task.get("pbt") or fallback.get("pbt") or "",
+        "channels": [str(c).strip() for c in (task.get("primary_channels") or []) if str(c).strip()],
+    }
+    if primary["app_token"] and primary["table_id"] and primary["pbt"]:
+        dests.append(primary)
+    for d in task.get("destinations") or []:
+        if not isinstance(d, dict):
+            continue
+        dest = {
+            "app_token": (d.get("app_token") or primary["app_token"]).strip(),
+            "table_id": (d.get("table_id") or "").strip(),
+            "pbt": (d.get("pbt") or primary["pbt"]).strip(),
+            "channels": [str(c).strip() for c in (d.get("channels") or []) if str(c).strip()],
+        }
+        if dest["app_token"] and dest["table_id"] and dest["pbt"]:
+            dests.append(dest)
+    return dests
+
+
+def route_items(items: List[Dict], dest: Dict) -> List[Dict]:
+    """按目标的渠道规则筛选 items；channels 为空则全部写入。"""
+    channels = dest.get("channels") or []
+    if not channels:
+        return list(items)
+    return [it for it in items if (it.get("channel") or "微博") in channels]
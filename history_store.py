@@ -0,0 +1,273 @@
+import os
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+from typing import List, Dict, Iterator, Optional
+
+from hot_item import HotItem
+
+# 本地快照库：所有渠道的每次抓取结果都保存为一个快照
+HISTORY_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hot_history.db")
+
+# 每批 executemany 的行数
+INSERT_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    item_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    channel TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    rank INTEGER,
+    title TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    link TEXT,
+    hot_value TEXT
+);
+CREATE TABLE IF NOT EXISTS board (
+    channel TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    title TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    stint_start TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_rank INTEGER,
+    last_snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (channel, norm_title)
+);
+CREATE INDEX IF NOT EXISTS idx_board_last_snapshot ON board(channel, last_snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_snapshots_channel_time ON snapshots(channel, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_items_channel_time ON items(channel, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_items_norm_title ON items(norm_title);
+CREATE INDEX IF NOT EXISTS idx_items_snapshot ON items(snapshot_id);
+"""
+
+_PUNCT_RE = re.compile(r"[\s#＃【】\[\]（）()《》<>“”\"'‘’!！?？,，.。:：;；、|·\-—_~]+")
+
+
+def normalize_title(title: str) -> str:
+    """标题归一化：全半角统一、小写、去除空白与常见标点（如微博话题的 #）。"""
+    if not title:
+        return ""
+    s = unicodedata.normalize("NFKC", str(title)).lower()
+    return _PUNCT_RE.sub("", s)
+
+
+def _row_to_item(row: sqlite3.Row) -> HotItem:
+    return HotItem(row["rank"], row["title"], row["link"] or "", row["channel"], row["hot_value"], row["fetched_at"])
+
+
+class HistoryStore:
+    """
+    基于 SQLite 的快照历史库。
+
+    使用 WAL 模式，定时任务的多个线程/进程可同时写入；每次调用单独建立连接，线程安全。
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # ----- 写入 -----
+    def save_snapshot(self, channel: str, items: List[Dict], fetched_at: Optional[str] = None) -> int:
+        """保存一个渠道的一次抓取结果，返回快照 ID。"""
+        fetched_at = fetched_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "INSERT INTO snapshots(channel, fetched_at, item_count) VALUES (?, ?, ?)",
+                    (channel, fetched_at, len(items)),
+                )
+                snapshot_id = cur.lastrowid
+                rows = []
+                for it in items:
+                    title = it.get("title") or ""
+                    hot = it.get("hot_value")
+                    rows.append((
+                        snapshot_id,
+                        it.get("channel") or channel,
+                        fetched_at,
+                        it.get("rank"),
+                        title,
+                        normalize_title(title),
+                        it.get("link") or "",
+                        str(hot) if hot is not None else None,
+                    ))
+                    if len(rows) >= INSERT_BATCH:
+                        self._insert_rows(conn, rows)
+                        rows = []
+                if rows:
+                    self._insert_rows(conn, rows)
+                self._update_board(conn, channel, items, fetched_at, snapshot_id)
+            return snapshot_id
+        finally:
+            conn.close()
+
+    def _insert_rows(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        conn.executemany(
+            "INSERT INTO items(snapshot_id, channel, fetched_at, rank, title, norm_title, link, hot_value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _update_board(self, conn: sqlite3.Connection, channel: str, items: List[Dict], fetched_at: str, snapshot_id: int) -> None:
+        """
+        维护每个话题的在榜状态：首次出现时间、本次连续在榜的开始时间、最近排名。
+        若话题未出现在上一个快照中，则开启新的在榜区间。
+        """
+        prev = conn.execute(
+            "SELECT MAX(id) FROM snapshots WHERE channel = ? AND id < ?", (channel, snapshot_id)
+        ).fetchone()[0]
+        seen = set()
+        rows = []
+        for it in items:
+            norm = normalize_title(it.get("title") or "")
+            if not norm or norm in seen:
+                continue
+            seen.add(norm)
+            rows.append((channel, norm, it.get("title") or "", fetched_at, fetched_at, fetched_at, it.get("rank"), snapshot_id, prev or -1))
+        conn.executemany(
+            "INSERT INTO board(channel, norm_title, title, first_seen, stint_start, last_seen, last_rank, last_snapshot_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(channel, norm_title) DO UPDATE SET "
+            "stint_start = CASE WHEN board.last_snapshot_id = ? THEN board.stint_start ELSE excluded.stint_start END, "
+            "title = excluded.title, last_seen = excluded.last_seen, last_rank = excluded.last_rank, "
+            "last_snapshot_id = excluded.last_snapshot_id",
+            rows,
+        )
+
+    # ----- 查询 -----
+    def reader(self) -> sqlite3.Connection:
+        """供一次运行内多次按主键查询复用的只读连接（调用方负责 close）。"""
+        return self._connect()
+
+    def board_state(self, channel: str, norm_titles: List[str], conn: Optional[sqlite3.Connection] = None) -> Dict[str, Dict]:
+        """
+        按归一化标题批量读取在榜状态 {norm_title: {first_seen, stint_start, last_rank, last_snapshot_id}}。
+        只按 (channel, norm_title) 主键查找，不扫描历史；conn 给出时复用该连接（不关闭）。
+        """
+        out: Dict[str, Dict] = {}
+        titles = list(dict.fromkeys(t for t in norm_titles if t))
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            for i in range(0, len(titles), INSERT_BATCH):
+                chunk = titles[i:i + INSERT_BATCH]
+                marks = ",".join("?" * len(chunk))
+                for r in conn.execute(
+                    f"SELECT * FROM board WHERE channel = ? AND norm_title IN ({marks})", [channel] + chunk
+                ):
+                    out[r["norm_title"]] = dict(r)
+            return out
+        finally:
+            if own:
+                conn.close()
+
+    def board_titles(self, channel: str, snapshot_id: int) -> Dict[str, Dict]:
+        """返回在指定快照中在榜的话题状态（用于计算掉榜）。"""
+        conn = self._connect()
+        try:
+            return {
+                r["norm_title"]: dict(r)
+                for r in conn.execute(
+                    "SELECT * FROM board WHERE channel = ? AND last_snapshot_id = ?", (channel, snapshot_id)
+                )
+            }
+        finally:
+            conn.close()
+
+    def load_snapshot(self, snapshot_id: int) -> List[HotItem]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM items WHERE snapshot_id = ? ORDER BY rowid", (snapshot_id,)
+            ).fetchall()
+            return [_row_to_item(r) for r in rows]
+        finally:
+            conn.close()
+
+    def latest_snapshot(self, channel: str, before_id: Optional[int] = None) -> Optional[Dict]:
+        """返回渠道最近一个快照的元数据 {id, channel, fetched_at, item_count}；before_id 用于取“上一个”。"""
+        sql = "SELECT * FROM snapshots WHERE channel = ?"
+        args: list = [channel]
+        if before_id is not None:
+            sql += " AND id < ?"
+            args.append(before_id)
+        sql += " ORDER BY id DESC LIMIT 1"
+        conn = self._connect()
+        try:
+            row = conn.execute(sql, args).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def first_seen(self, title: str, channel: Optional[str] = None) -> Optional[str]:
+        """某话题首次出现的时间（按归一化标题匹配）。"""
+        sql = "SELECT MIN(fetched_at) FROM items WHERE norm_title = ?"
+        args: list = [normalize_title(title)]
+        if channel:
+            sql += " AND channel = ?"
+            args.append(channel)
+        conn = self._connect()
+        try:
+            row = conn.execute(sql, args).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def iter_items(self, channel: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[HotItem]:
+        """按时间顺序遍历历史条目；since/until 为 "YYYY-MM-DD HH:MM:SS" 前缀（闭区间）。"""
+        sql = "SELECT * FROM items WHERE 1=1"
+        args: list = []
+        if channel:
+            sql += " AND channel = ?"
+            args.append(channel)
+        if since:
+            sql += " AND fetched_at >= ?"
+            args.append(since)
+        if until:
+            # 仅给出日期/分钟时包含该日/该分钟内的全部数据
+            if len(until) == 10:
+                until += " 23:59:59"
+            elif len(until) == 16:
+                until += ":59"
+            sql += " AND fetched_at <= ?"
+            args.append(until)
+        sql += " ORDER BY fetched_at, snapshot_id, rowid"
+        conn = self._connect()
+        try:
+            cur = conn.execute(sql, args)
+            while True:
+                rows = cur.fetchmany(INSERT_BATCH)
+                if not rows:
+                    break
+                for r in rows:
+                    yield _row_to_item(r)
+        finally:
+            conn.close()
+
+    def channels(self) -> List[str]:
+        conn = self._connect()
+        try:
+            return [r[0] for r in conn.execute("SELECT DISTINCT channel FROM snapshots ORDER BY channel")]
+        finally:
+            conn.close()
@@ -1,63 +1,93 @@
-import os
 import requests
-from typing import List, Dict
+from typing import List, Iterator, Optional
 
 from playwright.sync_api import BrowserType
 
+import endpoints
+import proxy_pool
+import adaptive_timeout
+from deadline import Deadline, DeadlineExceeded, unbounded
+from hot_item import HotItem, make_item, iter_normalize_records
 
-def fetch_hn_via_api(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
-    """通过官方 Firebase API 获取 HN Top Stories。"""
+
+def iter_hn_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
+    """通过官方 Firebase API 获取 HN Top Stories；每取回一条详情即产出。各请求超时受 deadline 约束。"""
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("Hacker News")
+    proxies = lease.requests
+    step = adaptive_timeout.step("Hacker News", "api", "request", lease.name, 10, deadline)
     try:
-        ids = requests.get("https://hacker-news.firebaseio.com/v0/topstories.json", timeout=10).json()
-    except Exception:
-        return []
-    items: List[Dict] = []
-    for idx, story_id in enumerate(ids[:limit], start=1):
-        try:
-            data = requests.get(f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json", timeout=10).json()
-        except Exception:
-            continue
-        title = data.get("title")
-        url = data.get("url") or f"https://news.ycombinator.com/item?id={story_id}"
-        if title and url:
-            items.append({
-                "rank": idx,
-                "title": title,
-                "link": url,
-                "channel": "Hacker News",
-            })
-    return items
-
-
-def fetch_hn_via_dom(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
-    """解析 HN 首页列表，提取标题与得分。"""
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        context = browser.new_context(locale="en-US")
-        page = context.new_page()
-        page.goto("https://news.ycombinator.com/", wait_until="domcontentloaded")
-        items: List[Dict] = []
-        try:
-            page.wait_for_selector("tr.athing", timeout=12000)
-            rows = page.locator("tr.athing")
-            count = rows.count()
-            n = min(count, limit)
-            # 仅获取标题与链接，忽略得分
-            for i in range(n):
-                r = rows.nth(i)
-                a = r.locator("span.titleline a")
-                title = a.inner_text().strip() if a.count() else ""
-                href = a.get_attribute("href") if a.count() else None
-                if title and href:
-                    items.append({
-                        "rank": i + 1,
-                        "title": title,
-                        "link": href,
-                        "channel": "Hacker News",
-                    })
-            context.close()
-            return items
-        except Exception:
-            context.close()
-            return []
\ No newline at end of file
+        with step:
+            ids = requests.get(endpoints.url("hn_api", "/v0/topstories.json"), timeout=step.timeout_s, proxies=proxies).json()
+    except Exception as e:
+        lease.fail(str(e))
+        return
+    # 代理健康只按榜单请求计；单条详情失败不影响评分
+    lease.ok()
+
+    def _iter_stories():
+        # 单条失败时产出 None：标准化阶段跳过它，但排名仍按原始位置计算
+        for story_id in ids[:limit]:
+            # 预算用完时在两条详情之间中止，已产出的条目保留
+            step = adaptive_timeout.step("Hacker News", "api", "request", lease.name, 10, deadline)
+            try:
+                with step:
+                    story = requests.get(endpoints.url("hn_api", f"/v0/item/{story_id}.json"), timeout=step.timeout_s, proxies=proxies).json()
+            except Exception:
+                story = None
+            yield story
+
+    yield from iter_normalize_records("Hacker News", _iter_stories(), "api", limit)
+
+
+def fetch_hn_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_hn_via_api(browser_type, headless, limit, deadline))
+
+
+def iter_hn_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
+    """解析 HN 首页列表，提取标题与得分；逐行产出。各步骤超时受 deadline 约束。"""
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("Hacker News")
+    with lease:
+        with adaptive_timeout.step("Hacker News", "dom", "launch", lease.name, 30, deadline) as t:
+            browser = browser_type.launch(headless=headless, proxy=lease.playwright, timeout=t.timeout_ms)
+        with browser:
+            context = browser.new_context(locale="en-US")
+            page = context.new_page()
+            with adaptive_timeout.step("Hacker News", "dom", "goto", lease.name, 30, deadline) as t:
+                page.goto(endpoints.url("hn"), wait_until="domcontentloaded", timeout=t.timeout_ms)
+            try:
+                with adaptive_timeout.step("Hacker News", "dom", "wait_for_selector", lease.name, 12, deadline) as t:
+                    page.wait_for_selector("tr.athing", timeout=t.timeout_ms)
+                lease.ok()
+                rows = page.locator("tr.athing")
+                count = rows.count()
+                n = min(count, limit)
+                # 仅获取标题与链接，忽略得分
+                for i in range(n):
+                    deadline.check("解析列表")
+                    r = rows.nth(i)
+                    a = r.locator("span.titleline a")
+                    title = a.inner_text().strip() if a.count() else ""
+                    href = a.get_attribute("href") if a.count() else None
+                    if title and href:
+                        yield make_item("Hacker News", i + 1, title, href, "dom")
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                lease.fail(str(e))
+                return
+            finally:
+                context.close()
+
+
+def fetch_hn_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_hn_via_dom(browser_type, headless, limit, deadline))
@@ -0,0 +1,275 @@
+import time
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Callable, Tuple
+from urllib.parse import quote, urljoin
+
+import metrics
+
+
+class HotItem:
+    """
+    统一的热榜条目类型（__slots__，无实例 __dict__）。
+
+    兼容原先的 dict 用法：支持 it.get(k)、it[k]、it[k] = v、"k" in it、dict(it)，
+    值为 None 的字段视为不存在。排名变化等附加字段存放在按需创建的 _extra 中。
+    """
+
+    __slots__ = ("rank", "title", "link", "channel", "hot_value", "fetched_at", "source", "_extra")
+    FIELDS = ("rank", "title", "link", "channel", "hot_value", "fetched_at", "source")
+
+    def __init__(
+        self,
+        rank: Optional[int],
+        title: str,
+        link: str,
+        channel: Optional[str] = None,
+        hot_value=None,
+        fetched_at: Optional[str] = None,
+        source: Optional[str] = None,
+    ):
+        self.rank = rank
+        self.title = title
+        self.link = link
+        self.channel = channel
+        self.hot_value = hot_value
+        self.fetched_at = fetched_at
+        self.source = source
+        self._extra = None
+
+    # ----- dict 兼容 -----
+    def get(self, key: str, default=None):
+        if key in HotItem.FIELDS:
+            v = getattr(self, key)
+            return default if v is None else v
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __getitem__(self, key: str):
+        if key in HotItem.FIELDS:
+            v = getattr(self, key)
+            if v is not None:
+                return v
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key in HotItem.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key in HotItem.FIELDS:
+            return getattr(self, key) is not None
+        return self._extra is not None and key in self._extra
+
+    def keys(self) -> List[str]:
+        ks = [f for f in HotItem.FIELDS if getattr(self, f) is not None]
+        if self._extra:
+            ks.extend(self._extra)
+        return ks
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def to_dict(self) -> Dict:
+        return {k: self[k] for k in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"HotItem({self.to_dict()!r})"
+
+    # ----- 紧凑传输（跨进程） -----
+    def to_tuple(self) -> tuple:
+        return (self.rank, self.title, self.link, self.channel, self.hot_value, self.fetched_at, self.source, self._extra)
+
+    @classmethod
+    def from_tuple(cls, t: tuple) -> "HotItem":
+        it = cls(*t[:7])
+        it._extra = t[7]
+        return it
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_item(channel: str, rank, title: str, link: str, source: str, hot_value=None, fetched_at: Optional[str] = None) -> HotItem:
+    """由已解析好的字段直接构造条目（DOM/HTML 解析路径使用）。"""
+    return HotItem(rank, title, link, channel, hot_value, fetched_at or _now(), source)
+
+
+class ChannelSpec:
+    """
+    渠道字段映射：每个字段可能出现在若干个候选键名下（按优先级排列）。
+    link / skip / unwrap 为渠道特有的处理钩子。
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        fields: Dict[str, Tuple[str, ...]],
+        link: Optional[Callable[[Dict, str, Optional[str]], Optional[str]]] = None,
+        skip: Optional[Callable[[Dict], bool]] = None,
+        unwrap: Optional[Callable[[Dict], Dict]] = None,
+        rank_fallback: str = "index",
+    ):
+        self.channel = channel
+        self.fields = fields
+        self.link = link
+        self.skip = skip
+        self.unwrap = unwrap
+        # "index"：缺失排名时用原始位置；"count"：用已接受条目数
+        self.rank_fallback = rank_fallback
+
+    def compile(self, sample: Dict) -> "CompiledFieldMap":
+        return CompiledFieldMap(self, sample)
+
+
+class CompiledFieldMap:
+    """
+    针对一批记录“编译”后的字段映射：用首条记录确定每个字段实际使用的键名，
+    其后每条记录只做一次直接查找；仅当该键缺失时才回退逐个探测候选键。
+    """
+
+    __slots__ = ("keys", "candidates")
+
+    def __init__(self, spec: ChannelSpec, sample: Dict):
+        self.keys: Dict[str, str] = {}
+        self.candidates = spec.fields
+        for field, cands in spec.fields.items():
+            self.keys[field] = next((k for k in cands if sample.get(k)), cands[0])
+
+    def get(self, rec: Dict, field: str):
+        v = rec.get(self.keys[field])
+        if v:
+            return v
+        for k in self.candidates[field]:
+            v = rec.get(k)
+            if v:
+                return v
+        return None
+
+
+def _weibo_link(rec: Dict, title: str, link: Optional[str]) -> str:
+    return f"https://s.weibo.com/weibo?q={quote(title)}"
+
+
+def _toutiao_link(rec: Dict, title: str, link: Optional[str]) -> str:
+    if link and not link.startswith("http"):
+        link = urljoin("https://www.toutiao.com/", link)
+    return link or ""
+
+
+def _reddit_link(rec: Dict, title: str, link: Optional[str]) -> Optional[str]:
+    permalink = rec.get("permalink") or ""
+    return ("https://www.reddit.com" + permalink) if permalink.startswith("/") else rec.get("url")
+
+
+def _hn_link(rec: Dict, title: str, link: Optional[str]) -> Optional[str]:
+    return link or (f"https://news.ycombinator.com/item?id={rec['id']}" if rec.get("id") else None)
+
+
+CHANNEL_SPECS: Dict[str, ChannelSpec] = {
+    "微博": ChannelSpec(
+        "微博",
+        {"title": ("word",), "rank": ("rank",), "hot_value": ("num", "raw_hot")},
+        link=_weibo_link,
+        # 过滤广告、置顶等非普通热搜项
+        skip=lambda rec: bool(rec.get("is_ad")),
+        rank_fallback="count",
+    ),
+    "头条": ChannelSpec(
+        "头条",
+        {
+            "title": ("Title", "title", "Query", "query"),
+            "link": ("Url", "url", "Link", "link"),
+            "rank": ("Rank", "rank"),
+            "hot_value": ("HotValue", "hot_value"),
+        },
+        link=_toutiao_link,
+    ),
+    "Reddit": ChannelSpec(
+        "Reddit",
+        {"title": ("title",), "link": ("url",), "hot_value": ("score", "ups")},
+        link=_reddit_link,
+        unwrap=lambda child: child.get("data", {}) if isinstance(child, dict) else child,
+    ),
+    "Hacker News": ChannelSpec(
+        "Hacker News",
+        {"title": ("title",), "link": ("url",), "hot_value": ("score",)},
+        link=_hn_link,
+    ),
+}
+
+
+def normalize_records(
+    channel: str,
+    records: Iterable,
+    source: str,
+    limit: int = 30,
+    fetched_at: Optional[str] = None,
+    start_rank: int = 1,
+) -> List[HotItem]:
+    """各渠道统一的标准化阶段：原始 JSON 记录 -> HotItem 列表。"""
+    return list(iter_normalize_records(channel, records, source, limit, fetched_at, start_rank))
+
+
+def iter_normalize_records(
+    channel: str,
+    records: Iterable,
+    source: str,
+    limit: int = 30,
+    fetched_at: Optional[str] = None,
+    start_rank: int = 1,
+) -> Iterator[HotItem]:
+    """normalize_records 的生成器版本：逐条产出，便于流式消费。"""
+    spec = CHANNEL_SPECS[channel]
+    fetched_at = fetched_at or _now()
+    compiled: Optional[CompiledFieldMap] = None
+    count = 0
+    if limit <= 0:
+        return
+
+    def _map(idx: int, rec) -> Optional[HotItem]:
+        nonlocal compiled
+        if spec.unwrap is not None:
+            rec = spec.unwrap(rec)
+        if not isinstance(rec, dict):
+            return None
+        if compiled is None:
+            compiled = spec.compile(rec)
+        if spec.skip is not None and spec.skip(rec):
+            return None
+        title = compiled.get(rec, "title")
+        if not title:
+            return None
+        link = compiled.get(rec, "link") if "link" in spec.fields else None
+        if spec.link is not None:
+            link = spec.link(rec, title, link)
+        if not link and channel in ("Reddit", "Hacker News"):
+            return None
+        rank = compiled.get(rec, "rank") if "rank" in spec.fields else None
+        if not rank:
+            rank = (count + 1) if spec.rank_fallback == "count" else (idx + start_rank)
+        hot_value = compiled.get(rec, "hot_value") if "hot_value" in spec.fields else None
+        return HotItem(rank, title, link or "", channel, hot_value, fetched_at, source)
+
+    # 只累计字段映射本身的耗时（不含上游取数与下游消费），结束时记一次 normalize 阶段
+    busy = 0.0
+    try:
+        for idx, rec in enumerate(records):
+            t0 = time.perf_counter()
+            item = _map(idx, rec)
+            busy += time.perf_counter() - t0
+            if item is None:
+                continue
+            yield item
+            count += 1
+            if count >= limit:
+                break
+    finally:
+        metrics.observe("normalize", busy, channel, source)
@@ -0,0 +1,201 @@
+import time
+from datetime import datetime
+from typing import List, Dict, Iterator, Iterable, Tuple, Callable, Optional
+
+from playwright.sync_api import sync_playwright
+
+import adaptive_timeout
+import metrics
+from circuit_breaker import get_breaker_board
+from deadline import Deadline, unbounded
+from hot_item import HotItem
+from weibo_hot_playwright import iter_top_via_api, iter_top_via_dom
+from toutiao_hot_playwright import iter_toutiao_via_api, iter_toutiao_via_dom
+from reddit_hot_playwright import iter_reddit_via_api, iter_reddit_via_dom
+from hn_hot_playwright import iter_hn_via_api, iter_hn_via_dom
+from history_store import HistoryStore
+from rank_delta import RankDeltaTracker, annotate_rank_deltas
+
+# 渠道 -> 按优先级排列的抓取方式；前一种没有产出任何条目时才尝试下一种
+CHANNEL_SOURCES: Dict[str, Tuple[Callable[..., Iterator[HotItem]], ...]] = {
+    "微博": (iter_top_via_api, iter_top_via_dom),
+    "头条": (iter_toutiao_via_api, iter_toutiao_via_dom),
+    "Reddit": (iter_reddit_via_api, iter_reddit_via_dom),
+    "Hacker News": (iter_hn_via_api, iter_hn_via_dom),
+}
+
+_history_store: HistoryStore | None = None
+
+
+def source_method(fetch: Callable) -> str:
+    """抓取函数对应的方式标签（指标用）：iter_top_via_api -> api。"""
+    return fetch.__name__.rsplit("_via_", 1)[-1]
+
+
+def get_history_store() -> HistoryStore:
+    global _history_store
+    if _history_store is None:
+        _history_store = HistoryStore()
+    return _history_store
+
+
+def record_snapshot(channel: str, items: List[Dict]) -> Dict:
+    """
+    与上一快照对比并标注排名变化（排名变化/是否新上榜/首次上榜时间/在榜分钟），
+    然后将本次结果保存为快照；历史库不可用时不影响主流程。
+    """
+    if not items:
+        return {}
+    fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    diff: Dict = {}
+    try:
+        store = get_history_store()
+        diff = annotate_rank_deltas(store, channel, items, fetched_at)
+        store.save_snapshot(channel, items, fetched_at)
+    except Exception as e:
+        print(f"保存历史快照失败: {e}")
+    return diff
+
+
+def iter_scrape_items(
+    limit: int,
+    headless: bool = True,
+    channel: str = "微博",
+    report: Optional[Dict] = None,
+    deadline: Optional[Deadline] = None,
+    browser_type=None,
+) -> Iterator[HotItem]:
+    """
+    流式抓取单个渠道：每解析出一条即标注排名变化并产出，调用方可边抓边写。
+    完整消费后本次结果保存为历史快照；中途放弃时不保存（避免不完整的榜单被当作快照）。
+    传入 report 字典时填入本次抓取概况：method（成功的抓取方式）、retries（回退次数）、
+    items、partial（是否因时间预算用完而不完整）、
+    attempts（每种方式的 method/outcome/duration_s，熔断跳过的记为 skipped，预算用完的记为 deadline）。
+    某种方式抛出异常且尚未产出条目时回退到下一种；全部失败时抛出最后一个异常。
+    deadline 传给各抓取函数；预算用完时停止抓取并正常返回已产出的条目（不完整的结果不保存快照）。
+    browser_type 为空时本次启动并关闭一个 Playwright；进程池的工作进程传入复用浏览器的 WarmBrowserType。
+    """
+    deadline = deadline or unbounded()
+    ch = (channel or "微博").strip()
+    sources = CHANNEL_SOURCES.get(ch) or CHANNEL_SOURCES["微博"]
+    fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tracker: Optional[RankDeltaTracker] = None
+    try:
+        tracker = RankDeltaTracker(get_history_store(), ch, fetched_at)
+    except Exception as e:
+        print(f"读取历史快照失败: {e}")
+    items: List[HotItem] = []
+    if report is None:
+        report = {}
+    report.update({"method": None, "retries": 0, "items": 0, "partial": False, "attempts": []})
+    if deadline.expired():
+        report["partial"] = True
+        return
+    board = get_breaker_board()
+    last_error: Optional[Exception] = None
+    p = None
+    if browser_type is None:
+        with metrics.stage("playwright_start", ch, ""):
+            p = sync_playwright().start()
+        browser_type = p.chromium
+    try:
+        for idx, fetch in enumerate(sources):
+            method = source_method(fetch)
+            tried = any(a["outcome"] != "skipped" for a in report["attempts"])
+            # 熔断中的方式直接跳过；所有方式都已熔断时仍尝试最后一级，避免渠道完全没有数据
+            if not board.allow(ch, method) and (tried or idx < len(sources) - 1):
+                report["attempts"].append({"method": method, "outcome": "skipped", "duration_s": 0.0})
+                continue
+            t0 = time.perf_counter()
+            outcome = "error"
+            error = ""
+            try:
+                for it in fetch(browser_type, headless=headless, limit=limit, deadline=deadline):
+                    if "channel" not in it:
+                        it["channel"] = ch
+                    if tracker is not None:
+                        try:
+                            tracker.annotate(it)
+                        except Exception as e:
+                            print(f"标注排名变化失败: {e}")
+                            tracker = None
+                    items.append(it)
+                    metrics.ITEMS_TOTAL.inc(channel=ch, method=method)
+                    yield it
+                outcome = "ok" if items else "empty"
+            except GeneratorExit:
+                # 调用方中途放弃
+                outcome = "aborted"
+                raise
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if deadline.expired():
+                    # 预算用完（含被剩余预算截短的步骤超时）：不再回退，保留已产出的条目
+                    outcome = "deadline"
+                    report["partial"] = True
+                    print(f"{ch} {method} 时间预算已用完，停止抓取（已取得 {len(items)} 条）")
+                else:
+                    # 已产出部分条目时无法无缝换到下一级，交给调用方处理
+                    if items:
+                        raise
+                    print(f"{ch} {method} 抓取失败，尝试下一种方式: {error}")
+                    last_error = e
+            finally:
+                elapsed = time.perf_counter() - t0
+                metrics.observe("scrape", elapsed, ch, method, outcome)
+                if outcome in ("aborted", "deadline"):
+                    # 不是该方式本身的成败，不计入熔断
+                    board.release(ch, method)
+                else:
+                    board.record(ch, method, outcome == "ok", error or "无数据")
+                report["attempts"].append({"method": method, "outcome": outcome, "duration_s": round(elapsed, 3)})
+                report["retries"] = sum(1 for a in report["attempts"] if a["outcome"] != "skipped") - 1
+                report["items"] = len(items)
+            if report["partial"]:
+                report["method"] = method if items else None
+                break
+            if items:
+                report["method"] = method
+                metrics.LAST_SUCCESS.set(time.time(), channel=ch)
+                break
+        if not items and last_error is not None and not report["partial"]:
+            raise last_error
+    finally:
+        if tracker is not None:
+            tracker.close()
+        if p is not None:
+            p.stop()
+        metrics.write_textfile()
+        adaptive_timeout.save()
+    if items and tracker is not None and not report["partial"]:
+        try:
+            get_history_store().save_snapshot(ch, items, fetched_at)
+        except Exception as e:
+            print(f"保存历史快照失败: {e}")
+
+
+def scrape_items(
+    limit: int, headless: bool = True, channel: str = "微博", deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    """根据渠道抓取数据。微博优先API，失败回退DOM；头条优先API，失败回退DOM。结果同时保存到本地历史库。"""
+    return list(iter_scrape_items(limit, headless, channel, deadline=deadline))
+
+
+def iter_scrape_channels(
+    channels: Iterable[Tuple[str, int]],
+    headless: bool = True,
+    on_channel: Optional[Callable[[str], None]] = None,
+    deadline: Optional[Deadline] = None,
+) -> Iterator[HotItem]:
+    """
+    依次流式抓取多个渠道 [(渠道, 条数), ...]；on_channel 在开始抓取每个渠道前回调（用于状态提示）。
+    所有渠道共用同一个 deadline；预算用完后其余渠道不再抓取。
+    """
+    deadline = deadline or unbounded()
+    for ch, limit in channels:
+        if deadline.expired():
+            print(f"时间预算已用完，跳过渠道 {ch}")
+            continue
+        if on_channel is not None:
+            on_channel(ch)
+        yield from iter_scrape_items(limit, headless, ch, deadline=deadline)
@@ -0,0 +1,331 @@
+"""
+运行指标（Prometheus 文本格式）。
+
+各抓取阶段（浏览器启动、页面跳转、等待选择器、页面内求值、标准化、HTTP 请求）、
+scrape_items 整体以及飞书写入（字段检查、逐条创建）都会记录到直方图与计数器，
+标签为 channel / method / stage / outcome。
+
+导出方式（可同时使用）：
+    文本文件  每次抓取/写入结束后原子写入 METRICS_FILE（默认 metrics/hot_metrics.prom，
+              可用环境变量 HOT_METRICS_FILE 指定，例如 node_exporter 的 textfile 目录）
+    本地端点  设置 HOT_METRICS_PORT 后在 127.0.0.1:<端口>/metrics 提供抓取
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Tuple, Optional, Iterator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_FILE = os.environ.get("HOT_METRICS_FILE") or os.path.join(BASE_DIR, "metrics", "hot_metrics.prom")
+METRICS_PORT = os.environ.get("HOT_METRICS_PORT")
+
+# 秒；覆盖从毫秒级解析到分钟级整页抓取
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def dump(self) -> Dict:
+        with self._lock:
+            return dict(self._values)
+
+    def diff(self, prev: Dict) -> Dict:
+        return {k: v - prev.get(k, 0.0) for k, v in self.dump().items() if v != prev.get(k, 0.0)}
+
+    def merge(self, delta: Dict) -> None:
+        with self._lock:
+            for k, v in delta.items():
+                self._values[k] = self._values.get(k, 0.0) + v
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels_text(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def dump(self) -> Dict:
+        with self._lock:
+            return dict(self._values)
+
+    def diff(self, prev: Dict) -> Dict:
+        # 仪表只传变化过的当前值
+        return {k: v for k, v in self.dump().items() if prev.get(k) != v}
+
+    def merge(self, delta: Dict) -> None:
+        with self._lock:
+            self._values.update(delta)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels_text(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., 总数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def count(self, **labels) -> int:
+        row = self._values.get(self._key(labels))
+        return int(row[-2]) if row else 0
+
+    def dump(self) -> Dict:
+        with self._lock:
+            return {k: list(v) for k, v in self._values.items()}
+
+    def diff(self, prev: Dict) -> Dict:
+        out = {}
+        for k, row in self.dump().items():
+            base = prev.get(k)
+            if base != row:
+                out[k] = [a - b for a, b in zip(row, base)] if base else row
+        return out
+
+    def merge(self, delta: Dict) -> None:
+        with self._lock:
+            for k, d in delta.items():
+                row = self._values.get(k)
+                if row is None:
+                    row = self._values[k] = [0.0] * (len(self.buckets) + 2)
+                for i, v in enumerate(d):
+                    row[i] += v
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, row in items:
+            labels = _labels_text(self.labelnames, key)
+            for i, b in enumerate(self.buckets):
+                le = 'le="%s"' % _fmt(b)
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le)} {_fmt(row[i])}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le)} {_fmt(row[-2])}")
+            lines.append(f"{self.name}_count{labels} {_fmt(row[-2])}")
+            lines.append(f"{self.name}_sum{labels} {_fmt(round(row[-1], 6))}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    # ----- 跨进程汇总（进程池的工作进程把增量发回父进程） -----
+    def dump(self) -> Dict[str, Dict]:
+        """各指标当前值的副本 {指标名: {标签元组: 值}}。"""
+        return {m.name: m.dump() for m in list(self._metrics)}
+
+    def delta(self, prev: Dict[str, Dict]) -> Dict[str, Dict]:
+        """相对 prev（dump() 的结果）的增量：计数器与直方图为差值，仪表为变化过的当前值。"""
+        out = {}
+        for m in list(self._metrics):
+            d = m.diff(prev.get(m.name) or {})
+            if d:
+                out[m.name] = d
+        return out
+
+    def merge(self, delta: Dict[str, Dict]) -> None:
+        """并入其他进程的增量（本进程未注册的指标忽略）。"""
+        by_name = {m.name: m for m in list(self._metrics)}
+        for name, d in delta.items():
+            m = by_name.get(name)
+            if m is not None:
+                m.merge(d)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in list(self._metrics):
+            body = m.render()
+            if body:
+                lines.extend(m.header())
+                lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "hot_stage_seconds", "各阶段耗时（秒）", ("channel", "method", "stage", "outcome"),
+))
+STAGE_TOTAL = REGISTRY.register(Counter(
+    "hot_stage_total", "各阶段执行次数", ("channel", "method", "stage", "outcome"),
+))
+ITEMS_TOTAL = REGISTRY.register(Counter(
+    "hot_items_total", "抓取到的条目数", ("channel", "method"),
+))
+FEISHU_RECORDS_TOTAL = REGISTRY.register(Counter(
+    "hot_feishu_records_total", "写入多维表的记录数", ("channel", "outcome"),
+))
+LAST_SUCCESS = REGISTRY.register(Gauge(
+    "hot_last_success_timestamp_seconds", "各渠道最近一次成功抓取的时间（Unix 秒）", ("channel",),
+))
+
+
+def observe(stage_name: str, seconds: float, channel: str = "", method: str = "", outcome: str = "ok") -> None:
+    STAGE_SECONDS.observe(seconds, channel=channel, method=method, stage=stage_name, outcome=outcome)
+    STAGE_TOTAL.inc(channel=channel, method=method, stage=stage_name, outcome=outcome)
+
+
+@contextmanager
+def stage(stage_name: str, channel: str = "", method: str = "") -> Iterator[None]:
+    """
+    计时一个阶段；代码块抛出异常时 outcome 记为 error（异常照常抛出）。
+    包在生成器里的阶段被调用方提前关闭（GeneratorExit，如流式抓取被取消或只取前几条）时记为 cancelled，不算失败。
+    """
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        observe(stage_name, time.perf_counter() - t0, channel, method, outcome)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def write_textfile(path: Optional[str] = None) -> Optional[str]:
+    """原子写出当前指标（先写临时文件再替换），失败时不影响主流程。METRICS_FILE 为空时不写。"""
+    path = path or METRICS_FILE
+    if not path:
+        return None
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render())
+        os.replace(tmp, path)
+        return path
+    except Exception as e:
+        print(f"写入指标文件失败: {e}")
+        return None
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """在本地端口提供 /metrics（后台线程）；重复调用返回同一服务。"""
+    global _server
+    if _server is not None:
+        return _server
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        _server = ThreadingHTTPServer((addr, int(port)), Handler)
+    except Exception as e:
+        print(f"启动指标端点失败: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def start_from_env() -> None:
+    """HOT_METRICS_PORT 已设置时启动本地端点。"""
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT))
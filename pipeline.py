@@ -0,0 +1,266 @@
+import time
+import queue
+import threading
+from typing import List, Dict, Iterable, Callable, Optional
+
+from deadline import Deadline, unbounded
+
+# 各阶段之间的有界队列长度：慢的写入端会反压上游，内存占用有上限
+QUEUE_SIZE = 256
+# 同时抓取的渠道数（每个渠道各自启动一个浏览器）
+MAX_PARALLEL_SOURCES = 4
+
+_DONE = object()
+
+
+class StageStats:
+    """单个阶段的计时：busy_s 为实际处理耗时（不含等待上游），wall_s 为从开始到结束的时长。"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.items = 0
+        self.busy_s = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.result = None
+
+    @property
+    def wall_s(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "items": self.items,
+            "busy_s": round(self.busy_s, 3),
+            "wall_s": round(self.wall_s, 3),
+            "error": self.error,
+            "cancelled": self.cancelled,
+        }
+
+    def summary(self) -> str:
+        s = f"{self.name} {self.items}条 {self.busy_s:.1f}s"
+        if self.cancelled:
+            s += "（超时取消）"
+        elif self.error:
+            s += "（失败）"
+        return s
+
+
+class TaskPipeline:
+    """
+    抓取 -> 分发 -> 写入 的分阶段流水线。
+
+    每个数据源（渠道）在独立线程中抓取，产出的条目（抓取阶段已完成标准化）进入有界队列；
+    分发阶段把每条结果复制到各写入端自己的有界队列；每个写入端（文件、飞书等）在独立
+    线程中消费，互不等待。整体耗时趋近于最慢的阶段，而不是各阶段之和。
+    单个数据源或写入端出错只记录在对应阶段，不影响其他阶段。
+
+    传入 deadline 时，预算用完即停止分发：尚未结束的数据源标记为超时取消（cancelled），
+    已分发的条目照常写入；已经抓完的数据源留在队列中的条目先分发完，被取消的数据源
+    尚未分发的条目丢弃，写入端随即收尾；被取消的数据源在下一条产出时关闭自己的迭代器。
+    """
+
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        max_parallel_sources: int = MAX_PARALLEL_SOURCES,
+        deadline: Optional[Deadline] = None,
+    ):
+        self.queue_size = queue_size
+        self.max_parallel_sources = max(1, max_parallel_sources)
+        self.deadline = deadline or unbounded()
+        self._cancel = threading.Event()
+        self._sources: List[tuple] = []
+        self._sinks: List[tuple] = []
+        self.stages: List[StageStats] = []
+        self.total_s = 0.0
+        self.items = 0
+
+    def add_source(self, name: str, factory: Callable[[], Iterable]) -> StageStats:
+        """factory() 返回条目迭代器（在抓取线程内调用）。"""
+        st = StageStats(name, "source")
+        self._sources.append((st, factory))
+        self.stages.append(st)
+        return st
+
+    def add_sink(self, name: str, write: Callable[[Dict], None], close: Optional[Callable[[], object]] = None) -> StageStats:
+        """write(it) 逐条写入；close() 在全部条目写完后调用，其返回值保存在 StageStats.result。"""
+        st = StageStats(name, "sink")
+        self._sinks.append((st, write, close))
+        self.stages.append(st)
+        return st
+
+    # ----- 各阶段线程 -----
+    def _run_source(self, st: StageStats, factory: Callable[[], Iterable], out: queue.Queue, gate: threading.Semaphore) -> None:
+        with gate:
+            st.started_at = time.perf_counter()
+            it_iter = None
+            try:
+                if self._cancel.is_set():
+                    return
+                it_iter = iter(factory())
+                while True:
+                    t0 = time.perf_counter()
+                    try:
+                        it = next(it_iter)
+                    except StopIteration:
+                        st.busy_s += time.perf_counter() - t0
+                        break
+                    st.busy_s += time.perf_counter() - t0
+                    if self._cancel.is_set():
+                        # 已超时取消：关闭迭代器（生成器的 finally 负责释放浏览器），丢弃这一条
+                        close = getattr(it_iter, "close", None)
+                        if close is not None:
+                            close()
+                        break
+                    st.items += 1
+                    out.put((st, it))
+            except Exception as e:
+                st.error = str(e)
+                print(f"抓取阶段 {st.name} 失败: {e}")
+            finally:
+                # 先设置 finished_at 再放入结束标记：取消时 finished_at 已设置的数据源，其条目必已全部入队
+                st.finished_at = time.perf_counter()
+                out.put((st, _DONE))
+
+    def _run_sink(self, st: StageStats, write: Callable, close: Optional[Callable], inbox: queue.Queue) -> None:
+        st.started_at = time.perf_counter()
+        while True:
+            it = inbox.get()
+            if it is _DONE:
+                break
+            if st.error:
+                # 已失败的写入端继续取走条目，避免反压阻塞其他阶段
+                continue
+            t0 = time.perf_counter()
+            try:
+                write(it)
+                st.items += 1
+            except Exception as e:
+                st.error = str(e)
+                print(f"写入阶段 {st.name} 失败: {e}")
+            st.busy_s += time.perf_counter() - t0
+        if close is not None:
+            t0 = time.perf_counter()
+            try:
+                st.result = close()
+            except Exception as e:
+                st.error = st.error or str(e)
+                print(f"写入阶段 {st.name} 收尾失败: {e}")
+            st.busy_s += time.perf_counter() - t0
+        st.finished_at = time.perf_counter()
+
+    def run(self) -> "TaskPipeline":
+        """运行到全部数据源耗尽、全部写入端收尾完成。"""
+        start = time.perf_counter()
+        merged: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        gate = threading.Semaphore(self.max_parallel_sources)
+        dispatch = StageStats("分发", "dispatch")
+        inboxes = []
+        threads = []
+        for st, write, close in self._sinks:
+            inbox: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            inboxes.append(inbox)
+            t = threading.Thread(target=self._run_sink, args=(st, write, close, inbox), daemon=True)
+            t.start()
+            threads.append(t)
+        for st, factory in self._sources:
+            t = threading.Thread(
+                target=self._run_source, args=(st, factory, merged, gate), name=f"source:{st.name}", daemon=True
+            )
+            t.start()
+            threads.append(t)
+
+        dispatch.started_at = time.perf_counter()
+        done = set()
+        while len(done) < len(self._sources):
+            if self.deadline.expired():
+                self._cancel_sources(merged, done, inboxes, dispatch)
+                break
+            try:
+                st, it = merged.get(timeout=min(self.deadline.remaining(), 1.0))
+            except queue.Empty:
+                continue
+            if it is _DONE:
+                done.add(st)
+                continue
+            self._dispatch(it, inboxes, dispatch)
+        for inbox in inboxes:
+            inbox.put(_DONE)
+        dispatch.finished_at = time.perf_counter()
+        for t in threads:
+            # 被取消的数据源线程不等待（它们在剩余步骤超时后自行退出）
+            if t.name.startswith("source:") and self._cancel.is_set():
+                continue
+            t.join()
+
+        self.items = dispatch.items
+        self.stages.append(dispatch)
+        self.total_s = time.perf_counter() - start
+        return self
+
+    @staticmethod
+    def _dispatch(it, inboxes: List[queue.Queue], dispatch: StageStats) -> None:
+        t0 = time.perf_counter()
+        for inbox in inboxes:
+            inbox.put(it)
+        dispatch.busy_s += time.perf_counter() - t0
+        dispatch.items += 1
+
+    def _cancel_sources(self, merged: queue.Queue, done: set, inboxes: List[queue.Queue], dispatch: StageStats) -> None:
+        """
+        预算用完：标记未结束的数据源为取消。已经抓完的数据源留在队列中的条目照常分发，
+        直到取到它们的结束标记；被取消的数据源的条目丢弃，并在后台取走它们之后的输出，避免其阻塞在队列上。
+        """
+        self._cancel.set()
+        running = set()
+        for st, _ in self._sources:
+            if st.finished_at is None:
+                running.add(st)
+                st.cancelled = True
+                st.error = st.error or f"超出时间预算 {self.deadline.budget_s:g}s，已取消"
+                print(f"抓取阶段 {st.name} 超出时间预算，已取消（已取得 {st.items} 条）")
+
+        # 已抓完的数据源只差放入结束标记，这里阻塞取到为止不会久等
+        pending = {st for st, _ in self._sources if st not in running and st not in done}
+        n = len(running)
+        while pending:
+            st, it = merged.get()
+            if st in running:
+                if it is _DONE:
+                    n -= 1
+            elif it is _DONE:
+                pending.discard(st)
+            else:
+                self._dispatch(it, inboxes, dispatch)
+
+        def drain(n: int = n) -> None:
+            while n:
+                if merged.get()[1] is _DONE:
+                    n -= 1
+
+        threading.Thread(target=drain, daemon=True).start()
+
+    # ----- 报告 -----
+    def stage(self, name: str) -> Optional[StageStats]:
+        return next((st for st in self.stages if st.name == name), None)
+
+    def report(self) -> Dict:
+        return {
+            "items": self.items,
+            "total_s": round(self.total_s, 3),
+            # 若各阶段串行执行所需的时间，用于衡量重叠效果
+            "serial_s": round(sum(st.busy_s for st in self.stages), 3),
+            "stages": [st.to_dict() for st in self.stages],
+        }
+
+    def summary(self) -> str:
+        parts = [st.summary() for st in self.stages if st.kind != "dispatch"]
+        return f"耗时 {self.total_s:.1f}s（" + "，".join(parts) + "）"
@@ -0,0 +1,175 @@
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from history_store import HistoryStore, normalize_title
+
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _minutes_between(start: str, end: str) -> int:
+    try:
+        delta = datetime.strptime(end, TIME_FMT) - datetime.strptime(start, TIME_FMT)
+        return max(0, int(delta.total_seconds() // 60))
+    except Exception:
+        return 0
+
+
+def _annotate_item(prev_board: Dict[str, Dict], it: Dict, norm: str, fetched_at: str, summary: Dict) -> None:
+    st = prev_board.get(norm)
+    on_prev = bool(st) and st.get("rank") is not None
+    if on_prev:
+        delta = (st["rank"] - it["rank"]) if isinstance(it.get("rank"), int) else None
+        stint_start = st.get("stint_start") or fetched_at
+    else:
+        delta = None
+        stint_start = fetched_at
+    it["rank_delta"] = delta
+    it["is_new"] = not on_prev
+    it["first_seen"] = (st or {}).get("first_seen") or fetched_at
+    it["minutes_on_board"] = _minutes_between(stint_start, fetched_at)
+    if not on_prev:
+        summary["new"].append(it)
+    elif delta and delta > 0:
+        summary["risers"].append(it)
+    elif delta and delta < 0:
+        summary["fallers"].append(it)
+
+
+def _dropped(prev_board: Dict[str, Dict], current: set) -> List[Dict]:
+    return [
+        {"title": st.get("title", ""), "rank": st.get("rank")}
+        for norm, st in prev_board.items()
+        if norm not in current and st.get("rank") is not None
+    ]
+
+
+def diff_boards(prev_board: Dict[str, Dict], items: List[Dict], fetched_at: str) -> Dict:
+    """
+    对比上一快照与当前快照（哈希索引，O(n)）。
+
+    prev_board: {归一化标题: {"rank", "title", "first_seen", "stint_start"}}，为上一快照在榜的话题；
+    可额外包含不在上一快照中的历史话题（只需 first_seen），用于补全首次上榜时间。
+    为每个 item 写入 rank_delta（正数表示上升）、is_new、first_seen、minutes_on_board，
+    并返回 {"new", "risers", "fallers", "dropped"} 汇总。
+    """
+    summary: Dict = {"new": [], "risers": [], "fallers": []}
+    current = set()
+    for it in items:
+        norm = normalize_title(it.get("title") or "")
+        current.add(norm)
+        _annotate_item(prev_board, it, norm, fetched_at, summary)
+    summary["dropped"] = _dropped(prev_board, current)
+    return summary
+
+
+def _churn(total: int, new: int, moved: List[int]) -> float:
+    """新上榜占比 + 其余条目（moved 为其上一次排名，按当前顺序排列）逆序对比例 × 剩余占比。"""
+    new_ratio = new / total
+    pairs = len(moved) * (len(moved) - 1) // 2
+    if not pairs:
+        return new_ratio
+    inversions = sum(1 for i in range(len(moved)) for j in range(i + 1, len(moved)) if moved[i] > moved[j])
+    return new_ratio + (1 - new_ratio) * inversions / pairs
+
+
+def board_churn(items: List[Dict]) -> float:
+    """
+    榜单变动率（0~1），基于已标注 rank_delta/is_new 的条目：新上榜条目的占比，
+    加上其余条目中两两相对顺序颠倒的比例（按剩余占比加权）。
+    只是被新条目挤下去一位的话题相对顺序不变，不计入变动。
+    """
+    if not items:
+        return 0.0
+    moved = []
+    new = 0
+    for it in items:
+        rank = it.get("rank")
+        delta = it.get("rank_delta")
+        if it.get("is_new") or not isinstance(rank, int) or delta is None:
+            new += 1
+            continue
+        moved.append(rank + delta)
+    return _churn(len(items), new, moved)
+
+
+def churn_between(prev_ranks: Dict[str, int], items: List[Dict]) -> float:
+    """与 board_churn 相同的变动率，但对比的是给定的上一次榜单 {归一化标题: 排名}（如某个任务自己上一次看到的榜单）。"""
+    if not items:
+        return 0.0
+    moved = []
+    new = 0
+    for it in items:
+        prev = prev_ranks.get(normalize_title(it.get("title") or ""))
+        if not isinstance(prev, int) or not isinstance(it.get("rank"), int):
+            new += 1
+            continue
+        moved.append(prev)
+    return _churn(len(items), new, moved)
+
+
+def _load_prev_board(store: HistoryStore, channel: str) -> Dict[str, Dict]:
+    prev = store.latest_snapshot(channel)
+    prev_board: Dict[str, Dict] = {}
+    if prev:
+        for norm, st in store.board_titles(channel, prev["id"]).items():
+            prev_board[norm] = {
+                "rank": st["last_rank"],
+                "title": st["title"],
+                "first_seen": st["first_seen"],
+                "stint_start": st["stint_start"],
+            }
+    return prev_board
+
+
+def annotate_rank_deltas(store: HistoryStore, channel: str, items: List[Dict], fetched_at: Optional[str] = None) -> Dict:
+    """
+    基于历史库中的上一快照为 items 计算排名变化（需在保存本次快照之前调用）。
+    只按当前榜单的标题查询在榜状态表，不扫描历史明细。
+    """
+    fetched_at = fetched_at or datetime.now().strftime(TIME_FMT)
+    prev_board = _load_prev_board(store, channel)
+    # 曾经上榜但不在上一快照中的话题：仅补全首次上榜时间
+    norms = [normalize_title(it.get("title") or "") for it in items]
+    missing = [n for n in norms if n not in prev_board]
+    for norm, st in store.board_state(channel, missing).items():
+        prev_board[norm] = {"rank": None, "title": st["title"], "first_seen": st["first_seen"]}
+    return diff_boards(prev_board, items, fetched_at)
+
+
+class RankDeltaTracker:
+    """
+    流式版本：开始时载入上一快照的在榜状态，之后每到一条即标注，
+    finish() 返回与 diff_boards 相同的汇总。同样需在保存本次快照之前使用。
+    """
+
+    def __init__(self, store: HistoryStore, channel: str, fetched_at: Optional[str] = None):
+        self.store = store
+        self.channel = channel
+        self.fetched_at = fetched_at or datetime.now().strftime(TIME_FMT)
+        self.prev_board = _load_prev_board(store, channel)
+        self.summary: Dict = {"new": [], "risers": [], "fallers": []}
+        self._current = set()
+        # 不在上一快照中的条目按主键逐条查历史在榜状态，整次运行复用一个连接（finish 时关闭）
+        self._conn = None
+
+    def annotate(self, it: Dict) -> Dict:
+        norm = normalize_title(it.get("title") or "")
+        if norm not in self.prev_board and norm not in self._current:
+            if self._conn is None:
+                self._conn = self.store.reader()
+            st = self.store.board_state(self.channel, [norm], conn=self._conn).get(norm)
+            if st:
+                self.prev_board[norm] = {"rank": None, "title": st["title"], "first_seen": st["first_seen"]}
+        self._current.add(norm)
+        _annotate_item(self.prev_board, it, norm, self.fetched_at, self.summary)
+        return it
+
+    def finish(self) -> Dict:
+        self.close()
+        self.summary["dropped"] = _dropped(self.prev_board, self._current)
+        return self.summary
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
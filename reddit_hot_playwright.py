@@ -1,70 +1,70 @@
-import os
-import json
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 
 from playwright.sync_api import BrowserType
 
+import endpoints
+import proxy_pool
+import adaptive_timeout
+from deadline import Deadline, unbounded
+from browser_request import request_json
+from hot_item import HotItem, iter_normalize_records
 
-def _normalize_reddit_items(children: List[Dict], limit: int = 30) -> List[Dict]:
-    items: List[Dict] = []
-    for idx, child in enumerate(children[:limit], start=1):
-        data = child.get("data", {})
-        title = data.get("title")
-        permalink = data.get("permalink") or ""
-        link = ("https://www.reddit.com" + permalink) if permalink.startswith("/") else data.get("url")
-        if title and link:
-            items.append({
-                "rank": idx,
-                "title": title,
-                "link": link,
-                "channel": "Reddit",
-            })
-    return items
+UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/129.0 Safari/537.36"
+)
 
 
-def fetch_reddit_via_api(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
-    """通过 Reddit JSON 接口抓取 r/all 热帖。使用浏览器环境请求以绕过部分防护。"""
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        context = browser.new_context(
-            locale="en-US",
-            viewport={"width": 1280, "height": 800},
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/129.0 Safari/537.36"
-            ),
-        )
-        page = context.new_page()
-        try:
-            url = f"https://www.reddit.com/r/all/hot.json?limit={limit}"
-            page.goto(url, wait_until="domcontentloaded")
-            txt = page.evaluate("() => document.body.innerText")
-            data = json.loads(txt)
-            children = data.get("data", {}).get("children", [])
-            return _normalize_reddit_items(children, limit)
-        except Exception:
-            return []
-        finally:
-            context.close()
+def _fetch_listing(
+    browser_type: BrowserType, headless: bool, path: str, method: str, deadline: Optional[Deadline] = None, **context_kwargs
+) -> List[Dict]:
+    """经浏览器上下文的请求接口获取 Reddit 列表 JSON（不打开页面），返回 children。各步骤超时受 deadline 约束。"""
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("Reddit")
+    with lease:
+        with adaptive_timeout.step("Reddit", method, "launch", lease.name, 30, deadline) as t:
+            browser = browser_type.launch(headless=headless, proxy=lease.playwright, timeout=t.timeout_ms)
+        with browser:
+            context = browser.new_context(locale="en-US", **context_kwargs)
+            try:
+                data = request_json(
+                    context, endpoints.url("reddit", path), "Reddit", method,
+                    proxy=lease.name,
+                    deadline=deadline,
+                )
+            finally:
+                context.close()
+        if data is None:
+            lease.fail("接口请求失败")
+    listing = data.get("data") if isinstance(data, dict) else None
+    children = listing.get("children") if isinstance(listing, dict) else None
+    return children if isinstance(children, list) else []
 
 
-def fetch_reddit_via_dom(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
+def iter_reddit_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
+    """通过 Reddit JSON 接口抓取 r/all 热帖。使用浏览器上下文请求（带浏览器 UA 与 Cookie）以绕过部分防护。"""
+    children = _fetch_listing(browser_type, headless, f"/r/all/hot.json?limit={limit}", "api", deadline, user_agent=UA)
+    yield from iter_normalize_records("Reddit", children[:limit], "api", limit)
+
+
+def iter_reddit_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
     """备用方式：使用 popular.json 接口。"""
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        context = browser.new_context(locale="en-US")
-        page = context.new_page()
-        try:
-            url = f"https://www.reddit.com/r/popular.json?limit={limit}"
-            page.goto(url, wait_until="domcontentloaded")
-            txt = page.evaluate("() => document.body.innerText")
-            data = json.loads(txt)
-            children = data.get("data", {}).get("children", [])
-            return _normalize_reddit_items(children, limit)
-        except Exception:
-            return []
-        finally:
-            context.close()
\ No newline at end of file
+    children = _fetch_listing(browser_type, headless, f"/r/popular.json?limit={limit}", "dom", deadline)
+    yield from iter_normalize_records("Reddit", children[:limit], "dom", limit)
+
+
+def fetch_reddit_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_reddit_via_api(browser_type, headless, limit, deadline))
+
+
+def fetch_reddit_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_reddit_via_dom(browser_type, headless, limit, deadline))
@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import time
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Iterator, Optional
+
+from excel_export import export_items_to_excel
+
+# 滚动导出：每次运行只向当天的 JSONL 侧车文件追加，定期压实为一个工作簿
+SIDECAR_RE = re.compile(r"^(?P<prefix>.+)_(?P<day>\d{8})\.jsonl$")
+# 当天（或本周）的工作簿至少间隔多久重建一次
+COMPACT_INTERVAL_S = 30 * 60
+
+
+class RollingExport:
+    """
+    按天滚动的导出。
+
+    append() 只在 <prefix>_YYYYMMDD.jsonl 末尾追加行（O(本次行数)）；
+    compact() 从侧车文件流式生成 <prefix>_YYYYMMDD.xlsx（按周为 <prefix>_YYYY-Www.xlsx）。
+    侧车文件是唯一数据源：read_items() 直接读取它，open_workbook() 在工作簿过期时先重建。
+    """
+
+    def __init__(self, directory: str, prefix: str = "hot_rolling", period: str = "day"):
+        self.directory = directory
+        self.prefix = prefix
+        self.period = period if period in ("day", "week") else "day"
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ----- 路径 -----
+    def sidecar_path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{self.prefix}_{day.strftime('%Y%m%d')}.jsonl")
+
+    def workbook_path(self, day: date) -> str:
+        if self.period == "week":
+            y, w, _ = day.isocalendar()
+            return os.path.join(self.directory, f"{self.prefix}_{y}-W{w:02d}.xlsx")
+        return os.path.join(self.directory, f"{self.prefix}_{day.strftime('%Y%m%d')}.xlsx")
+
+    def _period_days(self, day: date) -> List[date]:
+        if self.period == "week":
+            monday = day - timedelta(days=day.weekday())
+            return [monday + timedelta(days=i) for i in range(7)]
+        return [day]
+
+    def sidecar_days(self) -> List[date]:
+        days = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return days
+        for name in names:
+            m = SIDECAR_RE.match(name)
+            if m and m.group("prefix") == self.prefix:
+                days.append(datetime.strptime(m.group("day"), "%Y%m%d").date())
+        return sorted(days)
+
+    # ----- 写入 -----
+    def append(self, items: List[Dict]) -> int:
+        """把本次结果追加到对应日期的侧车文件，返回追加行数。"""
+        by_day: Dict[date, List[str]] = {}
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for it in items:
+            row = dict(it)
+            row.setdefault("fetched_at", now)
+            try:
+                day = datetime.strptime(row["fetched_at"][:10], "%Y-%m-%d").date()
+            except Exception:
+                day = date.today()
+            by_day.setdefault(day, []).append(json.dumps(row, ensure_ascii=False))
+        for day, lines in by_day.items():
+            with open(self.sidecar_path(day), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return sum(len(v) for v in by_day.values())
+
+    # ----- 读取 -----
+    def read_items(self, day: Optional[date] = None) -> Iterator[Dict]:
+        """读取某天（按周模式为该周）的全部行，始终为最新数据。"""
+        for d in self._period_days(day or date.today()):
+            path = self.sidecar_path(d)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # 崩溃时可能留下半行，跳过
+                        continue
+
+    def is_stale(self, day: date) -> bool:
+        """工作簿不存在或早于任一侧车文件的最后修改时间即为过期。"""
+        wb = self.workbook_path(day)
+        if not os.path.exists(wb):
+            return any(os.path.exists(self.sidecar_path(d)) for d in self._period_days(day))
+        wb_mtime = os.path.getmtime(wb)
+        for d in self._period_days(day):
+            sc = self.sidecar_path(d)
+            if os.path.exists(sc) and os.path.getmtime(sc) > wb_mtime:
+                return True
+        return False
+
+    # ----- 压实 -----
+    def compact(self, day: Optional[date] = None, force: bool = False) -> Optional[str]:
+        """从侧车文件重建工作簿（先写临时文件再替换），返回工作簿路径；无数据时返回 None。"""
+        day = day or date.today()
+        if not force and not self.is_stale(day):
+            return self.workbook_path(day) if os.path.exists(self.workbook_path(day)) else None
+        out = self.workbook_path(day)
+        tmp = out[:-5] + ".tmp.xlsx"
+        n = export_items_to_excel(self.read_items(day), tmp, sheet_per_channel=True)
+        if not n:
+            os.remove(tmp)
+            return None
+        os.replace(tmp, out)
+        return out
+
+    def open_workbook(self, day: Optional[date] = None) -> Optional[str]:
+        """获取可直接打开的最新工作簿路径（过期则先压实）。"""
+        return self.compact(day)
+
+    def compact_due(self, interval_s: float = COMPACT_INTERVAL_S) -> List[str]:
+        """
+        运行后调用：已结束的日期/周若有未压实数据则压实；
+        当前日期/周的工作簿超过 interval_s 未更新时重建。
+        """
+        today = date.today()
+        done: List[str] = []
+        periods = {}
+        for d in self.sidecar_days():
+            periods.setdefault(self.workbook_path(d), d)
+        current = self.workbook_path(today)
+        for wb, d in periods.items():
+            if not self.is_stale(d):
+                continue
+            if wb == current and os.path.exists(wb) and time.time() - os.path.getmtime(wb) < interval_s:
+                continue
+            path = self.compact(d)
+            if path:
+                done.append(path)
+        return done
@@ -0,0 +1,214 @@
+import os
+import json
+import uuid
+import threading
+from datetime import datetime
+from statistics import median
+from typing import List, Dict, Optional
+
+# 定时任务运行台账：每次运行追加一行 JSON，GUI 的任务管理中展示最近运行与耗时趋势
+RUN_HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_history.jsonl")
+
+# 台账最多保留的运行条数；超过 2 倍时整体裁剪一次（避免每次写入都重写文件）
+MAX_RUNS = 2000
+# 最新一次耗时超过此前中位数的该比例即视为变慢
+SLOWDOWN_RATIO = 1.5
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class RunRecord:
+    """
+    单次运行的记录，运行过程中逐步填充，finish() 后写入台账。
+
+    to_dict() 结构：
+        run_id, task_id, trigger, started_at, finished_at, duration_s,
+        status      ok / partial（有错误或超出时间预算，但写入了数据）/ unchanged（仅输出变化，榜单均无变化）
+                    / empty / error
+        channels    {渠道: {items, method, retries, duration_s, partial, error}}；
+                    仅输出变化的任务另有 scraped（抓到的条数，items 为输出的条数）与 unchanged；
+                    自适应间隔的任务另有 churn（相对本任务上一次榜单的变动率）
+        rows        {写入端: 行数}
+        errors      错误文本列表
+    """
+
+    def __init__(self, task_id: Optional[str], trigger: str = "schedule"):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.task_id = task_id
+        self.trigger = trigger
+        self.started_at = _now()
+        self.finished_at: Optional[str] = None
+        self.duration_s = 0.0
+        self.status = "running"
+        self.channels: Dict[str, Dict] = {}
+        self.rows: Dict[str, int] = {}
+        self.errors: List[str] = []
+
+    def channel(
+        self,
+        name: str,
+        items: int,
+        duration_s: float,
+        report: Optional[Dict] = None,
+        error: Optional[str] = None,
+        partial: bool = False,
+    ) -> None:
+        """partial：该渠道因时间预算用完被截断或取消（也可由 report["partial"] 给出）。"""
+        report = report or {}
+        self.channels[name] = {
+            "items": items,
+            "method": report.get("method"),
+            "retries": int(report.get("retries") or 0),
+            "duration_s": round(duration_s, 3),
+            "partial": bool(partial or report.get("partial")),
+            "error": error,
+        }
+        if report.get("churn") is not None:
+            self.channels[name]["churn"] = report["churn"]
+        if "unchanged" in report:
+            self.channels[name]["scraped"] = int(report.get("scraped") or 0)
+            self.channels[name]["unchanged"] = bool(report.get("unchanged"))
+        if error:
+            self.errors.append(f"{name}: {error}")
+
+    def sink(self, name: str, rows: int, error: Optional[str] = None) -> None:
+        self.rows[name] = rows
+        if error:
+            self.errors.append(f"{name}: {error}")
+
+    def error(self, text: str) -> None:
+        self.errors.append(text)
+
+    def finish(self, duration_s: float) -> "RunRecord":
+        self.finished_at = _now()
+        self.duration_s = round(duration_s, 3)
+        items = sum(c["items"] for c in self.channels.values())
+        if not items:
+            if self.errors:
+                self.status = "error"
+            elif self.channels and all(c.get("unchanged") for c in self.channels.values()):
+                self.status = "unchanged"
+            else:
+                self.status = "empty"
+        else:
+            partial = any(c.get("partial") for c in self.channels.values())
+            self.status = "partial" if self.errors or partial else "ok"
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            "run_id": self.run_id,
+            "task_id": self.task_id,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_s": self.duration_s,
+            "status": self.status,
+            "channels": self.channels,
+            "rows": self.rows,
+            "errors": self.errors,
+        }
+
+
+class RunLedger:
+    """追加写的 JSONL 运行台账（线程安全）；读取时跳过损坏的行。"""
+
+    def __init__(self, path: str = RUN_HISTORY_FILE, max_runs: int = MAX_RUNS):
+        self.path = path
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+
+    def append(self, run: Dict) -> None:
+        line = json.dumps(run, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._trim_if_needed()
+
+    def _read_all(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        runs = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+        return runs
+
+    def _trim_if_needed(self) -> None:
+        try:
+            # 粗略按文件大小判断，避免每次都逐行计数
+            if os.path.getsize(self.path) < self.max_runs * 2 * 300:
+                return
+            runs = self._read_all()
+            if len(runs) <= self.max_runs * 2:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for r in runs[-self.max_runs:]:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"裁剪运行台账失败: {e}")
+
+    def recent(self, task_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """最近的运行（新的在前）；task_id 为空时返回全部任务。"""
+        with self._lock:
+            runs = self._read_all()
+        if task_id is not None:
+            runs = [r for r in runs if r.get("task_id") == task_id]
+        return list(reversed(runs[-limit:])) if limit else list(reversed(runs))
+
+
+def duration_trend(runs: List[Dict]) -> List[str]:
+    """
+    按渠道比较最新一次与此前各次的抓取耗时（runs 新的在前），返回提示文本列表，例如：
+        微博 最近 12.4s，此前中位 6.1s（+103%，变慢）
+    """
+    by_channel: Dict[str, List[float]] = {}
+    for r in runs:
+        for ch, c in (r.get("channels") or {}).items():
+            # 被时间预算截断的渠道耗时不具可比性；仅输出变化的任务按抓到的条数判断
+            if (c.get("scraped") or c.get("items")) and not c.get("partial"):
+                by_channel.setdefault(ch, []).append(float(c.get("duration_s") or 0.0))
+    lines = []
+    for ch, durations in by_channel.items():
+        latest = durations[0]
+        if len(durations) < 2:
+            lines.append(f"{ch} 最近 {latest:.1f}s")
+            continue
+        base = median(durations[1:])
+        if base <= 0:
+            lines.append(f"{ch} 最近 {latest:.1f}s")
+            continue
+        change = (latest - base) / base * 100
+        text = f"{ch} 最近 {latest:.1f}s，此前中位 {base:.1f}s（{change:+.0f}%"
+        if latest >= base * SLOWDOWN_RATIO:
+            text += "，变慢"
+        lines.append(text + "）")
+    return lines
+
+
+def summarize_run(run: Dict) -> str:
+    """单次运行的渠道概况：微博 30条/api 4.2s；头条 0条/dom(重试1) 9.0s"""
+    parts = []
+    for ch, c in (run.get("channels") or {}).items():
+        method = c.get("method") or "-"
+        if c.get("retries"):
+            method += f"(重试{c['retries']})"
+        text = f"{ch} {c.get('items', 0)}条/{method} {float(c.get('duration_s') or 0):.1f}s"
+        if c.get("partial"):
+            text += "(不完整)"
+        elif c.get("unchanged"):
+            text += "(无变化)"
+        elif "scraped" in c:
+            text += f"(抓取{c['scraped']}条)"
+        parts.append(text)
+    return "；".join(parts)
@@ -0,0 +1,613 @@
+"""
+进程池抓取：渠道抓取在常驻的工作进程中执行，每个进程各自持有一个 Playwright 与已启动的浏览器。
+
+- 抓取、解析与标准化都在工作进程内完成，不与 GUI 进程争 GIL；浏览器驱动崩溃或卡死只影响一个工作进程：
+  进程退出时重新拉起，超出时间预算 JOB_GRACE_S 秒仍无结果时强制结束并重新拉起，该次抓取记为失败。
+- 浏览器常驻：抓取函数拿到的 browser_type 按 (headless, 代理) 复用已启动的浏览器，
+  “关闭浏览器”只关闭本次创建的上下文，省去每次抓取启动浏览器的开销。
+- 条目以 HotItem.to_tuple() 的元组逐条传回父进程（无 dict、无对象图），父进程用 HotItem.from_tuple 还原，
+  边抓边交给流水线的写入端，不等整个渠道抓完。
+- 工作进程完成 max_jobs 次抓取，或进程及其浏览器的常驻内存超过 max_rss_mb 后自行退出并由新进程替换。
+
+环境变量 HOT_SCRAPE_WORKERS 设为进程数（auto 表示 CPU 核数）即启用，定时任务的各渠道改由进程池抓取；
+默认 0（不启用，仍在 GUI 进程的线程中抓取）。HOT_SCRAPE_WORKER_MAX_JOBS、HOT_SCRAPE_WORKER_MAX_MB 调整回收条件。
+
+状态经父进程共享：每次派发抓取时带上父进程当前的熔断与 Cookie 状态，工作进程以此为准；
+抓取结束时工作进程把本次的指标增量、熔断与 Cookie 结果、超时样本随结果发回，父进程并入自己的单例，
+由父进程写主状态文件（circuit_state.json、timeout_stats.json、weibo_cookie_state.json）与指标文件/端点，
+所以 HOT_METRICS_PORT、`python adaptive_timeout.py` 与 GUI 看到的是全部进程的汇总。
+工作进程自己的落盘写入各自的 <原文件名>.worker<N>.json（首次启动时由主文件复制），不覆盖主文件；
+代理健康度只在内存中，各进程分别统计。历史库为 SQLite（WAL），可多进程共用。
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import shutil
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import List, Dict, Iterator, Optional, Tuple, Callable
+
+from deadline import Deadline, unbounded
+from hot_item import HotItem
+
+try:
+    import psutil  # type: ignore
+    PSUTIL_AVAILABLE = True
+except Exception:
+    PSUTIL_AVAILABLE = False
+
+# 每个工作进程最多完成多少次抓取后回收
+MAX_JOBS_PER_WORKER = 50
+# 工作进程（含其浏览器子进程）常驻内存上限（MB），超过即在本次抓取后回收
+MAX_RSS_MB = 2048
+# 超出时间预算后再等这么久仍无结果，视为卡死
+JOB_GRACE_S = 30.0
+# 不限时间预算的抓取最长等待
+UNBOUNDED_JOB_S = 600.0
+# 退出中的工作进程最多等待这么久，之后强制结束
+RETIRE_GRACE_S = 10.0
+# 每个工作进程最多常驻的浏览器数（不同代理各一个）
+MAX_WARM_BROWSERS = 3
+
+
+class ScrapeWorkerError(RuntimeError):
+    """工作进程中的抓取失败、进程崩溃或超时无响应。"""
+
+
+def configured_workers() -> int:
+    """HOT_SCRAPE_WORKERS：进程数，auto 表示 CPU 核数，缺省 0（不启用）。"""
+    raw = (os.environ.get("HOT_SCRAPE_WORKERS") or "0").strip().lower()
+    if raw == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+# ===== 工作进程 =====
+
+class _WarmBrowser:
+    """复用中的浏览器：只记录并在关闭时关闭本次创建的上下文，浏览器本身保持运行。"""
+
+    def __init__(self, browser):
+        self._browser = browser
+        self._contexts: List = []
+
+    def new_context(self, **kwargs):
+        ctx = self._browser.new_context(**kwargs)
+        self._contexts.append(ctx)
+        return ctx
+
+    def new_page(self, **kwargs):
+        page = self._browser.new_page(**kwargs)
+        self._contexts.append(page.context)
+        return page
+
+    def is_connected(self) -> bool:
+        return self._browser.is_connected()
+
+    def close(self) -> None:
+        contexts, self._contexts = self._contexts, []
+        for ctx in contexts:
+            try:
+                ctx.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "_WarmBrowser":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class WarmBrowserType:
+    """代替 p.chromium 传给抓取函数：launch() 按 (headless, 代理) 复用已启动的浏览器，最多保留 max_browsers 个。"""
+
+    def __init__(self, browser_type, max_browsers: int = MAX_WARM_BROWSERS):
+        self._type = browser_type
+        self._max = max(1, max_browsers)
+        self._browsers: "OrderedDict[Tuple, object]" = OrderedDict()
+
+    def launch(self, headless: bool = True, proxy: Optional[Dict] = None, **kwargs) -> _WarmBrowser:
+        key = (bool(headless), json.dumps(proxy, sort_keys=True) if proxy else "")
+        browser = self._browsers.pop(key, None)
+        if browser is None or not browser.is_connected():
+            browser = self._type.launch(headless=headless, proxy=proxy, **kwargs)
+        self._browsers[key] = browser
+        while len(self._browsers) > self._max:
+            _, old = self._browsers.popitem(last=False)
+            try:
+                old.close()
+            except Exception:
+                pass
+        return _WarmBrowser(browser)
+
+    def close(self) -> None:
+        while self._browsers:
+            _, browser = self._browsers.popitem()
+            try:
+                browser.close()
+            except Exception:
+                pass
+
+
+def _rss_mb() -> Optional[float]:
+    """本进程及其子进程（浏览器）的常驻内存（MB）；没有 psutil 时只算本进程（仅 Linux），无法测量时返回 None。"""
+    if PSUTIL_AVAILABLE:
+        try:
+            proc = psutil.Process()
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / 1048576
+        except Exception:
+            return None
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+    except Exception:
+        return None
+
+
+def _worker_path(path: str, slot: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{slot}{ext}"
+
+
+def _seed(path: str, slot: int) -> str:
+    """工作进程自己的状态文件；不存在时复制主文件作为起点（沿用已学到的超时与熔断、冷却状态）。"""
+    own = _worker_path(path, slot)
+    if not os.path.exists(own) and os.path.exists(path):
+        try:
+            shutil.copyfile(path, own)
+        except OSError as e:
+            print(f"复制状态文件 {path} 失败: {e}")
+    return own
+
+
+def _use_worker_state(slot: int) -> None:
+    """让本工作进程的状态单例改用各自的文件，避免多个进程整文件替换时互相覆盖。"""
+    import metrics
+    import adaptive_timeout
+    import circuit_breaker
+    import cookie_pool
+
+    # 指标由父进程汇总后写出，工作进程不再单独写指标文件
+    metrics.METRICS_FILE = ""
+    circuit_breaker._board = circuit_breaker.BreakerBoard(_seed(circuit_breaker.CIRCUIT_STATE_FILE, slot))
+    adaptive_timeout._book = adaptive_timeout.TimeoutBook(stats_path=_seed(adaptive_timeout.TIMEOUT_STATS_FILE, slot))
+    cookie_pool._pool = cookie_pool.CookiePool(state_path=_seed(cookie_pool.COOKIE_STATE_FILE, slot))
+
+
+def _open_journals() -> None:
+    import adaptive_timeout
+    import circuit_breaker
+    import cookie_pool
+
+    circuit_breaker.get_breaker_board().journal = []
+    adaptive_timeout.get_timeout_book().journal = []
+    cookie_pool.get_cookie_pool().journal = []
+
+
+def _take_sync(baseline: Dict) -> Dict:
+    """本次抓取要发回父进程的状态：指标增量，以及熔断、Cookie 结果与超时样本（取走后清空）。"""
+    import metrics
+    import adaptive_timeout
+    import circuit_breaker
+    import cookie_pool
+
+    sync = {"metrics": metrics.REGISTRY.delta(baseline)}
+    for name, holder in (
+        ("breakers", circuit_breaker.get_breaker_board()),
+        ("timeouts", adaptive_timeout.get_timeout_book()),
+        ("cookies", cookie_pool.get_cookie_pool()),
+    ):
+        sync[name], holder.journal = holder.journal or [], []
+    return sync
+
+
+def _apply_shared(shared: Optional[Dict]) -> None:
+    """以父进程派发时的熔断与 Cookie 状态为准。"""
+    if not shared:
+        return
+    import circuit_breaker
+    import cookie_pool
+
+    circuit_breaker.get_breaker_board().absorb(shared.get("breakers") or [])
+    cookie_pool.get_cookie_pool().absorb(shared.get("cookies") or {})
+
+
+def _worker_main(slot: int, conn, max_jobs: int, max_rss_mb: float, initializer: Optional[Callable], initargs: tuple) -> None:
+    import hot_sources
+
+    _use_worker_state(slot)
+    if initializer is not None:
+        initializer(*initargs)
+    _open_journals()
+
+    p = None
+    warm: Optional[WarmBrowserType] = None
+    try:
+        from playwright.sync_api import sync_playwright
+
+        p = sync_playwright().start()
+        warm = WarmBrowserType(p.chromium)
+        # 预先启动直连的无界面浏览器
+        warm.launch(headless=True).close()
+    except Exception as e:
+        print(f"抓取进程 {slot} 预启动浏览器失败: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+
+    import metrics
+
+    baseline = metrics.REGISTRY.dump()
+    done = 0
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except (EOFError, OSError):
+                break
+            if job is None:
+                break
+            job_id, channel, limit, headless, budget_s, shared = job
+            report: Dict = {}
+            error = None
+            try:
+                _apply_shared(shared)
+                deadline = Deadline(budget_s) if budget_s else unbounded()
+                # 每解析出一条就发回父进程
+                for it in hot_sources.iter_scrape_items(limit, headless, channel, report=report, deadline=deadline, browser_type=warm):
+                    conn.send(("item", job_id, it.to_tuple()))
+            except (BrokenPipeError, EOFError):
+                break
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            done += 1
+            retire = ""
+            rss = _rss_mb()
+            if done >= max_jobs:
+                retire = f"已完成 {done} 次抓取"
+            elif rss is not None and rss > max_rss_mb:
+                retire = f"内存 {rss:.0f}MB 超过 {max_rss_mb:.0f}MB"
+            sync = _take_sync(baseline)
+            baseline = metrics.REGISTRY.dump()
+            try:
+                conn.send(("done", job_id, report, error, retire, sync))
+            except (BrokenPipeError, EOFError, OSError):
+                break
+            if retire:
+                break
+    finally:
+        if warm is not None:
+            warm.close()
+        if p is not None:
+            try:
+                p.stop()
+            except Exception:
+                pass
+
+
+# ===== 父进程 =====
+
+class _Job:
+    """
+    一次渠道抓取。条目到达时逐条放入 events 供 iter_scrape_items 流式消费，
+    结束时 future 给出 (全部条目元组, report, 错误文本或 None)。
+    """
+    __slots__ = ("job_id", "channel", "limit", "headless", "deadline", "future", "timeout_at", "items", "events")
+
+    def __init__(self, job_id: int, channel: str, limit: int, headless: bool, deadline: Deadline):
+        self.job_id = job_id
+        self.channel = channel
+        self.limit = limit
+        self.headless = headless
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.timeout_at = 0.0
+        self.items: List[tuple] = []
+        self.events: "queue.Queue" = queue.Queue()
+
+    def push(self, item: tuple) -> None:
+        self.items.append(item)
+        self.events.put(item)
+
+    def finish(self, report: Dict, error: Optional[str]) -> None:
+        if self.future.done():
+            return
+        self.future.set_result((self.items, report, error))
+        self.events.put(None)
+
+
+class _Worker:
+    def __init__(self, slot: int, process, conn):
+        self.slot = slot
+        self.process = process
+        self.conn = conn
+        self.job: Optional[_Job] = None
+
+
+def _partial_report() -> Dict:
+    return {"method": None, "retries": 0, "items": 0, "partial": True, "attempts": []}
+
+
+class ScrapePool:
+    """
+    渠道抓取的进程池。iter_scrape_items() 与 hot_sources.iter_scrape_items 接口相同，可直接作为
+    TaskPipeline 的数据源；多个任务同时触发时，各渠道分摊到空闲的工作进程上，等待中的抓取按提交顺序执行。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_jobs: Optional[int] = None,
+        max_rss_mb: Optional[float] = None,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+    ):
+        self.workers = max(1, workers or configured_workers() or 1)
+        self.max_jobs = int(max_jobs or _env_number("HOT_SCRAPE_WORKER_MAX_JOBS", MAX_JOBS_PER_WORKER))
+        self.max_rss_mb = float(max_rss_mb or _env_number("HOT_SCRAPE_WORKER_MAX_MB", MAX_RSS_MB))
+        self.initializer = initializer
+        self.initargs = initargs
+        self.stats = {"jobs": 0, "recycled": 0, "crashed": 0, "killed": 0}
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._retired: List[Tuple[object, float]] = []
+        self._wake_r, self._wake_w = self._ctx.Pipe(duplex=False)
+        self._workers: List[_Worker] = [self._spawn(slot) for slot in range(self.workers)]
+        self._thread = threading.Thread(target=self._manage, name="scrape-pool", daemon=True)
+        self._thread.start()
+
+    # ----- 提交 -----
+    def submit(self, channel: str, limit: int, headless: bool = True, deadline: Optional[Deadline] = None) -> Future:
+        """提交一次渠道抓取；Future 的结果为 (条目元组列表, report, 错误文本或 None)。"""
+        return self._submit(channel, limit, headless, deadline).future
+
+    def _submit(self, channel: str, limit: int, headless: bool, deadline: Optional[Deadline]) -> _Job:
+        job = _Job(next(self._ids), channel, limit, headless, deadline or unbounded())
+        with self._lock:
+            if self._closed:
+                raise ScrapeWorkerError("抓取进程池已关闭")
+            self._pending.append(job)
+        self._wake()
+        return job
+
+    def iter_scrape_items(
+        self,
+        limit: int,
+        headless: bool = True,
+        channel: str = "微博",
+        report: Optional[Dict] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[HotItem]:
+        """在工作进程中抓取一个渠道，条目从工作进程到达即产出；失败时在已取得的条目之后抛出 ScrapeWorkerError。"""
+        job = self._submit(channel, limit, headless, deadline)
+        while True:
+            t = job.events.get()
+            if t is None:
+                break
+            yield HotItem.from_tuple(t)
+        _, rep, error = job.future.result()
+        if report is not None:
+            report.update(rep)
+        if error:
+            raise ScrapeWorkerError(error)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pending, self._pending = list(self._pending), deque()
+            workers = list(self._workers)
+        for job in pending:
+            job.finish(_partial_report(), "抓取进程池已关闭")
+        self._wake()
+        self._thread.join(timeout=5)
+        for w in workers:
+            try:
+                w.conn.send(None)
+            except Exception:
+                pass
+        for w in workers:
+            w.process.join(timeout=RETIRE_GRACE_S)
+            if w.process.is_alive():
+                w.process.terminate()
+            if w.job is not None:
+                w.job.finish(_partial_report(), "抓取进程池已关闭")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            busy = sum(1 for w in self._workers if w.job is not None)
+            return {"workers": len(self._workers), "busy": busy, "pending": len(self._pending), **self.stats}
+
+    # ----- 管理线程 -----
+    def _spawn(self, slot: int) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(slot, child_conn, self.max_jobs, self.max_rss_mb, self.initializer, self.initargs),
+            name=f"scrape-worker-{slot}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(slot, process, parent_conn)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send_bytes(b"1")
+        except Exception:
+            pass
+
+    def _manage(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                self._dispatch()
+                waitables = [self._wake_r] + [w.conn for w in self._workers] + [w.process.sentinel for w in self._workers]
+            try:
+                ready = wait(waitables, timeout=1.0)
+            except Exception:
+                ready = []
+            if self._wake_r in ready:
+                while self._wake_r.poll():
+                    self._wake_r.recv_bytes()
+            with self._lock:
+                if self._closed:
+                    return
+                for idx, w in enumerate(self._workers):
+                    self._check_worker(idx, w)
+                self._reap()
+
+    def _shared_state(self) -> Dict:
+        """派发给工作进程的共享状态：父进程当前的熔断与 Cookie 状态。"""
+        import circuit_breaker
+        import cookie_pool
+
+        return {
+            "breakers": circuit_breaker.get_breaker_board().snapshot(),
+            "cookies": cookie_pool.get_cookie_pool().states(),
+        }
+
+    def _absorb(self, sync: Optional[Dict]) -> None:
+        """并入工作进程发回的指标增量与状态变化，并写出主状态文件与指标文件。"""
+        if not sync:
+            return
+        import metrics
+        import adaptive_timeout
+        import circuit_breaker
+        import cookie_pool
+
+        try:
+            metrics.REGISTRY.merge(sync.get("metrics") or {})
+            board = circuit_breaker.get_breaker_board()
+            for channel, method, ok, error in sync.get("breakers") or []:
+                board.record(channel, method, ok, error)
+            book = adaptive_timeout.get_timeout_book()
+            for key, seconds in sync.get("timeouts") or []:
+                book.record(tuple(key), seconds)
+            book.save()
+            pool = cookie_pool.get_cookie_pool()
+            for name, outcome, error in sync.get("cookies") or []:
+                pool.replay(name, outcome, error)
+            metrics.write_textfile()
+        except Exception as e:
+            print(f"汇总抓取进程状态失败: {e}")
+
+    def _dispatch(self) -> None:
+        shared = None
+        for w in self._workers:
+            if not self._pending:
+                return
+            if w.job is not None or not w.process.is_alive():
+                continue
+            job = self._pending.popleft()
+            if job.deadline.expired():
+                job.finish(_partial_report(), None)
+                continue
+            remaining = job.deadline.remaining()
+            budget_s = remaining if remaining != float("inf") else None
+            job.timeout_at = time.monotonic() + (budget_s or UNBOUNDED_JOB_S) + JOB_GRACE_S
+            if shared is None:
+                shared = self._shared_state()
+            try:
+                w.conn.send((job.job_id, job.channel, job.limit, job.headless, budget_s, shared))
+            except Exception:
+                # 管道已断开：放回队首，由 _check_worker 替换该进程
+                self._pending.appendleft(job)
+                continue
+            w.job = job
+
+    def _check_worker(self, idx: int, w: _Worker) -> None:
+        retire = ""
+        try:
+            while w.conn.poll():
+                msg = w.conn.recv()
+                job = w.job
+                if job is None or job.job_id != msg[1]:
+                    continue
+                if msg[0] == "item":
+                    job.push(msg[2])
+                    continue
+                _, _, report, error, retire, sync = msg
+                w.job = None
+                self.stats["jobs"] += 1
+                self._absorb(sync)
+                job.finish(report, error)
+        except (EOFError, OSError):
+            pass
+        if retire:
+            self.stats["recycled"] += 1
+            self._replace(idx, w, retire)
+        elif not w.process.is_alive():
+            self.stats["crashed"] += 1
+            self._fail_job(w, f"抓取进程退出（exitcode={w.process.exitcode}）")
+            self._replace(idx, w, "进程退出")
+        elif w.job is not None and time.monotonic() > w.job.timeout_at:
+            self.stats["killed"] += 1
+            w.process.terminate()
+            self._fail_job(w, f"{w.job.channel} 抓取超时无响应，已结束抓取进程")
+            self._replace(idx, w, "超时无响应")
+
+    def _fail_job(self, w: _Worker, error: str) -> None:
+        job, w.job = w.job, None
+        if job is not None:
+            # 已逐条送达的条目照常保留在结果中
+            job.finish(_partial_report() if job.deadline.expired() else {}, error)
+
+    def _replace(self, idx: int, w: _Worker, reason: str) -> None:
+        print(f"回收抓取进程 {w.slot}：{reason}")
+        try:
+            w.conn.close()
+        except Exception:
+            pass
+        self._retired.append((w.process, time.monotonic() + RETIRE_GRACE_S))
+        self._workers[idx] = self._spawn(w.slot)
+
+    def _reap(self) -> None:
+        """回收已退出的旧进程；超时仍未退出的强制结束。"""
+        keep = []
+        for process, until in self._retired:
+            process.join(timeout=0)
+            if process.is_alive():
+                if time.monotonic() > until:
+                    process.kill()
+                keep.append((process, until))
+        self._retired = keep
+
+
+_pool: Optional[ScrapePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_scrape_pool() -> Optional[ScrapePool]:
+    """HOT_SCRAPE_WORKERS 大于 0 时返回共用的进程池（首次调用时启动），否则返回 None。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None and configured_workers() > 0:
+            _pool = ScrapePool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,287 @@
+"""
+紧凑的追加式快照归档（列式二进制格式）。
+
+文件结构：
+    文件头  b"HOTARC1\\n"
+    段 * N   每次追加一个段（通常对应一次抓取快照）
+
+段结构：
+    段头    struct "<4sIIIII"：magic b"SEG1"、压缩后长度、原始长度、行数、新增字符串数、CRC32
+    载荷    zlib 压缩，依次为：
+            新增字符串长度 u32[新增字符串数] + UTF-8 拼接内容
+            channel/title/link/hot_value 字符串 ID u32[行数]
+            rank i32[行数]、fetched_at（Unix 秒）i64[行数]
+
+字符串字典全局共享且只追加：标题、链接、渠道只在首次出现的段中保存一次，
+之后只存 4 字节 ID。读取时通过 mmap 顺序解码，无需把整个文件读入内存。
+"""
+
+import os
+import sys
+import mmap
+import time
+import zlib
+import struct
+from array import array
+from typing import List, Dict, Iterator, Optional, Tuple
+
+from hot_item import HotItem
+
+
+FILE_MAGIC = b"HOTARC1\n"
+SEG_MAGIC = b"SEG1"
+SEG_HEADER = struct.Struct("<4sIIIII")
+NONE_ID = 0xFFFFFFFF
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+# 列顺序（与载荷中的顺序一致）
+STR_COLUMNS = ("channel", "title", "link", "hot_value")
+
+
+def _to_le(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_le(typecode: str, data) -> array:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _parse_time(s: Optional[str]) -> int:
+    if not s:
+        return int(time.time())
+    for fmt in (TIME_FMT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(time.mktime(time.strptime(s, fmt)))
+        except ValueError:
+            continue
+    return int(time.time())
+
+
+def _format_time(ts: int) -> str:
+    return time.strftime(TIME_FMT, time.localtime(ts))
+
+
+def _decode_segment(payload: bytes, n_rows: int, n_new: int) -> Tuple[List[str], Dict[str, array]]:
+    """解码一个段的载荷，返回（新增字符串, 列数据）。"""
+    pos = 0
+    lengths = _from_le("I", payload[pos:pos + 4 * n_new])
+    pos += 4 * n_new
+    new_strings = []
+    for ln in lengths:
+        new_strings.append(payload[pos:pos + ln].decode("utf-8"))
+        pos += ln
+    cols: Dict[str, array] = {}
+    for name in STR_COLUMNS:
+        cols[name] = _from_le("I", payload[pos:pos + 4 * n_rows])
+        pos += 4 * n_rows
+    cols["rank"] = _from_le("i", payload[pos:pos + 4 * n_rows])
+    pos += 4 * n_rows
+    cols["fetched_at"] = _from_le("q", payload[pos:pos + 8 * n_rows])
+    return new_strings, cols
+
+
+def _iter_raw_segments(buf) -> Iterator[Tuple[int, int, int, bytes]]:
+    """
+    逐段遍历（buf 可为 mmap 或 bytes），产出 (段结束偏移, 行数, 新增字符串数, 解压后载荷)。
+    遇到截断或校验失败的段即停止（视为崩溃时未写完的尾部）。
+    """
+    if buf[:len(FILE_MAGIC)] != FILE_MAGIC:
+        return
+    pos = len(FILE_MAGIC)
+    size = len(buf)
+    while pos + SEG_HEADER.size <= size:
+        magic, clen, rlen, n_rows, n_new, crc = SEG_HEADER.unpack_from(buf, pos)
+        start = pos + SEG_HEADER.size
+        end = start + clen
+        if magic != SEG_MAGIC or end > size:
+            return
+        compressed = buf[start:end]
+        if zlib.crc32(compressed) != crc:
+            return
+        payload = zlib.decompress(compressed)
+        if len(payload) != rlen:
+            return
+        yield end, n_rows, n_new, payload
+        pos = end
+
+
+class ArchiveWriter:
+    """追加写入器。打开时重建字符串字典，并截掉上次崩溃留下的不完整尾段。"""
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self._ids: Dict[str, int] = {}
+        valid_end = len(FILE_MAGIC)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(FILE_MAGIC)] != FILE_MAGIC:
+                    raise ValueError(f"不是有效的快照归档文件: {path}")
+                for end, n_rows, n_new, payload in _iter_raw_segments(mm):
+                    new_strings, _ = _decode_segment(payload, n_rows, n_new)
+                    for s in new_strings:
+                        self._ids[s] = len(self._ids)
+                    valid_end = end
+            if os.path.getsize(path) > valid_end:
+                with open(path, "r+b") as f:
+                    f.truncate(valid_end)
+        else:
+            with open(path, "wb") as f:
+                f.write(FILE_MAGIC)
+
+    def append_items(self, items: List[Dict]) -> int:
+        """将一批 item 作为一个段追加到归档，返回写入的行数。"""
+        if not items:
+            return 0
+        new_strings: List[str] = []
+
+        def intern(value) -> int:
+            if value is None:
+                return NONE_ID
+            s = str(value)
+            sid = self._ids.get(s)
+            if sid is None:
+                sid = len(self._ids)
+                self._ids[s] = sid
+                new_strings.append(s)
+            return sid
+
+        cols = {name: array("I") for name in STR_COLUMNS}
+        ranks = array("i")
+        times = array("q")
+        # 同一快照的抓取时间通常相同，缓存解析结果
+        time_cache: Dict[Optional[str], int] = {}
+        for it in items:
+            cols["channel"].append(intern(it.get("channel") or "微博"))
+            cols["title"].append(intern(it.get("title") or ""))
+            cols["link"].append(intern(it.get("link") or ""))
+            cols["hot_value"].append(intern(it.get("hot_value")))
+            rank = it.get("rank")
+            ranks.append(int(rank) if isinstance(rank, int) or (isinstance(rank, str) and rank.isdigit()) else 0)
+            fetched_at = it.get("fetched_at")
+            ts = time_cache.get(fetched_at)
+            if ts is None:
+                ts = time_cache[fetched_at] = _parse_time(fetched_at)
+            times.append(ts)
+
+        encoded = [s.encode("utf-8") for s in new_strings]
+        parts = [_to_le(array("I", [len(b) for b in encoded])), b"".join(encoded)]
+        parts += [_to_le(cols[name]) for name in STR_COLUMNS]
+        parts += [_to_le(ranks), _to_le(times)]
+        payload = b"".join(parts)
+        compressed = zlib.compress(payload, self.level)
+        header = SEG_HEADER.pack(SEG_MAGIC, len(compressed), len(payload), len(items), len(new_strings), zlib.crc32(compressed))
+        with open(self.path, "ab") as f:
+            f.write(header)
+            f.write(compressed)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(items)
+
+
+class ArchiveReader:
+    """基于 mmap 的只读访问。"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def iter_columns(self) -> Iterator[Tuple[List[str], Dict[str, array]]]:
+        """逐段产出 (当前字符串字典, 列数据)；字典列表随段增长，调用方勿修改。"""
+        strings: List[str] = []
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for _, n_rows, n_new, payload in _iter_raw_segments(mm):
+                new_strings, cols = _decode_segment(payload, n_rows, n_new)
+                strings.extend(new_strings)
+                yield strings, cols
+
+    def iter_items(self, channel: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[HotItem]:
+        """还原为 HotItem；可按渠道与时间范围过滤（过滤在整数列上完成）。"""
+        since_ts = _parse_time(since) if since else None
+        until_ts = _parse_time(until) if until else None
+        if until and len(until) == 10:
+            # 仅给出日期时包含当天全部数据
+            until_ts += 86399
+        ch_id = None
+        scanned = 0
+        for strings, cols in self.iter_columns():
+            if channel is not None and ch_id is None:
+                # 字典只追加，找到后 ID 不再变化；只需扫描本段新增的字符串
+                for sid in range(scanned, len(strings)):
+                    if strings[sid] == channel:
+                        ch_id = sid
+                        break
+                scanned = len(strings)
+                if ch_id is None:
+                    continue
+            for i in range(len(cols["rank"])):
+                if ch_id is not None and cols["channel"][i] != ch_id:
+                    continue
+                ts = cols["fetched_at"][i]
+                if (since_ts is not None and ts < since_ts) or (until_ts is not None and ts > until_ts):
+                    continue
+                yield columns_row_to_item(strings, cols, i)
+
+    def count_rows(self) -> int:
+        return sum(len(cols["rank"]) for _, cols in self.iter_columns())
+
+
+def columns_row_to_item(strings: List[str], cols: Dict[str, array], i: int) -> HotItem:
+    hot_id = cols["hot_value"][i]
+    return HotItem(
+        cols["rank"][i],
+        strings[cols["title"][i]],
+        strings[cols["link"][i]],
+        strings[cols["channel"][i]],
+        strings[hot_id] if hot_id != NONE_ID else None,
+        _format_time(cols["fetched_at"][i]),
+    )
+
+
+def append_items(path: str, items: List[Dict]) -> int:
+    """便捷函数：把一次抓取结果追加到归档。"""
+    return ArchiveWriter(path).append_items(items)
+
+
+def read_items(path: str, **filters) -> List[HotItem]:
+    """便捷函数：读取归档中的全部（或过滤后的）item。"""
+    return list(ArchiveReader(path).iter_items(**filters))
+
+
+def main() -> int:
+    """将本地历史库（hot_history.db）的快照导出为归档：python snapshot_archive.py 输出文件 [开始] [结束]"""
+    from history_store import HistoryStore
+
+    if len(sys.argv) < 2:
+        print("用法: python snapshot_archive.py 输出文件.hotarc [开始时间] [结束时间]")
+        return 1
+    out = sys.argv[1]
+    since = sys.argv[2] if len(sys.argv) > 2 else None
+    until = sys.argv[3] if len(sys.argv) > 3 else None
+    writer = ArchiveWriter(out)
+    total = 0
+    batch: List[Dict] = []
+    key = None
+    # 按（渠道, 抓取时间）切分为段，与快照一一对应
+    for it in HistoryStore().iter_items(since=since, until=until):
+        k = (it["channel"], it["fetched_at"])
+        if key is not None and k != key:
+            total += writer.append_items(batch)
+            batch = []
+        key = k
+        batch.append(it)
+    total += writer.append_items(batch)
+    print(f"已写入 {total} 条到 {os.path.abspath(out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_outbox  # noqa: E402
+
+
+class _FakeClient:
+    @staticmethod
+    def builder():
+        return _FakeClient()
+
+    def app_token(self, _):
+        return self
+
+    def personal_base_token(self, _):
+        return self
+
+    def build(self):
+        return self
+
+
+def _outbox(tmp_path, monkeypatch, create):
+    monkeypatch.setattr(feishu_outbox, "SDK_AVAILABLE", True)
+    monkeypatch.setattr(feishu_outbox, "BaseClient", _FakeClient)
+    monkeypatch.setattr(feishu_outbox, "CLIENT_TOKEN_SUPPORTED", False)
+    monkeypatch.setattr(feishu_outbox, "ensure_fields_exist", lambda *a, **k: {})
+    monkeypatch.setattr(feishu_outbox, "create_bitable_record", create)
+    outbox = feishu_outbox.FeishuOutbox(str(tmp_path))
+    items = [{"rank": i, "title": f"t{i}", "link": ""} for i in range(1, 4)]
+    outbox.enqueue(items, {"app_token": "app", "table_id": "tbl", "pbt": "pbt"})
+    return outbox
+
+
+def test_rejected_row_is_retried_without_client_token(tmp_path, monkeypatch):
+    written = []
+    calls = {"n": 0}
+
+    def create(client, app_token, table_id, fields, client_token=None):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            return False  # 接口明确答复未创建（如限频）
+        written.append(fields["标题"])
+        return True
+
+    outbox = _outbox(tmp_path, monkeypatch, create)
+    first = outbox.drain(force=True)
+    assert first[0]["error"] and first[0]["ok"] == 1
+
+    second = outbox.drain(force=True)
+    assert second[0]["error"] == ""
+    assert second[0]["uncertain"] == 0
+    assert written == ["t1", "t2", "t3"]
+    assert outbox.backlog()["rows"] == 0
+
+
+def test_row_interrupted_by_exception_is_not_replayed(tmp_path, monkeypatch):
+    written = []
+    calls = {"n": 0}
+
+    def create(client, app_token, table_id, fields, client_token=None):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise TimeoutError("read timeout")  # 结果未知，可能已写入
+        written.append(fields["标题"])
+        return True
+
+    outbox = _outbox(tmp_path, monkeypatch, create)
+    outbox.drain(force=True)
+    second = outbox.drain(force=True)
+    assert second[0]["uncertain"] == 1
+    assert written == ["t1", "t3"]
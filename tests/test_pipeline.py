@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deadline import Deadline  # noqa: E402
+from pipeline import TaskPipeline  # noqa: E402
+
+
+def test_queued_items_of_finished_source_survive_deadline():
+    release = threading.Event()
+    stop = threading.Event()
+    written = []
+
+    def finished():
+        # 写入端 1 条 + 其队列 2 条 + 分发阶段手上 1 条 + 合并队列 2 条：全部产出后数据源即结束
+        for i in range(6):
+            yield {"src": "a", "i": i}
+
+    def running():
+        stop.wait(5)
+        yield {"src": "b", "i": 0}
+
+    def write(it):
+        # 写入端一开始卡住，使分发阶段阻塞，已抓完的数据源条目留在队列里直到预算用完
+        release.wait(5)
+        written.append((it["src"], it["i"]))
+
+    pipe = TaskPipeline(queue_size=2, deadline=Deadline(0.3))
+    a = pipe.add_source("a", finished)
+    b = pipe.add_source("b", running)
+    pipe.add_sink("sink", write)
+    threading.Timer(0.6, release.set).start()
+    try:
+        pipe.run()
+    finally:
+        stop.set()
+
+    assert [i for src, i in written if src == "a"] == [0, 1, 2, 3, 4, 5]
+    assert not a.cancelled
+    assert b.cancelled
+    assert ("b", 0) not in written
+
+
+def test_deadline_does_not_wait_for_running_source():
+    stop = threading.Event()
+
+    def slow():
+        yield {"i": 0}
+        stop.wait(5)
+        yield {"i": 1}
+
+    written = []
+    pipe = TaskPipeline(deadline=Deadline(0.2))
+    st = pipe.add_source("slow", slow)
+    pipe.add_sink("sink", written.append)
+    t0 = time.perf_counter()
+    try:
+        pipe.run()
+    finally:
+        stop.set()
+    assert time.perf_counter() - t0 < 2
+    assert st.cancelled
+    assert written == [{"i": 0}]
@@ -1,89 +1,167 @@
-import os
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 
 from openpyxl import Workbook
-from urllib.parse import urljoin
 from playwright.sync_api import BrowserType
 
+import endpoints
+import metrics
+import proxy_pool
+import adaptive_timeout
+from deadline import Deadline, unbounded
+from hot_item import HotItem, iter_normalize_records
 
-def _normalize_toutiao_items(data: Dict, limit: int) -> List[Dict]:
-    items: List[Dict] = []
-    if not data:
-        return items
+
+# 在页面内完成投影：只取热榜数组，并按与 hot_item.CompiledFieldMap 相同的规则
+# （首条记录决定键名，值为空时按顺序回退候选键）挑出标题/链接/排名/热度，
+# 通过 IPC 传回的只有这几个字段，而不是整棵 __INITIAL_STATE__ 或完整接口响应。
+# 非对象记录保留为 null，以保持按位置计算的排名不变；取满 limit 条有标题的记录即停止。
+_PROJECT_FN = """
+function projectHotBoard(src, limit) {
+  const truthy = (v) => !!v && !(Array.isArray(v) && v.length === 0)
+    && !(typeof v === 'object' && !Array.isArray(v) && Object.keys(v).length === 0);
+  if (!truthy(src) || typeof src !== 'object') return null;
+  let arr = src.data;
+  if (!truthy(arr)) {
+    const hotEvent = src.hotEvent || {};
+    const hotBoard = hotEvent.hotBoard || {};
+    arr = hotBoard.data;
+  }
+  if (!Array.isArray(arr)) return [];
+  const FIELDS = {
+    Title: ['Title', 'title', 'Query', 'query'],
+    Url: ['Url', 'url', 'Link', 'link'],
+    Rank: ['Rank', 'rank'],
+    HotValue: ['HotValue', 'hot_value'],
+  };
+  let keys = null;
+  const get = (rec, field) => {
+    let v = rec[keys[field]];
+    if (truthy(v)) return v;
+    for (const k of FIELDS[field]) { v = rec[k]; if (truthy(v)) return v; }
+    return null;
+  };
+  const out = [];
+  let titled = 0;
+  for (const rec of arr) {
+    if (!rec || typeof rec !== 'object' || Array.isArray(rec)) { out.push(null); continue; }
+    if (keys === null) {
+      keys = {};
+      for (const f in FIELDS) keys[f] = FIELDS[f].find((k) => truthy(rec[k])) || FIELDS[f][0];
+    }
+    const row = { Title: get(rec, 'Title'), Url: get(rec, 'Url'), Rank: get(rec, 'Rank'), HotValue: get(rec, 'HotValue') };
+    out.push(row);
+    if (row.Title && ++titled >= limit) break;
+  }
+  return out;
+}
+"""
+
+# 浏览器内请求热榜接口，并在页面内投影；timeoutMs（缺省 10 秒）到时用 AbortController 中止请求
+PROJECT_API_JS = "async ([url, limit, timeoutMs]) => {" + _PROJECT_FN + """
+  const ctl = new AbortController();
+  const timer = setTimeout(() => ctl.abort(), timeoutMs || 10000);
+  try {
+    const res = await fetch(url, { headers: { 'Accept': 'application/json' }, signal: ctl.signal });
+    if (!res.ok) return null;
+    return projectHotBoard(await res.json(), limit);
+  } catch (e) { return null; } finally { clearTimeout(timer); }
+}"""
+
+# 读取 window.__INITIAL_STATE__ 并在页面内投影
+PROJECT_STATE_JS = "(limit) => {" + _PROJECT_FN + """
+  try { return projectHotBoard(window.__INITIAL_STATE__ || null, limit); } catch (e) { return null; }
+}"""
+
+
+def _toutiao_records(data) -> List[Dict]:
+    if isinstance(data, list):
+        # 已在页面内投影好的记录
+        return data
+    if not data or not isinstance(data, dict):
+        return []
     # 兼容不同结构：优先 data 数组，其次嵌套 hotEvent/hotBoard
-    arr = None
-    if isinstance(data, dict):
-        arr = data.get("data")
-        if not arr:
-            hot_event = data.get("hotEvent") or {}
-            hot_board = hot_event.get("hotBoard") or {}
-            arr = hot_board.get("data")
-
-    if not isinstance(arr, list):
-        return items
-
-    for idx, rec in enumerate(arr):
-        if not isinstance(rec, dict):
-            continue
-        title = rec.get("Title") or rec.get("title") or rec.get("Query") or rec.get("query")
-        url = rec.get("Url") or rec.get("url") or rec.get("Link") or rec.get("link")
-        if not title:
-            continue
-        if url and not url.startswith("http"):
-            url = urljoin("https://www.toutiao.com/", url)
-        items.append({
-            "rank": rec.get("Rank") or rec.get("rank") or idx + 1,
-            "title": title,
-            "link": url or "",
-            "channel": "头条",
-        })
-        if len(items) >= limit:
-            break
-    return items
-
-
-def fetch_toutiao_via_api(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
+    arr = data.get("data")
+    if not arr:
+        hot_event = data.get("hotEvent") or {}
+        hot_board = hot_event.get("hotBoard") or {}
+        arr = hot_board.get("data")
+    return arr if isinstance(arr, list) else []
+
+
+def iter_toutiao_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
     """
     在浏览器环境内直接请求头条热榜 API（签名由前端生成，浏览器请求更稳妥）。
     兼容结构：返回对象含 data 数组，或 window.__INITIAL_STATE__ 的 hotEvent.hotBoard.data。
+    各步骤超时受 deadline 剩余预算约束。
     """
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        context = browser.new_context()
-        page = context.new_page()
-        # 直接调用 JSON 接口（一般会包含 _signature，浏览器环境下可返回数据）
-        js = """
-        (async () => {
-          try {
-            const url = 'https://www.toutiao.com/hot-event/hot-board/?origin=toutiao_pc';
-            const res = await fetch(url, { headers: { 'Accept': 'application/json' } });
-            if (!res.ok) return null;
-            return await res.json();
-          } catch (e) { return null; }
-        })();
-        """
-        page.goto("https://www.toutiao.com/", wait_until="domcontentloaded")
-        data = page.evaluate(js)
-        if not data:
-            # 尝试访问可视化页面并读取 window.__INITIAL_STATE__
-            page.goto("https://www.toutiao.com/hot-event/hotboard/?origin=toutiao_pc", wait_until="domcontentloaded")
-            data = page.evaluate("(() => { try { return window.__INITIAL_STATE__ || null } catch(e){ return null } })()")
-        context.close()
-        return _normalize_toutiao_items(data, limit)
-
-
-def fetch_toutiao_via_dom(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("头条")
+
+    with lease:
+        with adaptive_timeout.step("头条", "api", "launch", lease.name, 30, deadline) as t:
+            browser = browser_type.launch(headless=headless, proxy=lease.playwright, timeout=t.timeout_ms)
+        with browser:
+            context = browser.new_context()
+            page = context.new_page()
+            with adaptive_timeout.step("头条", "api", "goto", lease.name, 30, deadline) as t:
+                page.goto(endpoints.url("toutiao"), wait_until="domcontentloaded", timeout=t.timeout_ms)
+            with adaptive_timeout.step("头条", "api", "evaluate", lease.name, 10, deadline) as t:
+                # 直接调用 JSON 接口（一般会包含 _signature，浏览器环境下可返回数据）
+                api_url = endpoints.url("toutiao", "/hot-event/hot-board/?origin=toutiao_pc")
+                data = page.evaluate(PROJECT_API_JS, [api_url, limit, t.timeout_ms])
+            if data is None:
+                # 尝试访问可视化页面并读取 window.__INITIAL_STATE__
+                with adaptive_timeout.step("头条", "api", "goto", lease.name, 30, deadline) as t:
+                    page.goto(
+                        endpoints.url("toutiao", "/hot-event/hotboard/?origin=toutiao_pc"),
+                        wait_until="domcontentloaded",
+                        timeout=t.timeout_ms,
+                    )
+                with metrics.stage("evaluate", "头条", "api"):
+                    data = page.evaluate(PROJECT_STATE_JS, limit)
+            context.close()
+        if not _toutiao_records(data):
+            lease.fail("未返回热榜数据")
+    yield from iter_normalize_records("头条", _toutiao_records(data), "api", limit)
+
+
+def fetch_toutiao_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_toutiao_via_api(browser_type, headless, limit, deadline))
+
+
+def iter_toutiao_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
     """
     进入热榜展示页，优先解析 window.__INITIAL_STATE__；若不可用可在后续迭代补充 DOM 解析。
     """
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        page = browser.new_page()
-        page.goto("https://www.toutiao.com/hot-event/hotboard/?origin=toutiao_pc", wait_until="domcontentloaded")
-        state = page.evaluate("(() => { try { return window.__INITIAL_STATE__ || null } catch(e){ return null } })()")
-        return _normalize_toutiao_items(state or {}, limit)
\ No newline at end of file
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("头条")
+
+    with lease:
+        with adaptive_timeout.step("头条", "dom", "launch", lease.name, 30, deadline) as t:
+            browser = browser_type.launch(headless=headless, proxy=lease.playwright, timeout=t.timeout_ms)
+        with browser:
+            page = browser.new_page()
+            with adaptive_timeout.step("头条", "dom", "goto", lease.name, 30, deadline) as t:
+                page.goto(
+                    endpoints.url("toutiao", "/hot-event/hotboard/?origin=toutiao_pc"),
+                    wait_until="domcontentloaded",
+                    timeout=t.timeout_ms,
+                )
+            with metrics.stage("evaluate", "头条", "dom"):
+                state = page.evaluate(PROJECT_STATE_JS, limit)
+        if not _toutiao_records(state):
+            lease.fail("未返回热榜数据")
+    yield from iter_normalize_records("头条", _toutiao_records(state), "dom", limit)
+
+
+def fetch_toutiao_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_toutiao_via_dom(browser_type, headless, limit, deadline))
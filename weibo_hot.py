@@ -1,13 +1,41 @@
 import os
+import re
 import sys
+import json
 import time
-from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional
 
 import requests
-from bs4 import BeautifulSoup
-from openpyxl import Workbook
-from urllib.parse import urljoin, quote
+from bs4 import BeautifulSoup, SoupStrainer
+from urllib.parse import urljoin
+
+# HTML 解析后端：优先 selectolax（lexbor），其次 BeautifulSoup + lxml，最后内置 html.parser
+try:
+    from selectolax.lexbor import LexborHTMLParser as _FastHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _FastHTMLParser
+        SELECTOLAX_AVAILABLE = True
+    except ImportError:
+        SELECTOLAX_AVAILABLE = False
+
+try:
+    import lxml  # noqa: F401  仅用于判断 BeautifulSoup 的 "lxml" 解析器是否可用
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+from excel_export import export_items_to_excel
+import endpoints
+import metrics
+import proxy_pool
+import cookie_pool
+from circuit_breaker import get_breaker_board
+import adaptive_timeout
+from deadline import Deadline, unbounded
+from hot_item import HotItem, make_item, normalize_records
+from export_sinks import open_sink, sink_kind_for_path
 
 
 HEADERS = {
@@ -21,194 +49,252 @@ HEADERS = {
     "Referer": "https://weibo.com/",
 }
 
-# 可选：通过环境变量注入 Cookie 与代理，增强在被反爬场景下的可用性
-COOKIE = os.environ.get("WEIBO_COOKIE")
-if COOKIE:
-    HEADERS["Cookie"] = COOKIE
+# 本脚本的 Excel 输出不含渠道列
+EXCEL_COLUMNS = [("排名", "rank"), ("标题", "title"), ("链接", "link"), ("抓取时间", "fetched_at")]
 
-PROXIES = {
-    "http": os.environ.get("HTTP_PROXY") or os.environ.get("http_proxy"),
-    "https": os.environ.get("HTTPS_PROXY") or os.environ.get("https_proxy"),
-}
-if not PROXIES["http"] and not PROXIES["https"]:
-    PROXIES = None
+# Cookie 由 cookie_pool 按次轮换（未配置 Cookie 池时使用环境变量 WEIBO_COOKIE）；代理由 proxy_pool 按渠道选择
 
 
-def fetch_hot_via_api() -> List[Dict]:
+def _get(
+    url: str,
+    method: str,
+    cookie: Optional[cookie_pool.CookieLease] = None,
+    deadline: Optional[Deadline] = None,
+) -> requests.Response:
+    """
+    经代理池发出请求；网络错误与非 2xx 记为所用代理的一次失败，同时记为所用 Cookie 的一般失败。
+    被重定向到登录页时冷却该 Cookie。超时按该方式 × 代理的实测延迟自适应（默认 10 秒），
+    并受 deadline 剩余预算约束。
+    """
+    headers = dict(HEADERS, Cookie=cookie.cookie) if cookie else HEADERS
+    lease = proxy_pool.acquire("微博")
+    step = adaptive_timeout.step("微博", method, "request", lease.name, 10, deadline)
+    try:
+        with lease:
+            with step:
+                r = requests.get(url, headers=headers, timeout=step.timeout_s, proxies=lease.requests)
+            r.raise_for_status()
+    except Exception as e:
+        if cookie:
+            cookie.fail(str(e))
+        raise
+    if cookie and cookie_pool.is_login_url(r.url):
+        cookie.bench("跳转到登录页")
+    return r
+
+
+def fetch_hot_via_api(deadline: Optional[Deadline] = None) -> List[HotItem]:
     """
     优先使用微博公开的侧边热搜接口（返回 JSON），解析前30条。
     如果接口不可用将抛出异常，由上层处理。
     """
-    url = "https://weibo.com/ajax/side/hotSearch"
-    r = requests.get(url, headers=HEADERS, timeout=10, proxies=PROXIES)
-    r.raise_for_status()
+    url = endpoints.url("weibo", "/ajax/side/hotSearch")
+    cookie = cookie_pool.acquire()
+    r = _get(url, "api", cookie, deadline)
     data = r.json()
-    realtime = data.get("realtime", [])
+    if cookie:
+        cookie_pool.report_hot_search(cookie, data)
+    return normalize_records("微博", data.get("realtime", []), "api", 30)
 
-    results = []
-    for item in realtime:
-        # 过滤广告、置顶等非普通热搜项
-        if item.get("is_ad"):
-            continue
-        word = item.get("word") or ""
-        if not word:
-            continue
-        rank = item.get("rank")
-        # 构建可点击搜索链接
-        link = f"https://s.weibo.com/weibo?q={quote(word)}"
-        results.append({
-            "rank": rank if rank else len(results) + 1,
-            "title": word,
-            "link": link,
-        })
-        if len(results) >= 30:
-            break
 
-    return results
+HTML_BACKENDS = ("selectolax", "lxml", "html.parser")
+
+SUMMARY_ROWS = "#pl_top_realtimehot table tbody tr"
+_SUMMARY_ID_RE = re.compile(r"""id\s*=\s*["']?pl_top_realtimehot\b""")
+
+
+def html_backend_available(backend: str) -> bool:
+    if backend == "selectolax":
+        return SELECTOLAX_AVAILABLE
+    if backend == "lxml":
+        return LXML_AVAILABLE
+    return backend == "html.parser"
 
 
-def fetch_hot_via_html() -> List[Dict]:
+def default_html_backend() -> str:
+    """可用环境变量 WEIBO_HTML_PARSER 指定（selectolax / lxml / html.parser），否则取最快的可用后端。"""
+    env = (os.environ.get("WEIBO_HTML_PARSER") or "").strip()
+    if env in HTML_BACKENDS and html_backend_available(env):
+        return env
+    return next(b for b in HTML_BACKENDS if html_backend_available(b))
+
+
+def scope_summary_html(html: str) -> str:
     """
-    解析 s.weibo.com 热搜汇总页面的 HTML，提取前30条。
-    作为 JSON 接口不可用时的回退方案。
+    截取热搜表格所在的片段（从 #pl_top_realtimehot 起始标签到其中表格结束），
+    只解析这一小段而不是整页。找不到锚点或表格内有嵌套表格时退回更大的范围，保证结果不变。
     """
-    url = "https://s.weibo.com/top/summary?cate=realtimehot"
-    r = requests.get(url, headers=HEADERS, timeout=10, proxies=PROXIES)
-    r.raise_for_status()
-    r.encoding = "utf-8"
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    rows = soup.select("#pl_top_realtimehot table tbody tr")
-    results = []
-    for tr in rows:
+    m = _SUMMARY_ID_RE.search(html)
+    if not m:
+        return html
+    start = html.rfind("<", 0, m.start())
+    if start < 0:
+        return html
+    end = html.find("</table>", m.end())
+    if end < 0 or html.count("<table", start, end) != 1:
+        return html[start:]
+    return html[start:end + len("</table>")]
+
+
+def _iter_summary_rows_bs4(html: str, parser: str) -> Iterable[tuple]:
+    # SoupStrainer 只为目标容器建树，其余节点在解析时直接丢弃
+    soup = BeautifulSoup(html, parser, parse_only=SoupStrainer(id="pl_top_realtimehot"))
+    for tr in soup.select(SUMMARY_ROWS):
         tds = tr.find_all("td")
         if len(tds) < 3:
             continue
-        rank_text = tds[0].get_text(strip=True)
+        a = tds[1].find("a")
+        if not a:
+            yield tds[0].get_text(strip=True), None, ""
+            continue
+        yield tds[0].get_text(strip=True), a.get_text(strip=True), a.get("href", "")
+
+
+def _iter_summary_rows_selectolax(html: str) -> Iterable[tuple]:
+    tree = _FastHTMLParser(html)
+    for tr in tree.css(SUMMARY_ROWS):
+        tds = tr.css("td")
+        if len(tds) < 3:
+            continue
+        a = tds[1].css_first("a")
+        if a is None:
+            yield tds[0].text(strip=True), None, ""
+            continue
+        yield tds[0].text(strip=True), a.text(strip=True), a.attributes.get("href") or ""
+
+
+def parse_summary_html(html: str, backend: str | None = None, scoped: bool = True, limit: int = 30) -> List[HotItem]:
+    """
+    从热搜汇总页 HTML 中提取前 limit 条。各后端输出一致，只是速度不同。
+    scoped=False 时解析整页（用于等价性校验）。
+    """
+    backend = backend or default_html_backend()
+    if scoped:
+        html = scope_summary_html(html)
+    if backend == "selectolax":
+        rows = _iter_summary_rows_selectolax(html)
+    else:
+        rows = _iter_summary_rows_bs4(html, backend)
+
+    results: List[HotItem] = []
+    for rank_text, title, href in rows:
         # 跳过置顶/标题等非数字排名的行
         if not rank_text.isdigit():
             continue
-        a = tds[1].find("a")
-        if not a:
+        if title is None:
             continue
-        title = a.get_text(strip=True)
-        href = a.get("href", "")
         if href.startswith("//"):
             link = "https:" + href
         else:
             link = urljoin("https://s.weibo.com", href)
 
-        results.append({
-            "rank": int(rank_text),
-            "title": title,
-            "link": link,
-        })
-        if len(results) >= 30:
+        results.append(make_item("微博", int(rank_text), title, link, "html"))
+        if len(results) >= limit:
             break
 
     return results
 
 
-def fetch_hot_via_mirror() -> List[Dict]:
+def fetch_hot_via_html(deadline: Optional[Deadline] = None) -> List[HotItem]:
+    """
+    解析 s.weibo.com 热搜汇总页面的 HTML，提取前30条。
+    作为 JSON 接口不可用时的回退方案。
+    """
+    url = endpoints.url("weibo_s", "/top/summary?cate=realtimehot")
+    cookie = cookie_pool.acquire()
+    r = _get(url, "html", cookie, deadline)
+    r.encoding = "utf-8"
+    with metrics.stage("parse", "微博", "html"):
+        items = parse_summary_html(r.text)
+    if cookie:
+        if items:
+            cookie.ok()
+        else:
+            cookie.bench("热搜列表为空")
+    return items
+
+
+def fetch_hot_via_mirror(deadline: Optional[Deadline] = None) -> List[HotItem]:
     """
     通过公开的内容镜像服务抓取 JSON 接口，绕过部分地区/登录限制。
-    若返回非 JSON 或解析失败则回退空列表。
+    若返回非 JSON 或解析失败则回退空列表。不向第三方镜像发送微博 Cookie。
     """
-    url = "https://r.jina.ai/http://weibo.com/ajax/side/hotSearch"
-    r = requests.get(url, headers=HEADERS, timeout=10, proxies=PROXIES)
-    r.raise_for_status()
+    url = endpoints.url("weibo_mirror", "/http://weibo.com/ajax/side/hotSearch")
+    r = _get(url, "mirror", deadline=deadline)
     txt = r.text.strip()
     try:
-        data = requests.utils.json.loads(txt)
+        data = json.loads(txt)
     except Exception:
         # 有时该服务会返回页面文本而非 JSON
         return []
 
-    realtime = data.get("realtime", [])
-    results = []
-    for item in realtime:
-        if item.get("is_ad"):
-            continue
-        word = item.get("word") or ""
-        if not word:
-            continue
-        rank = item.get("rank")
-        link = f"https://s.weibo.com/weibo?q={quote(word)}"
-        results.append({
-            "rank": rank if rank else len(results) + 1,
-            "title": word,
-            "link": link,
-        })
-        if len(results) >= 30:
-            break
+    return normalize_records("微博", data.get("realtime", []), "mirror", 30)
 
-    return results
+# 按顺序尝试的回退链；熔断器的方式标签加 http_ 前缀，与浏览器抓取的同名方式分开统计
+HOT_TIERS = (
+    ("http_api", fetch_hot_via_api),
+    ("http_html", fetch_hot_via_html),
+    ("http_mirror", fetch_hot_via_mirror),
+)
 
-def get_hot_top30() -> List[Dict]:
-    """获取微博热搜前30，优先 JSON 接口，失败则回退 HTML。"""
-    try:
-        items = fetch_hot_via_api()
-        if items:
-            return items
-    except Exception:
-        pass
 
+def get_hot_top30(deadline: Optional[Deadline] = None) -> List[HotItem]:
+    """
+    获取微博热搜前30，优先 JSON 接口，失败则回退 HTML，最后尝试镜像服务。
+    熔断中的方式直接跳过；所有方式都已熔断时仍尝试最后一级。
+    deadline 的预算用完后不再尝试后续方式，返回空列表。
+    """
+    deadline = deadline or unbounded()
     try:
-        items = fetch_hot_via_html()
-        return items
-    except Exception:
-        pass
+        return _get_hot_top30(deadline)
+    finally:
+        adaptive_timeout.save()
 
-    # 最后尝试镜像服务
-    try:
-        items = fetch_hot_via_mirror()
-        return items
-    except Exception:
-        return []
+
+def _get_hot_top30(deadline: Deadline) -> List[HotItem]:
+    board = get_breaker_board()
+    tried = False
+    for idx, (method, fetch) in enumerate(HOT_TIERS):
+        if deadline.expired():
+            print(f"微博热搜：{deadline.budget_s:g}s 时间预算已用完，跳过其余方式")
+            break
+        if not board.allow("微博", method) and (tried or idx < len(HOT_TIERS) - 1):
+            continue
+        tried = True
+        try:
+            items = fetch(deadline)
+        except Exception as e:
+            # 预算用完导致的失败不算该方式的错
+            if deadline.expired():
+                board.release("微博", method)
+                break
+            board.record("微博", method, False, str(e) or type(e).__name__)
+            continue
+        board.record("微博", method, bool(items), "" if items else "无数据")
+        if items:
+            return items
+    return []
 
 
-def save_to_excel(items: List[Dict], path: str = "weibo_hot_top30.xlsx") -> str:
+def save_to_excel(items: Iterable[Dict], path: str = "weibo_hot_top30.xlsx") -> str:
     """保存为 Excel（xlsx），并设置表头与基本列宽。"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Top30"
-    ws.append(["排名", "标题", "链接", "抓取时间"])
-
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for it in items:
-        ws.append([
-            it.get("rank"),
-            it.get("title"),
-            it.get("link"),
-            ts,
-        ])
-
-    # 冻结首行
-    ws.freeze_panes = "A2"
-
-    # 简单按内容长度设置列宽
-    dims = {}
-    for row in ws.rows:
-        for cell in row:
-            if cell.value:
-                dims[cell.column_letter] = max(
-                    dims.get(cell.column_letter, 0), len(str(cell.value))
-                )
-    for col, width in dims.items():
-        ws.column_dimensions[col].width = min(width * 1.2, 80)
-
-    wb.save(path)
+    export_items_to_excel(items, path, columns=EXCEL_COLUMNS)
     return path
 
 
 def main() -> int:
-    items = get_hot_top30()
+    items = get_hot_top30(Deadline.from_env())
     if not items:
         print("未获取到热搜数据，可能被反爬或网络异常。")
         return 1
 
-    out = save_to_excel(items)
-    print(f"已保存至: {os.path.abspath(out)}")
+    # 可通过命令行参数指定输出文件，格式由扩展名决定（.xlsx/.csv/.jsonl/.hotarc）
+    out = sys.argv[1] if len(sys.argv) > 1 else "weibo_hot_top30.xlsx"
+    kind = sink_kind_for_path(out)
+    kwargs = {"columns": EXCEL_COLUMNS} if kind == "excel" else {}
+    with open_sink(kind, out, **kwargs) as sink:
+        sink.write_many(items)
+    print(f"已保存至: {os.path.abspath(sink.path)}（{sink.summary()}）")
     return 0
 
 
@@ -42,28 +42,34 @@ if not getattr(sys, 'frozen', False):
                 subprocess.Popen([__target, os.path.abspath(__file__)] + sys.argv[1:], cwd=__BASE_DIR)
                 raise SystemExit(0)
 import json
+import time
 import threading
 import uuid
+import multiprocessing
+import random
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
-from playwright.sync_api import sync_playwright
-from weibo_hot_playwright import fetch_top_via_api, fetch_top_via_dom, save_to_excel
-from toutiao_hot_playwright import fetch_toutiao_via_api, fetch_toutiao_via_dom
-from reddit_hot_playwright import fetch_reddit_via_api, fetch_reddit_via_dom
-from hn_hot_playwright import fetch_hn_via_api, fetch_hn_via_dom
-from feishu_utils import ensure_fields_exist
+from hot_sources import iter_scrape_items, iter_scrape_channels, get_history_store
+from feishu_utils import normalize_destinations
+from feishu_outbox import FeishuOutbox, OutboxStream, summarize_outbox_results
+from pipeline import TaskPipeline
+from deadline import Deadline
+from run_history import RunLedger, RunRecord, duration_trend, summarize_run
+from change_feed import get_change_feed, ChangeRun
+from adaptive_poll import get_poll_controller
+from scrape_pool import get_scrape_pool
+import metrics
+from excel_export import export_items_to_excel
+from rolling_export import RollingExport
+from export_sinks import open_sink, SINK_LABELS
 
 # 可选：写入飞书所需配置（支持环境变量）
 try:
-    from baseopensdk import BaseClient
-    from baseopensdk.api.base.v1.model.app_table_record import AppTableRecord
-    from baseopensdk.api.base.v1.model.create_app_table_record_request import (
-        CreateAppTableRecordRequest,
-    )
+    import baseopensdk  # noqa: F401  仅用于判断能否写入飞书，写入由 feishu_utils / feishu_outbox 完成
     BASEOPENSDK_AVAILABLE = True
 except Exception:
     BASEOPENSDK_AVAILABLE = False
@@ -85,6 +91,17 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SCHEDULE_FILE = os.path.join(BASE_DIR, "schedule.json")
 SCHEDULES_FILE = os.path.join(BASE_DIR, "schedules.json")  # 多任务版持久化文件
 FEISHU_CONFIG_PATH = os.path.join(BASE_DIR, "feishu_config.json")
+# 定时任务的 Excel 保存方式：每次新文件，或追加到按天/按周滚动的导出
+EXCEL_MODES = {"每次新文件": None, "按天滚动": "day", "按周滚动": "week"}
+DESTINATIONS_HELP = "每行一个：TableId|渠道1,渠道2|AppToken|PBT（渠道留空表示全部，AppToken/PBT 留空沿用上方）"
+PRIMARY_CHANNELS_HELP = "写入上方 TableId 的渠道，逗号分隔（如 微博,头条）；留空表示全部渠道"
+# 间隔轮询：每隔 interval_s 秒运行一次（上下随机抖动 jitter_s 秒），上一次运行结束后才排下一次
+INTERVAL_FREQ = "间隔"
+FREQ_OPTIONS = ["仅一次", "每天", "每周", INTERVAL_FREQ]
+MIN_INTERVAL_S = 10
+# 自适应间隔：下一次时间相差不到这么多秒的渠道合并在同一次运行中抓取
+ADAPTIVE_BATCH_S = 15
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600}
 
 def load_feishu_config() -> Dict:
     try:
@@ -93,6 +110,58 @@ def load_feishu_config() -> Dict:
     except Exception:
         return {}
 
+def channel_plan(weibo: Tuple[bool, int], toutiao: Tuple[bool, int], reddit: Tuple[bool, int], hn: Tuple[bool, int]) -> List[Tuple[str, int]]:
+    """按界面顺序列出已勾选的渠道及条数：[(渠道, 条数), ...]。"""
+    plan = []
+    for ch, (enabled, limit) in (("微博", weibo), ("头条", toutiao), ("Reddit", reddit), ("Hacker News", hn)):
+        if enabled:
+            plan.append((ch, limit))
+    return plan
+
+def parse_interval(text: str) -> float:
+    """解析间隔：90、90s、5m、1h（纯数字按秒）。"""
+    s = (text or "").strip().lower()
+    unit = 1
+    if s and s[-1] in _INTERVAL_UNITS:
+        unit = _INTERVAL_UNITS[s[-1]]
+        s = s[:-1].strip()
+    try:
+        seconds = float(s) * unit
+    except ValueError:
+        raise ValueError(f"间隔格式错误：{text}（例如 90s、5m）")
+    if seconds < 0:
+        raise ValueError(f"间隔不能为负：{text}")
+    return seconds
+
+def format_interval(seconds: float) -> str:
+    seconds = float(seconds or 0)
+    for suffix, unit in (("h", 3600), ("m", 60)):
+        if seconds >= unit and seconds % unit == 0:
+            return f"{seconds / unit:g}{suffix}"
+    return f"{seconds:g}s"
+
+def next_interval_run(last_start: datetime | None, interval_s: float, jitter_s: float = 0.0, now: datetime | None = None) -> datetime:
+    """
+    间隔任务的下一次运行时间：上一次开始时间 + 间隔，加 ±jitter_s 的随机抖动（错开多个轮询任务）；
+    首次运行在 0~jitter_s 秒内开始；上一轮超时导致已过点时立即运行。
+    """
+    now = now or datetime.now()
+    jitter_s = max(0.0, float(jitter_s or 0))
+    if last_start is None:
+        return now + timedelta(seconds=random.uniform(0.0, jitter_s))
+    target = last_start + timedelta(seconds=max(MIN_INTERVAL_S, float(interval_s)) + random.uniform(-jitter_s, jitter_s))
+    return max(target, now)
+
+def parse_interval_range(text: str) -> Tuple[float, float]:
+    """解析间隔范围：1m-30m。"""
+    parts = (text or "").replace("~", "-").split("-")
+    if len(parts) != 2:
+        raise ValueError(f"间隔范围格式错误：{text}（例如 1m-30m）")
+    lo, hi = parse_interval(parts[0]), parse_interval(parts[1])
+    if lo < MIN_INTERVAL_S or hi < lo:
+        raise ValueError(f"间隔范围需满足 {MIN_INTERVAL_S}s ≤ 下限 ≤ 上限：{text}")
+    return lo, hi
+
 def save_feishu_config(cfg: Dict) -> None:
     try:
         with open(FEISHU_CONFIG_PATH, "w", encoding="utf-8") as f:
@@ -101,105 +170,6 @@ def save_feishu_config(cfg: Dict) -> None:
         pass
 
 
-def scrape_items(limit: int, headless: bool = True, channel: str = "微博", google_geo: str | None = None) -> List[Dict]:
-    """根据渠道抓取数据。微博优先API，失败回退DOM；头条优先API，失败回退DOM。"""
-    with sync_playwright() as p:
-        ch = (channel or "微博").strip()
-        if ch == "头条":
-            items = fetch_toutiao_via_api(p.chromium, headless=headless, limit=limit)
-            if not items:
-                items = fetch_toutiao_via_dom(p.chromium, headless=headless, limit=limit)
-            # 标注渠道
-            for it in items or []:
-                if "channel" not in it:
-                    it["channel"] = "头条"
-        elif ch == "Reddit":
-            items = fetch_reddit_via_api(p.chromium, headless=headless, limit=limit)
-            if not items:
-                items = fetch_reddit_via_dom(p.chromium, headless=headless, limit=limit)
-            for it in items or []:
-                if "channel" not in it:
-                    it["channel"] = "Reddit"
-        elif ch == "Google Trends":
-            items = fetch_google_trends_via_api(p.chromium, headless=headless, limit=limit, geo=(google_geo or "US"))
-            for it in items or []:
-                if "channel" not in it:
-                    it["channel"] = "Google Trends"
-        elif ch == "Hacker News":
-            items = fetch_hn_via_api(p.chromium, headless=headless, limit=limit)
-            if not items:
-                items = fetch_hn_via_dom(p.chromium, headless=headless, limit=limit)
-            for it in items or []:
-                if "channel" not in it:
-                    it["channel"] = "Hacker News"
-        else:
-            items = fetch_top_via_api(p.chromium, headless=headless, limit=limit)
-            if not items:
-                items = fetch_top_via_dom(p.chromium, headless=headless, limit=limit)
-            # 标注渠道
-            for it in items:
-                if "channel" not in it:
-                    it["channel"] = "微博"
-    return items
-
-
-def write_to_feishu(items: List[Dict], app_token: str, table_id: str, pbt: str) -> int:
-    if not BASEOPENSDK_AVAILABLE:
-        raise RuntimeError("BaseOpenSDK 未安装，无法写入飞书。")
-    client = BaseClient.builder().app_token(app_token).personal_base_token(pbt).build()
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # 字段检查与自动创建
-    field_types = {}
-    if len(items) > 0:
-        first_item = items[0]
-        # 构造样本数据，优先使用复杂类型以触发自动创建
-        sample_fields = {
-            "排名": first_item.get("rank"),
-            "标题": first_item.get("title"),
-            "链接": {"text": first_item.get("title"), "link": first_item.get("link")},
-            "渠道": first_item.get("channel") or "微博",
-            "抓取时间": ts,
-        }
-        if "hot_value" in first_item:
-            sample_fields["热度"] = first_item["hot_value"]
-            
-        field_types = ensure_fields_exist(client, app_token, table_id, sample_fields)
-
-    ok = 0
-    for it in items:
-        fields = {
-            "排名": it.get("rank"),
-            "标题": it.get("title"),
-            "链接": it.get("link"), # 默认使用纯文本链接
-            "渠道": it.get("channel") or "微博",
-            "抓取时间": ts,
-        }
-        
-        # 如果确定是超链接字段(15)，则使用对象格式
-        if field_types.get("链接") == 15:
-             fields["链接"] = {"text": it.get("title"), "link": it.get("link")}
-
-        if "hot_value" in it:
-            fields["热度"] = it["hot_value"]
-
-        body = AppTableRecord.builder().fields(fields).build()
-        req = (
-            CreateAppTableRecordRequest
-            .builder()
-            .app_token(app_token)
-            .table_id(table_id)
-            .request_body(body)
-            .build()
-        )
-        resp = client.base.v1.app_table_record.create(req)
-        data = getattr(resp, "data", None)
-        rec = getattr(data, "record", None) if data else None
-        if rec and getattr(rec, "record_id", None):
-            ok += 1
-    return ok
-
-
 class HotGUI:
     def __init__(self, root: tk.Tk):
         self.root = root
@@ -276,10 +246,16 @@ class HotGUI:
 
         # 多维表参数设置（弹窗）
         self.btn_settings = ttk.Button(frm, text="设置多维表参数…", command=self.open_feishu_settings_dialog)
-        self.btn_settings.grid(row=6, column=0, columnspan=5, sticky=tk.EW)
+        self.btn_settings.grid(row=6, column=0, columnspan=3, sticky=tk.EW)
+        # 从本地历史库导出（无需重新抓取）
+        self.btn_history = ttk.Button(frm, text="历史导出…", command=self.open_history_export_dialog)
+        self.btn_history.grid(row=6, column=3, columnspan=2, sticky=tk.EW)
 
         ttk.Separator(frm).grid(row=7, column=0, columnspan=5, sticky=tk.EW, pady=8)
         ttk.Label(frm, textvariable=self.status_var, foreground="#555").grid(row=7, column=0, columnspan=5, sticky=tk.W)
+        # 飞书发件箱积压
+        self.outbox_var = tk.StringVar(value="")
+        ttk.Label(frm, textvariable=self.outbox_var, foreground="#555").grid(row=8, column=0, columnspan=4, sticky=tk.W)
         # 一键收至右下角（系统托盘）
         self.btn_tray = ttk.Button(frm, text="收至右下角", command=self.minimize_to_tray)
         self.btn_tray.grid(row=8, column=4, sticky=tk.E, pady=4)
@@ -306,16 +282,47 @@ class HotGUI:
         self.task_threads: Dict[str, threading.Thread] = {}
         self.task_events: Dict[str, threading.Event] = {}
 
+        # 飞书发件箱：启动时恢复未完成批次并在后台重试
+        self.outbox = FeishuOutbox()
+        self.run_ledger = RunLedger()
+        self._start_outbox_worker()
+
         # 尝试恢复并启动既有定时任务（多任务版）
         self.restore_schedules()
         # 托盘图标引用
         self.tray_icon = None
 
+    # ===== 飞书发件箱 =====
+    def _refresh_outbox_status(self) -> Dict:
+        backlog = self.outbox.backlog()
+        if backlog["rows"]:
+            text = f"飞书待写入：{backlog['rows']} 条（{backlog['batches']} 批）"
+            if backlog["last_error"]:
+                text += f"，最近错误：{backlog['last_error'][:60]}"
+        else:
+            text = ""
+        self.outbox_var.set(text)
+        return backlog
+
+    def _start_outbox_worker(self, interval_s: float = 30.0):
+        def worker():
+            while True:
+                try:
+                    if BASEOPENSDK_AVAILABLE and self.outbox.backlog()["rows"]:
+                        self.outbox.drain()
+                    self._refresh_outbox_status()
+                except Exception:
+                    pass
+                time.sleep(interval_s)
+
+        threading.Thread(target=worker, daemon=True).start()
+
     def set_busy(self, busy: bool):
         state = (tk.DISABLED if busy else tk.NORMAL)
         self.btn_excel.configure(state=state)
         self.btn_feishu.configure(state=state)
         self.btn_settings.configure(state=state)
+        self.btn_history.configure(state=state)
         # 渠道控件联动
         self.weibo_chk.configure(state=state)
         self.weibo_spin.configure(state=state)
@@ -405,36 +412,20 @@ class HotGUI:
             messagebox.showwarning("提示", "请至少勾选一个渠道进行抓取。")
             return
 
+        channels = channel_plan(
+            weibo=(weibo_enabled, weibo_limit),
+            toutiao=(toutiao_enabled, toutiao_limit),
+            reddit=(reddit_enabled, reddit_limit),
+            hn=(hn_enabled, hn_limit),
+        )
+
         def run():
+            pending = None
             try:
                 self.status_var.set("抓取中...")
-                all_items: List[Dict] = []
-                if weibo_enabled:
-                    self.status_var.set("抓取微博中...")
-                    wb_items = scrape_items(limit=weibo_limit, headless=headless, channel="微博")
-                    all_items.extend(wb_items or [])
-                if toutiao_enabled:
-                    self.status_var.set("抓取头条中...")
-                    tt_items = scrape_items(limit=toutiao_limit, headless=headless, channel="头条")
-                    all_items.extend(tt_items or [])
-                if reddit_enabled:
-                    self.status_var.set("抓取Reddit中...")
-                    rd_items = scrape_items(limit=reddit_limit, headless=headless, channel="Reddit")
-                    all_items.extend(rd_items or [])
-                # Google Trends 抓取已移除
-                if hn_enabled:
-                    self.status_var.set("抓取Hacker News中...")
-                    hn_items = scrape_items(limit=hn_limit, headless=headless, channel="Hacker News")
-                    all_items.extend(hn_items or [])
-                if not all_items:
-                    self.status_var.set("未获取到数据")
-                    messagebox.showwarning("提示", "未获取到热榜数据，可能需要登录或网络受限。")
-                    return
                 # 保存文件名：同时勾选则合并保存为 hot_all_topX；仅单渠道保持原命名
-                enabled_count = sum([weibo_enabled, toutiao_enabled, reddit_enabled, hn_enabled])
-                if enabled_count > 1:
-                    total = len(all_items)
-                    out = f"hot_all_top{total}.xlsx"
+                if len(channels) > 1:
+                    out = None  # 总条数在抓取完成后确定
                 elif weibo_enabled:
                     out = f"weibo_hot_top{weibo_limit}.xlsx"
                 elif toutiao_enabled:
@@ -444,13 +435,30 @@ class HotGUI:
                 # Google Trends 文件命名已移除
                 else:
                     out = f"hn_hot_top{hn_limit}.xlsx"
-                save_to_excel(all_items, path=out)
-                self.status_var.set(f"已保存: {os.path.abspath(out)}")
+                # 边抓边写：每条结果解析后立即进入导出，先写到临时文件，完成后再改名
+                pending = os.path.abspath(os.path.splitext(out)[0] + ".tmp.xlsx" if out else "hot_all.tmp.xlsx")
+                with open_sink("excel", pending) as sink:
+                    for it in iter_scrape_channels(channels, headless, on_channel=lambda ch: self.status_var.set(f"抓取{ch}中...")):
+                        sink.write(it)
+                if not sink.rows:
+                    self.status_var.set("未获取到数据")
+                    messagebox.showwarning("提示", "未获取到热榜数据，可能需要登录或网络受限。")
+                    return
+                out = out or f"hot_all_top{sink.rows}.xlsx"
+                os.replace(pending, out)
+                pending = None
+                self.status_var.set(f"已保存: {os.path.abspath(out)}（{sink.summary()}）")
                 messagebox.showinfo("完成", f"已保存至\n{os.path.abspath(out)}")
             except Exception as e:
                 self.status_var.set("错误")
                 messagebox.showerror("错误", str(e))
             finally:
+                # 无数据或中途出错时删除临时文件（改名成功后 pending 已清空）
+                if pending is not None:
+                    try:
+                        os.remove(pending)
+                    except OSError:
+                        pass
                 self.set_busy(False)
 
         self.set_busy(True)
@@ -472,6 +480,13 @@ class HotGUI:
             messagebox.showwarning("提示", "请至少勾选一个渠道进行抓取。")
             return
 
+        channels = channel_plan(
+            weibo=(weibo_enabled, weibo_limit),
+            toutiao=(toutiao_enabled, toutiao_limit),
+            reddit=(reddit_enabled, reddit_limit),
+            hn=(hn_enabled, hn_limit),
+        )
+
         def run():
             try:
                 if not BASEOPENSDK_AVAILABLE:
@@ -482,28 +497,23 @@ class HotGUI:
                 if not app_token or not table_id or not pbt:
                     raise RuntimeError("缺少 AppToken / TableId / PBT 配置，请在界面填写并保存。")
                 self.status_var.set("抓取中...")
-                all_items: List[Dict] = []
-                if weibo_enabled:
-                    wb_items = scrape_items(limit=weibo_limit, headless=headless, channel="微博")
-                    all_items.extend(wb_items or [])
-                if toutiao_enabled:
-                    tt_items = scrape_items(limit=toutiao_limit, headless=headless, channel="头条")
-                    all_items.extend(tt_items or [])
-                if reddit_enabled:
-                    rd_items = scrape_items(limit=reddit_limit, headless=headless, channel="Reddit")
-                    all_items.extend(rd_items or [])
-                # Google Trends 抓取已移除
-                if hn_enabled:
-                    hn_items = scrape_items(limit=hn_limit, headless=headless, channel="Hacker News")
-                    all_items.extend(hn_items or [])
-                if not all_items:
+                # 边抓边投递：结果按批落盘到发件箱并在后台写入，失败部分由后台按退避策略重试
+                stream = OutboxStream(self.outbox, [{"app_token": app_token, "table_id": table_id, "pbt": pbt}])
+                try:
+                    for it in iter_scrape_channels(
+                        channels, headless, on_channel=lambda ch: self.status_var.set(f"抓取{ch}中（已入队 {stream.rows} 条）...")
+                    ):
+                        stream.write(it)
+                finally:
+                    self.status_var.set("写入飞书中...")
+                    results = stream.close()
+                if not stream.rows:
                     self.status_var.set("未获取到数据")
                     messagebox.showwarning("提示", "未获取到热搜数据，可能需要登录或网络受限。")
                     return
-                self.status_var.set("写入飞书中...")
-                ok = write_to_feishu(all_items, app_token=app_token, table_id=table_id, pbt=pbt)
-                self.status_var.set(f"成功写入 {ok} 条记录")
-                messagebox.showinfo("完成", f"成功写入 {ok} 条记录到飞书多维表。")
+                msg = summarize_outbox_results(results, self._refresh_outbox_status())
+                self.status_var.set(msg)
+                messagebox.showinfo("完成", msg)
             except Exception as e:
                 self.status_var.set("错误")
                 messagebox.showerror("错误", str(e))
@@ -682,29 +692,27 @@ class HotGUI:
                 # Google Trends 兼容逻辑已移除
                 hn_enabled = False
 
+        channels = channel_plan(
+            weibo=(weibo_enabled, weibo_limit),
+            toutiao=(toutiao_enabled, toutiao_limit),
+            reddit=(reddit_enabled, reddit_limit),
+            hn=(hn_enabled, hn_limit),
+        )
+
         def run_job():
             try:
                 self.status_var.set("定时抓取中...")
-                all_items: List[Dict] = []
-                if weibo_enabled:
-                    wb_items = scrape_items(limit=weibo_limit, headless=headless, channel="微博")
-                    all_items.extend(wb_items or [])
-                if toutiao_enabled:
-                    tt_items = scrape_items(limit=toutiao_limit, headless=headless, channel="头条")
-                    all_items.extend(tt_items or [])
-                if reddit_enabled:
-                    rd_items = scrape_items(limit=reddit_limit, headless=headless, channel="Reddit")
-                    all_items.extend(rd_items or [])
-                # Google Trends 抓取已移除
-                if hn_enabled:
-                    hn_items = scrape_items(limit=hn_limit, headless=headless, channel="Hacker News")
-                    all_items.extend(hn_items or [])
-                if not all_items:
+                stream = OutboxStream(self.outbox, [{"app_token": app_token, "table_id": table_id, "pbt": pbt}])
+                try:
+                    # 整次运行共用一个时间预算（HOT_RUN_BUDGET_S），超时的渠道只保留已取得的条目
+                    for it in iter_scrape_channels(channels, headless, deadline=Deadline.from_env()):
+                        stream.write(it)
+                finally:
+                    results = stream.close()
+                if not stream.rows:
                     self.status_var.set("定时未获取到数据")
                     return
-                self.status_var.set("定时写入飞书中...")
-                ok = write_to_feishu(all_items, app_token=app_token, table_id=table_id, pbt=pbt)
-                self.status_var.set(f"定时成功写入 {ok} 条记录")
+                self.status_var.set("定时" + summarize_outbox_results(results, self._refresh_outbox_status()))
             except Exception as e:
                 self.status_var.set("定时任务错误")
                 # 不弹窗打扰，状态提示即可
@@ -817,6 +825,59 @@ class HotGUI:
             target = today_run if today_run > now else (today_run + timedelta(days=1))
         return target
 
+    def _task_channel_plan(self, t: Dict) -> List[Tuple[str, int]]:
+        return channel_plan(
+            weibo=(bool(t.get("weibo_enabled")), int(t.get("weibo_limit", 30))),
+            toutiao=(bool(t.get("toutiao_enabled")), int(t.get("toutiao_limit", 30))),
+            reddit=(bool(t.get("reddit_enabled")), int(t.get("reddit_limit", 30))),
+            hn=(bool(t.get("hn_enabled")), int(t.get("hn_limit", 30))),
+        )
+
+    def _is_adaptive(self, t: Dict) -> bool:
+        return t.get("freq") == INTERVAL_FREQ and bool(t.get("adaptive"))
+
+    def _adaptive_bounds(self, t: Dict) -> Tuple[float, float]:
+        interval_s = float(t.get("interval_s") or MIN_INTERVAL_S)
+        lo = float(t.get("min_interval_s") or interval_s)
+        return lo, max(lo, float(t.get("max_interval_s") or interval_s))
+
+    def _task_due_channels(self, t: Dict) -> Dict[str, datetime]:
+        """自适应任务各渠道的下一次时间；非自适应任务返回空字典。"""
+        if not self._is_adaptive(t):
+            return {}
+        return get_poll_controller().due(t.get("id"), [ch for ch, _ in self._task_channel_plan(t)])
+
+    def _task_time_summary(self, t: Dict) -> str:
+        """管理列表的“时间”列：间隔任务显示间隔与抖动，例如 每5m±10s；自适应任务显示各渠道当前的有效间隔。"""
+        if self._is_adaptive(t):
+            controller = get_poll_controller()
+            initial_s = float(t.get("interval_s") or MIN_INTERVAL_S)
+            bounds = self._adaptive_bounds(t)
+            parts = [
+                f"{ch}{format_interval(round(controller.interval(t.get('id'), ch, initial_s, bounds)))}"
+                for ch, _ in self._task_channel_plan(t)
+            ]
+            return "自适应 " + " ".join(parts)
+        if t.get("freq") == INTERVAL_FREQ:
+            text = f"每{format_interval(t.get('interval_s') or MIN_INTERVAL_S)}"
+            if t.get("jitter_s"):
+                text += f"±{format_interval(t['jitter_s'])}"
+            return text
+        return t.get("time") or ""
+
+    def _read_interval_fields(self, freq: str, time_str: str, interval_text: str, jitter_text: str) -> Tuple[float, float]:
+        """校验时间/间隔输入，返回 (interval_s, jitter_s)；非间隔任务只校验时间。"""
+        if freq != INTERVAL_FREQ:
+            self._parse_time(time_str)
+            return 0.0, 0.0
+        interval_s = parse_interval(interval_text)
+        if interval_s < MIN_INTERVAL_S:
+            raise ValueError(f"间隔不能小于 {MIN_INTERVAL_S} 秒")
+        jitter_s = parse_interval(jitter_text) if jitter_text.strip() else 0.0
+        if jitter_s >= interval_s:
+            raise ValueError("抖动需小于间隔")
+        return interval_s, jitter_s
+
     def _task_channels_summary(self, t: Dict) -> str:
         parts = []
         if t.get("weibo_enabled"): parts.append(f"微博({t.get('weibo_limit', 30)})")
@@ -825,6 +886,35 @@ class HotGUI:
         if t.get("hn_enabled"): parts.append(f"HackerNews({t.get('hn_limit', 30)})")
         return ", ".join(parts) or "(未选择渠道)"
 
+    def _parse_destinations(self, text: str) -> List[Dict]:
+        """解析“额外目标”文本：每行 TableId|渠道1,渠道2|AppToken|PBT，后三项可省略。"""
+        dests: List[Dict] = []
+        for line in (text or "").splitlines():
+            parts = [p.strip() for p in line.split("|")]
+            if not parts or not parts[0]:
+                continue
+            parts += [""] * (4 - len(parts))
+            dests.append({
+                "table_id": parts[0],
+                "channels": self._parse_channel_list(parts[1]),
+                "app_token": parts[2],
+                "pbt": parts[3],
+            })
+        return dests
+
+    def _parse_channel_list(self, text: str) -> List[str]:
+        """解析逗号分隔的渠道列表（支持中文逗号）；空表示全部渠道。"""
+        return [c.strip() for c in (text or "").replace("，", ",").split(",") if c.strip()]
+
+    def _format_destinations(self, dests: List[Dict]) -> str:
+        lines = []
+        for d in dests:
+            parts = [d.get("table_id", ""), ",".join(d.get("channels") or []), d.get("app_token", ""), d.get("pbt", "")]
+            while len(parts) > 1 and not parts[-1]:
+                parts.pop()
+            lines.append("|".join(parts))
+        return "\n".join(lines)
+
     def _load_tasks(self) -> List[Dict]:
         try:
             if not os.path.exists(SCHEDULES_FILE):
@@ -856,9 +946,16 @@ class HotGUI:
         self.task_events[tid] = stop_event
 
         def runner():
+            last_start = None
             while not stop_event.is_set():
-                # 计算下一次运行
-                next_dt = self._compute_next_run(task.get("freq", "每天"), task.get("time", "08:00"), task.get("start_weekday"))
+                # 计算下一次运行；自适应任务取各渠道中最早的下一次时间
+                due = self._task_due_channels(task)
+                if due:
+                    next_dt = min(due.values())
+                elif task.get("freq") == INTERVAL_FREQ:
+                    next_dt = next_interval_run(last_start, float(task.get("interval_s") or MIN_INTERVAL_S), float(task.get("jitter_s") or 0))
+                else:
+                    next_dt = self._compute_next_run(task.get("freq", "每天"), task.get("time", "08:00"), task.get("start_weekday"))
                 task["next_run"] = next_dt.strftime("%Y-%m-%d %H:%M:%S")
                 self._save_tasks()
                 # 等待到时间点或被停止
@@ -867,8 +964,16 @@ class HotGUI:
                 # 使用 stop_event.wait 支持提前停止
                 if stop_event.wait(wait_s):
                     break
-                # 到点执行一次
-                self._run_task_once(task)
+                # 到点执行一次；间隔任务等本次运行结束再排下一次，避免高频轮询时运行重叠
+                last_start = datetime.now()
+                only = None
+                if due:
+                    # 只抓已到点的渠道（顺带相差不到 ADAPTIVE_BATCH_S 秒的）
+                    batch_until = last_start + timedelta(seconds=ADAPTIVE_BATCH_S)
+                    only = [ch for ch, dt in due.items() if dt <= batch_until]
+                th = self._run_task_once(task, only_channels=only)
+                if task.get("freq") == INTERVAL_FREQ:
+                    th.join()
                 # 一次性任务执行完即完成
                 if task.get("freq") == "仅一次":
                     task["status"] = "completed"
@@ -889,13 +994,16 @@ class HotGUI:
         self.task_events.pop(task_id, None)
         self.task_threads.pop(task_id, None)
 
-    def _run_task_once(self, task: Dict):
-        # 运行一次任务：抓取并写入飞书
+    def _run_task_once(self, task: Dict, trigger: str = "schedule", only_channels: List[str] | None = None) -> threading.Thread:
+        # 运行一次任务：抓取并写入飞书；only_channels 给出时只抓这些渠道；返回运行线程
         cfg = load_feishu_config()
-        # 任务内可覆盖飞书参数
-        app_token = task.get("app_token") or cfg.get("app_token") or self.app_token_var.get().strip()
-        table_id = task.get("table_id") or cfg.get("table_id") or self.table_id_var.get().strip()
-        pbt = task.get("pbt") or cfg.get("pbt") or self.pbt_var.get().strip()
+        # 任务内可覆盖飞书参数；可配置多个目标并按渠道路由
+        fallback = {
+            "app_token": cfg.get("app_token") or self.app_token_var.get().strip(),
+            "table_id": cfg.get("table_id") or self.table_id_var.get().strip(),
+            "pbt": cfg.get("pbt") or self.pbt_var.get().strip(),
+        }
+        destinations = normalize_destinations(task, fallback)
         headless = bool(task.get("headless", bool(self.headless_var.get())))
         weibo_enabled = bool(task.get("weibo_enabled", False))
         toutiao_enabled = bool(task.get("toutiao_enabled", False))
@@ -908,58 +1016,177 @@ class HotGUI:
         save_excel = bool(task.get("save_excel", False))
         save_feishu = bool(task.get("save_feishu", True))
         excel_dir = task.get("excel_dir") or "."
+        rolling_period = EXCEL_MODES.get(task.get("excel_mode") or "每次新文件")
+        sink_kind = task.get("sink") or "excel"
+        # 仅输出变化：只写入相对本任务上一次新上榜或排名变化的行，榜单不变时不写入
+        changes = ChangeRun(get_change_feed(), task.get("id")) if task.get("changes_only") else None
+
+        channels = channel_plan(
+            weibo=(weibo_enabled, weibo_limit),
+            toutiao=(toutiao_enabled, toutiao_limit),
+            reddit=(reddit_enabled, reddit_limit),
+            hn=(hn_enabled, hn_limit),
+        )
+        if only_channels is not None:
+            channels = [(ch, limit) for ch, limit in channels if ch in only_channels]
 
         def run_job():
+            tid = task.get("id")
+            started = datetime.now()
+            notes: List[str] = []
+            # 每次运行都记入台账（含失败与无数据），任务管理中可查看最近运行与耗时趋势
+            run = RunRecord(tid, trigger)
+            t_start = time.perf_counter()
+            pipe = None
+            reports: Dict[str, Dict] = {}
+            # 自适应间隔：记下各渠道本次完整看到的榜单（过滤变化之前），与本任务上一次对比计算变动率
+            boards: Dict[str, Dict] = {}
             try:
-                self.status_var.set(f"任务 {task.get('id')} 抓取中...")
-                all_items: List[Dict] = []
-                if weibo_enabled:
-                    all_items.extend(scrape_items(limit=weibo_limit, headless=headless, channel="微博") or [])
-                if toutiao_enabled:
-                    all_items.extend(scrape_items(limit=toutiao_limit, headless=headless, channel="头条") or [])
-                if reddit_enabled:
-                    all_items.extend(scrape_items(limit=reddit_limit, headless=headless, channel="Reddit") or [])
-                if hn_enabled:
-                    all_items.extend(scrape_items(limit=hn_limit, headless=headless, channel="Hacker News") or [])
-                if not all_items:
-                    self.status_var.set(f"任务 {task.get('id')} 未获取到数据")
-                    return
-                # 保存到 Excel（可选）
-                if save_excel:
+                self.status_var.set(f"任务 {tid} 抓取中...")
+                # 分阶段流水线：各渠道并行抓取，文件与飞书写入端并行消费，互不等待。
+                # 整次运行共用一个时间预算（任务的 budget_s，缺省为 HOT_RUN_BUDGET_S）：
+                # 到点仍未完成的渠道被取消，已完成的渠道照常写入，运行记为不完整
+                deadline = Deadline.from_env(task.get("budget_s"))
+                pipe = TaskPipeline(deadline=deadline)
+                # 设置了 HOT_SCRAPE_WORKERS 时各渠道交给进程池中的常驻浏览器抓取
+                pool = get_scrape_pool()
+                scrape = pool.iter_scrape_items if pool is not None else iter_scrape_items
+                for ch, limit in channels:
+                    reports[ch] = {}
+
+                    def source(ch=ch, limit=limit):
+                        items = scrape(limit, headless, ch, report=reports[ch], deadline=deadline)
+                        if self._is_adaptive(task):
+                            boards[ch] = {"items": [], "complete": False}
+                            items = self._record_board(items, boards[ch])
+                        return changes.iter_changes(ch, items, reports[ch]) if changes is not None else items
+
+                    pipe.add_source(ch, source)
+
+                sink = None
+                if save_excel and rolling_period:
+                    rolling_items: List[Dict] = []
+
+                    def finish_rolling():
+                        if not rolling_items:
+                            return None
+                        # 滚动导出：只追加到当天侧车文件，按需压实为工作簿
+                        rolling = RollingExport(os.path.abspath(excel_dir), period=rolling_period)
+                        n = rolling.append(rolling_items)
+                        rolling.compact_due()
+                        return f"已追加 {n} 行到滚动导出: {rolling.workbook_path(datetime.now().date())}"
+
+                    pipe.add_sink("Excel", rolling_items.append, finish_rolling)
+                elif save_excel:
                     try:
                         # 生成文件名（含时间戳）
                         ts = datetime.now().strftime("%Y%m%d_%H%M")
-                        enabled_count = sum([weibo_enabled, toutiao_enabled, reddit_enabled, hn_enabled])
-                        if enabled_count > 1:
-                            out = f"hot_all_{ts}.xlsx"
+                        if len(channels) > 1:
+                            out = f"hot_all_{ts}"
                         elif weibo_enabled:
-                            out = f"weibo_hot_{ts}.xlsx"
+                            out = f"weibo_hot_{ts}"
                         elif toutiao_enabled:
-                            out = f"toutiao_hot_{ts}.xlsx"
+                            out = f"toutiao_hot_{ts}"
                         elif reddit_enabled:
-                            out = f"reddit_hot_{ts}.xlsx"
+                            out = f"reddit_hot_{ts}"
                         else:
-                            out = f"hn_hot_{ts}.xlsx"
-                        full_path = os.path.abspath(os.path.join(excel_dir, out))
-                        save_to_excel(all_items, path=full_path)
-                        self.status_var.set(f"任务 {task.get('id')} 已保存Excel: {full_path}")
-                    except Exception as e:
-                        self.status_var.set(f"任务 {task.get('id')} 保存Excel失败: {e}")
+                            out = f"hn_hot_{ts}"
+                        # 扩展名由导出格式决定
+                        sink = open_sink(sink_kind, os.path.abspath(os.path.join(excel_dir, out)))
+
+                        def finish_file(sink=sink):
+                            sink.close()
+                            return f"已保存: {sink.path}（{sink.summary()}）"
 
-                # 写入飞书（可选）
+                        pipe.add_sink("Excel" if sink_kind == "excel" else sink_kind.upper(), sink.write, finish_file)
+                    except Exception as e:
+                        notes.append(f"保存Excel失败: {e}")
+                        run.error(f"保存Excel失败: {e}")
                 if save_feishu:
-                    if not BASEOPENSDK_AVAILABLE or not app_token or not table_id or not pbt:
-                        self.status_var.set("飞书参数缺失，未写入")
+                    if not BASEOPENSDK_AVAILABLE or not destinations:
+                        notes.append("飞书参数缺失，未写入")
+                        run.error("飞书参数缺失，未写入")
+                    else:
+                        stream = OutboxStream(self.outbox, destinations)
+                        pipe.add_sink("飞书", stream.write, stream.close)
+
+                pipe.run()
+                if changes is not None and not any(st.error for st in pipe.stages if st.kind == "sink"):
+                    # 变化已全部写出（飞书为落盘到发件箱）后才记下本次榜单；写入失败时下次重新输出这些变化
+                    changes.commit()
+                if not pipe.items:
+                    if sink is not None:
+                        # 未写入任何行的导出文件没有意义，直接删除
+                        try:
+                            os.remove(sink.path)
+                        except OSError:
+                            pass
+                    if changes is not None and reports and all(r.get("unchanged") for r in reports.values()):
+                        self.status_var.set(f"任务 {tid} 榜单无变化，跳过写入")
                     else:
-                        self.status_var.set(f"任务 {task.get('id')} 写入飞书中...")
-                        ok = write_to_feishu(all_items, app_token=app_token, table_id=table_id, pbt=pbt)
-                        self.status_var.set(f"任务 {task.get('id')} 成功写入 {ok} 条记录")
+                        self.status_var.set(f"任务 {tid} 未获取到数据")
+                    return
+                for st in pipe.stages:
+                    if st.kind != "sink":
+                        continue
+                    if st.error:
+                        notes.append(f"{'写入飞书' if st.name == '飞书' else '保存' + st.name}失败: {st.error}")
+                    elif st.name == "飞书":
+                        notes.append(summarize_outbox_results(st.result or [], self._refresh_outbox_status()))
+                    elif st.result:
+                        notes.append(st.result)
                 if not save_excel and not save_feishu:
-                    self.status_var.set(f"任务 {task.get('id')} 未选择保存方式")
-            except Exception:
-                self.status_var.set(f"任务 {task.get('id')} 发生错误")
+                    notes.append("未选择保存方式")
+                notes.append(pipe.summary())
+                print(f"任务 {tid} 流水线: {pipe.report()}")
+                self.status_var.set(f"任务 {tid} " + "；".join(notes))
+            except Exception as e:
+                run.error(str(e))
+                self.status_var.set(f"任务 {tid} 发生错误")
+            finally:
+                if self._is_adaptive(task):
+                    # 按各渠道本次的榜单变动率调整间隔，并排定下一次（失败的渠道间隔不变）
+                    controller = get_poll_controller()
+                    for ch, _ in channels:
+                        churn = None
+                        board = boards.get(ch) or {}
+                        if board.get("complete") and not (reports.get(ch) or {}).get("partial"):
+                            churn = controller.measure(tid, ch, board["items"])
+                            if churn is not None:
+                                reports[ch]["churn"] = churn
+                        controller.observe(
+                            tid, ch, churn, started,
+                            float(task.get("interval_s") or MIN_INTERVAL_S), self._adaptive_bounds(task), float(task.get("jitter_s") or 0),
+                        )
+                self._record_run(run, pipe, reports, time.perf_counter() - t_start)
 
-        threading.Thread(target=run_job, daemon=True).start()
+        th = threading.Thread(target=run_job, daemon=True)
+        th.start()
+        return th
+
+    @staticmethod
+    def _record_board(items, board: Dict):
+        """透传条目流，同时记下排名与标题；完整消费后 board["complete"] 为 True（出错或被放弃时保持 False）。"""
+        for it in items:
+            board["items"].append({"rank": it.get("rank"), "title": it.get("title")})
+            yield it
+        board["complete"] = True
+
+    def _record_run(self, run: RunRecord, pipe: TaskPipeline | None, reports: Dict[str, Dict], duration_s: float) -> None:
+        """把流水线各阶段结果写入运行台账；台账写入失败不影响任务。"""
+        try:
+            for st in (pipe.stages if pipe is not None else []):
+                if st.kind == "source":
+                    run.channel(st.name, st.items, st.wall_s, reports.get(st.name), st.error, partial=st.cancelled)
+                elif st.kind == "sink":
+                    rows = st.items
+                    if st.name == "飞书" and isinstance(st.result, list):
+                        # 飞书按实际写入成功的记录数计（失败的留在发件箱重试）
+                        rows = sum(r.get("ok", 0) for r in st.result)
+                    run.sink(st.name, rows, st.error)
+            self.run_ledger.append(run.finish(duration_s).to_dict())
+        except Exception as e:
+            print(f"记录运行台账失败: {e}")
 
     def open_schedules_manager_dialog(self):
         dlg = tk.Toplevel(self.root)
@@ -973,14 +1200,14 @@ class HotGUI:
         tv = ttk.Treeview(frm, columns=cols, show="headings", height=10)
         for c, txt in zip(cols, ["ID", "频率", "时间", "下一次", "状态", "渠道"]):
             tv.heading(c, text=txt)
-            tv.column(c, width=100 if c != "channels" else 260, anchor=tk.W)
+            tv.column(c, width={"channels": 260, "time": 200}.get(c, 100), anchor=tk.W)
         tv.pack(fill=tk.BOTH, expand=True)
 
         # 填充当前任务
         self.tasks = self._load_tasks()
         tv.delete(*tv.get_children())
         for t in self.tasks:
-            tv.insert("", tk.END, values=(t.get("id"), t.get("freq"), t.get("time"), t.get("next_run"), t.get("status"), self._task_channels_summary(t)))
+            tv.insert("", tk.END, values=(t.get("id"), t.get("freq"), self._task_time_summary(t), t.get("next_run"), t.get("status"), self._task_channels_summary(t)))
 
         btns = ttk.Frame(frm)
         btns.pack(fill=tk.X, pady=8)
@@ -989,7 +1216,7 @@ class HotGUI:
             self.tasks = self._load_tasks()
             tv.delete(*tv.get_children())
             for t in self.tasks:
-                tv.insert("", tk.END, values=(t.get("id"), t.get("freq"), t.get("time"), t.get("next_run"), t.get("status"), self._task_channels_summary(t)))
+                tv.insert("", tk.END, values=(t.get("id"), t.get("freq"), self._task_time_summary(t), t.get("next_run"), t.get("status"), self._task_channels_summary(t)))
 
         def get_selected_task() -> Dict | None:
             sel = tv.selection()
@@ -1010,11 +1237,21 @@ class HotGUI:
             details = (
                 f"ID: {t.get('id')}\n"
                 f"频率: {t.get('freq')}\n"
-                f"时间: {t.get('time')}\n"
+                f"时间: {self._task_time_summary(t)}\n"
+                f"仅输出变化: {'是' if t.get('changes_only') else '否'}\n"
                 f"下一次: {t.get('next_run')}\n"
                 f"状态: {t.get('status')}\n"
                 f"渠道: {self._task_channels_summary(t)}\n"
+                f"写入目标: {len(normalize_destinations(t))} 个\n"
             )
+            if self._is_adaptive(t):
+                # 自适应任务：各渠道的有效间隔、最近变动率与下一次时间
+                lo, hi = self._adaptive_bounds(t)
+                details += f"间隔范围: {format_interval(lo)}-{format_interval(hi)}\n"
+                for ch, st in get_poll_controller().snapshot(t.get("id")).items():
+                    churn = st.get("churn")
+                    churn_text = f"{churn:.0%}" if churn is not None else "-"
+                    details += f"  {ch}: 间隔 {format_interval(round(st.get('interval_s') or 0))}，变动率 {churn_text}，下一次 {st.get('next_run')}\n"
             messagebox.showinfo("任务详情", details)
 
         def on_stop():
@@ -1030,13 +1267,15 @@ class HotGUI:
             t = get_selected_task()
             if not t:
                 return
-            self._run_task_once(t)
+            self._run_task_once(t, trigger="manual")
 
         def on_delete():
             t = get_selected_task()
             if not t:
                 return
             self._stop_task_thread(t.get("id"))
+            get_change_feed().forget(t.get("id"))
+            get_poll_controller().forget(t.get("id"))
             self.tasks = [x for x in self.tasks if x.get("id") != t.get("id")]
             self._save_tasks()
             refresh_tv()
@@ -1053,6 +1292,50 @@ class HotGUI:
         ttk.Button(btns, text="执行", command=on_run_once).pack(side=tk.LEFT, padx=4)
         ttk.Button(btns, text="删除", command=on_delete).pack(side=tk.LEFT, padx=4)
 
+        # 最近运行：选中任务时只显示该任务，否则显示全部任务
+        runs_frm = ttk.LabelFrame(frm, text="最近运行", padding=6)
+        runs_frm.pack(fill=tk.BOTH, expand=True)
+        run_cols = ("started_at", "task", "trigger", "duration", "status", "rows", "channels", "errors")
+        run_tv = ttk.Treeview(runs_frm, columns=run_cols, show="headings", height=8)
+        widths = {"started_at": 140, "task": 90, "trigger": 50, "duration": 60, "status": 60, "rows": 110, "channels": 300, "errors": 220}
+        for c, txt in zip(run_cols, ["开始时间", "任务", "触发", "耗时", "结果", "写入行数", "渠道（条数/方式 耗时）", "错误"]):
+            run_tv.heading(c, text=txt)
+            run_tv.column(c, width=widths[c], anchor=tk.W)
+        run_tv.pack(fill=tk.BOTH, expand=True)
+        trend_var = tk.StringVar(value="")
+        ttk.Label(runs_frm, textvariable=trend_var, foreground="#555", justify=tk.LEFT).pack(anchor=tk.W, pady=(4, 0))
+        status_text = {"ok": "成功", "partial": "部分完成", "unchanged": "无变化", "empty": "无数据", "error": "失败", "running": "运行中"}
+        trigger_text = {"schedule": "定时", "manual": "手动"}
+
+        def refresh_runs(_event=None):
+            sel = tv.selection()
+            tid = tv.item(sel[0], "values")[0] if sel else None
+            try:
+                runs = self.run_ledger.recent(tid, limit=30)
+            except Exception as e:
+                runs = []
+                print(f"读取运行台账失败: {e}")
+            run_tv.delete(*run_tv.get_children())
+            for r in runs:
+                rows = "，".join(f"{k} {v}" for k, v in (r.get("rows") or {}).items())
+                run_tv.insert("", tk.END, values=(
+                    r.get("started_at"),
+                    r.get("task_id"),
+                    trigger_text.get(r.get("trigger"), r.get("trigger")),
+                    f"{float(r.get('duration_s') or 0):.1f}s",
+                    status_text.get(r.get("status"), r.get("status")),
+                    rows,
+                    summarize_run(r),
+                    "；".join(r.get("errors") or []),
+                ))
+            # 耗时趋势只对单个任务有意义（不同任务的渠道与条数不同）
+            trend = duration_trend(runs) if tid is not None else []
+            trend_var.set("耗时趋势：" + "；".join(trend) if trend else "")
+
+        tv.bind("<<TreeviewSelect>>", refresh_runs)
+        ttk.Button(btns, text="刷新运行记录", command=refresh_runs).pack(side=tk.RIGHT, padx=4)
+        refresh_runs()
+
     def restore_schedules(self):
         # 加载所有任务并启动线程（仅对状态为 scheduled 的任务）
         self.tasks = self._load_tasks()
@@ -1103,7 +1386,7 @@ class HotGUI:
         ttk.Label(container, text="保存到哪里").grid(row=row, column=0, sticky=tk.W)
         save_excel_var = tk.BooleanVar(value=True)
         save_feishu_var = tk.BooleanVar(value=True)
-        ttk.Checkbutton(container, text="保存到Excel", variable=save_excel_var).grid(row=row, column=1, sticky=tk.W)
+        ttk.Checkbutton(container, text="保存到文件", variable=save_excel_var).grid(row=row, column=1, sticky=tk.W)
         ttk.Checkbutton(container, text="写入飞书", variable=save_feishu_var).grid(row=row, column=2, sticky=tk.W)
         row += 1
         ttk.Label(container, text="Excel保存目录").grid(row=row, column=0, sticky=tk.W)
@@ -1114,6 +1397,13 @@ class HotGUI:
             if d:
                 excel_dir_var.set(d)
         ttk.Button(container, text="选择…", command=choose_dir).grid(row=row, column=3, sticky=tk.W)
+        row += 1
+        ttk.Label(container, text="Excel方式").grid(row=row, column=0, sticky=tk.W)
+        excel_mode_var = tk.StringVar(value="每次新文件")
+        ttk.Combobox(container, textvariable=excel_mode_var, values=list(EXCEL_MODES), state="readonly", width=10).grid(row=row, column=1, sticky=tk.W)
+        ttk.Label(container, text="文件格式").grid(row=row, column=2, sticky=tk.W)
+        sink_label_var = tk.StringVar(value="Excel")
+        ttk.Combobox(container, textvariable=sink_label_var, values=list(SINK_LABELS), state="readonly", width=10).grid(row=row, column=3, sticky=tk.W)
 
         # 行：飞书参数
         row += 1
@@ -1131,6 +1421,18 @@ class HotGUI:
         row += 1
         ttk.Label(container, text="PBT").grid(row=row, column=0, sticky=tk.W)
         ttk.Entry(container, textvariable=pbt_var).grid(row=row, column=1, columnspan=3, sticky=tk.EW)
+        row += 1
+        ttk.Label(container, text="主目标渠道").grid(row=row, column=0, sticky=tk.W)
+        primary_channels_var = tk.StringVar(value="")
+        ttk.Entry(container, textvariable=primary_channels_var).grid(row=row, column=1, columnspan=3, sticky=tk.EW)
+        row += 1
+        ttk.Label(container, text=PRIMARY_CHANNELS_HELP, foreground="#666").grid(row=row, column=1, columnspan=3, sticky=tk.W)
+        row += 1
+        ttk.Label(container, text="额外目标").grid(row=row, column=0, sticky=tk.NW)
+        dest_text = tk.Text(container, height=3, width=48)
+        dest_text.grid(row=row, column=1, columnspan=3, sticky=tk.EW)
+        row += 1
+        ttk.Label(container, text=DESTINATIONS_HELP, foreground="#666").grid(row=row, column=1, columnspan=3, sticky=tk.W)
 
         # 行：时间与频率
         row += 1
@@ -1139,7 +1441,23 @@ class HotGUI:
         ttk.Entry(container, textvariable=time_var, width=10).grid(row=row, column=1, sticky=tk.W)
         ttk.Label(container, text="频率").grid(row=row, column=2, sticky=tk.W)
         freq_var = tk.StringVar(value=self.freq_var.get().strip())
-        ttk.Combobox(container, textvariable=freq_var, values=["仅一次", "每天", "每周"], state="readonly", width=8).grid(row=row, column=3, sticky=tk.W)
+        ttk.Combobox(container, textvariable=freq_var, values=FREQ_OPTIONS, state="readonly", width=8).grid(row=row, column=3, sticky=tk.W)
+        row += 1
+        ttk.Label(container, text="间隔(如 90s/5m)").grid(row=row, column=0, sticky=tk.W)
+        interval_var = tk.StringVar(value="5m")
+        ttk.Entry(container, textvariable=interval_var, width=10).grid(row=row, column=1, sticky=tk.W)
+        ttk.Label(container, text="抖动").grid(row=row, column=2, sticky=tk.W)
+        jitter_var = tk.StringVar(value="10s")
+        ttk.Entry(container, textvariable=jitter_var, width=10).grid(row=row, column=3, sticky=tk.W)
+        row += 1
+        changes_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(container, text="仅输出变化的行（榜单无变化时跳过写入）", variable=changes_only_var).grid(row=row, column=1, columnspan=3, sticky=tk.W)
+        row += 1
+        adaptive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(container, text="按榜单变化自适应间隔", variable=adaptive_var).grid(row=row, column=1, sticky=tk.W)
+        ttk.Label(container, text="范围").grid(row=row, column=2, sticky=tk.W)
+        range_var = tk.StringVar(value="1m-30m")
+        ttk.Entry(container, textvariable=range_var, width=10).grid(row=row, column=3, sticky=tk.W)
 
         # 操作按钮
         row += 1
@@ -1149,7 +1467,9 @@ class HotGUI:
             try:
                 freq = freq_var.get().strip()
                 time_str = time_var.get().strip()
-                self._parse_time(time_str)
+                interval_s, jitter_s = self._read_interval_fields(freq, time_str, interval_var.get(), jitter_var.get())
+                adaptive = freq == INTERVAL_FREQ and bool(adaptive_var.get())
+                min_interval_s, max_interval_s = parse_interval_range(range_var.get()) if adaptive else (0.0, 0.0)
                 weibo_enabled = bool(weibo_var.get())
                 toutiao_enabled = bool(toutiao_var.get())
                 reddit_enabled = bool(reddit_var.get())
@@ -1159,7 +1479,10 @@ class HotGUI:
                     return
                 task_id = uuid.uuid4().hex[:8]
                 start_weekday = datetime.now().weekday()
-                next_run = self._compute_next_run(freq, time_str, start_weekday)
+                if freq == INTERVAL_FREQ:
+                    next_run = next_interval_run(None, interval_s, jitter_s)
+                else:
+                    next_run = self._compute_next_run(freq, time_str, start_weekday)
                 task = {
                     "id": task_id,
                     "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -1167,6 +1490,12 @@ class HotGUI:
                     "freq": freq,
                     "time": time_str,
                     "start_weekday": start_weekday,
+                    "interval_s": interval_s,
+                    "jitter_s": jitter_s,
+                    "changes_only": bool(changes_only_var.get()),
+                    "adaptive": adaptive,
+                    "min_interval_s": min_interval_s,
+                    "max_interval_s": max_interval_s,
                     "next_run": next_run.strftime("%Y-%m-%d %H:%M:%S"),
                     "headless": True,
                     "weibo_enabled": weibo_enabled,
@@ -1179,10 +1508,14 @@ class HotGUI:
                     "hn_limit": max(1, int(hn_limit_var.get())),
                     "save_excel": bool(save_excel_var.get()),
                     "excel_dir": excel_dir_var.get().strip() or ".",
+                    "excel_mode": excel_mode_var.get().strip() or "每次新文件",
+                    "sink": SINK_LABELS.get(sink_label_var.get().strip(), "excel"),
                     "save_feishu": bool(save_feishu_var.get()),
                     "app_token": app_token_var.get().strip(),
                     "table_id": table_id_var.get().strip(),
                     "pbt": pbt_var.get().strip(),
+                    "primary_channels": self._parse_channel_list(primary_channels_var.get()),
+                    "destinations": self._parse_destinations(dest_text.get("1.0", tk.END)),
                 }
                 self.tasks.append(task)
                 self._save_tasks()
@@ -1244,7 +1577,7 @@ class HotGUI:
 
         row += 1
         ttk.Label(container, text="保存到哪里").grid(row=row, column=0, sticky=tk.W)
-        ttk.Checkbutton(container, text="保存到Excel", variable=save_excel_var).grid(row=row, column=1, sticky=tk.W)
+        ttk.Checkbutton(container, text="保存到文件", variable=save_excel_var).grid(row=row, column=1, sticky=tk.W)
         ttk.Checkbutton(container, text="写入飞书", variable=save_feishu_var).grid(row=row, column=2, sticky=tk.W)
         row += 1
         ttk.Label(container, text="Excel保存目录").grid(row=row, column=0, sticky=tk.W)
@@ -1254,6 +1587,14 @@ class HotGUI:
             if d:
                 excel_dir_var.set(d)
         ttk.Button(container, text="选择…", command=choose_dir2).grid(row=row, column=3, sticky=tk.W)
+        row += 1
+        ttk.Label(container, text="Excel方式").grid(row=row, column=0, sticky=tk.W)
+        excel_mode_var = tk.StringVar(value=task.get("excel_mode") or "每次新文件")
+        ttk.Combobox(container, textvariable=excel_mode_var, values=list(EXCEL_MODES), state="readonly", width=10).grid(row=row, column=1, sticky=tk.W)
+        ttk.Label(container, text="文件格式").grid(row=row, column=2, sticky=tk.W)
+        sink_labels = {v: k for k, v in SINK_LABELS.items()}
+        sink_label_var = tk.StringVar(value=sink_labels.get(task.get("sink") or "excel", "Excel"))
+        ttk.Combobox(container, textvariable=sink_label_var, values=list(SINK_LABELS), state="readonly", width=10).grid(row=row, column=3, sticky=tk.W)
 
         row += 1
         ttk.Label(container, text="飞书参数").grid(row=row, column=0, sticky=tk.W)
@@ -1266,12 +1607,44 @@ class HotGUI:
         row += 1
         ttk.Label(container, text="PBT").grid(row=row, column=0, sticky=tk.W)
         ttk.Entry(container, textvariable=pbt_var).grid(row=row, column=1, columnspan=3, sticky=tk.EW)
+        row += 1
+        ttk.Label(container, text="主目标渠道").grid(row=row, column=0, sticky=tk.W)
+        primary_channels_var = tk.StringVar(value=",".join(task.get("primary_channels") or []))
+        ttk.Entry(container, textvariable=primary_channels_var).grid(row=row, column=1, columnspan=3, sticky=tk.EW)
+        row += 1
+        ttk.Label(container, text=PRIMARY_CHANNELS_HELP, foreground="#666").grid(row=row, column=1, columnspan=3, sticky=tk.W)
+        row += 1
+        ttk.Label(container, text="额外目标").grid(row=row, column=0, sticky=tk.NW)
+        dest_text = tk.Text(container, height=3, width=48)
+        dest_text.grid(row=row, column=1, columnspan=3, sticky=tk.EW)
+        dest_text.insert("1.0", self._format_destinations(task.get("destinations") or []))
+        row += 1
+        ttk.Label(container, text=DESTINATIONS_HELP, foreground="#666").grid(row=row, column=1, columnspan=3, sticky=tk.W)
 
         row += 1
         ttk.Label(container, text="时间(HH:MM)").grid(row=row, column=0, sticky=tk.W)
         ttk.Entry(container, textvariable=time_var, width=10).grid(row=row, column=1, sticky=tk.W)
         ttk.Label(container, text="频率").grid(row=row, column=2, sticky=tk.W)
-        ttk.Combobox(container, textvariable=freq_var, values=["仅一次", "每天", "每周"], state="readonly", width=8).grid(row=row, column=3, sticky=tk.W)
+        ttk.Combobox(container, textvariable=freq_var, values=FREQ_OPTIONS, state="readonly", width=8).grid(row=row, column=3, sticky=tk.W)
+        row += 1
+        ttk.Label(container, text="间隔(如 90s/5m)").grid(row=row, column=0, sticky=tk.W)
+        interval_var = tk.StringVar(value=format_interval(task.get("interval_s") or 300))
+        ttk.Entry(container, textvariable=interval_var, width=10).grid(row=row, column=1, sticky=tk.W)
+        ttk.Label(container, text="抖动").grid(row=row, column=2, sticky=tk.W)
+        jitter_var = tk.StringVar(value=format_interval(task.get("jitter_s") or 0))
+        ttk.Entry(container, textvariable=jitter_var, width=10).grid(row=row, column=3, sticky=tk.W)
+        row += 1
+        changes_only_var = tk.BooleanVar(value=bool(task.get("changes_only")))
+        ttk.Checkbutton(container, text="仅输出变化的行（榜单无变化时跳过写入）", variable=changes_only_var).grid(row=row, column=1, columnspan=3, sticky=tk.W)
+        row += 1
+        adaptive_var = tk.BooleanVar(value=bool(task.get("adaptive")))
+        ttk.Checkbutton(container, text="按榜单变化自适应间隔", variable=adaptive_var).grid(row=row, column=1, sticky=tk.W)
+        ttk.Label(container, text="范围").grid(row=row, column=2, sticky=tk.W)
+        range_var = tk.StringVar(value=(
+            f"{format_interval(task['min_interval_s'])}-{format_interval(task['max_interval_s'])}"
+            if task.get("min_interval_s") and task.get("max_interval_s") else "1m-30m"
+        ))
+        ttk.Entry(container, textvariable=range_var, width=10).grid(row=row, column=3, sticky=tk.W)
 
         row += 1
         btns = ttk.Frame(container)
@@ -1279,10 +1652,18 @@ class HotGUI:
         def save_edit():
             try:
                 new_time = time_var.get().strip()
-                self._parse_time(new_time)
                 new_freq = freq_var.get().strip()
+                interval_s, jitter_s = self._read_interval_fields(new_freq, new_time, interval_var.get(), jitter_var.get())
+                adaptive = new_freq == INTERVAL_FREQ and bool(adaptive_var.get())
+                min_interval_s, max_interval_s = parse_interval_range(range_var.get()) if adaptive else (0.0, 0.0)
                 task["time"] = new_time
                 task["freq"] = new_freq
+                task["interval_s"] = interval_s
+                task["jitter_s"] = jitter_s
+                task["changes_only"] = bool(changes_only_var.get())
+                task["adaptive"] = adaptive
+                task["min_interval_s"] = min_interval_s
+                task["max_interval_s"] = max_interval_s
                 task["headless"] = True
                 task["weibo_enabled"] = bool(weibo_var.get())
                 task["weibo_limit"] = max(1, int(weibo_limit_var.get()))
@@ -1294,10 +1675,14 @@ class HotGUI:
                 task["hn_limit"] = max(1, int(hn_limit_var.get()))
                 task["save_excel"] = bool(save_excel_var.get())
                 task["excel_dir"] = excel_dir_var.get().strip() or "."
+                task["excel_mode"] = excel_mode_var.get().strip() or "每次新文件"
+                task["sink"] = SINK_LABELS.get(sink_label_var.get().strip(), "excel")
                 task["save_feishu"] = bool(save_feishu_var.get())
                 task["app_token"] = app_token_var.get().strip()
                 task["table_id"] = table_id_var.get().strip()
                 task["pbt"] = pbt_var.get().strip()
+                task["primary_channels"] = self._parse_channel_list(primary_channels_var.get())
+                task["destinations"] = self._parse_destinations(dest_text.get("1.0", tk.END))
                 # 重启线程以应用新配置
                 self._start_task_thread(task)
                 self._save_tasks()
@@ -1310,6 +1695,96 @@ class HotGUI:
         ttk.Button(btns, text="取消", command=dlg.destroy).pack(side=tk.RIGHT)
         container.columnconfigure(1, weight=1)
 
+    # ===== 历史导出弹窗 =====
+    def open_history_export_dialog(self):
+        dlg = tk.Toplevel(self.root)
+        dlg.title("从历史库导出")
+        dlg.transient(self.root)
+        dlg.grab_set()
+        container = ttk.Frame(dlg, padding=12)
+        container.pack(fill=tk.BOTH, expand=True)
+
+        try:
+            channels = get_history_store().channels()
+        except Exception:
+            channels = []
+        today = datetime.now().strftime("%Y-%m-%d")
+        channel_var = tk.StringVar(value="全部")
+        since_var = tk.StringVar(value=today)
+        until_var = tk.StringVar(value=today)
+        per_channel_var = tk.BooleanVar(value=False)
+
+        ttk.Label(container, text="渠道").grid(row=0, column=0, sticky=tk.W)
+        ttk.Combobox(container, textvariable=channel_var, values=["全部"] + channels, state="readonly", width=14).grid(row=0, column=1, sticky=tk.W)
+        ttk.Label(container, text="开始(YYYY-MM-DD[ HH:MM])").grid(row=1, column=0, sticky=tk.W)
+        ttk.Entry(container, textvariable=since_var, width=20).grid(row=1, column=1, sticky=tk.W)
+        ttk.Label(container, text="结束(YYYY-MM-DD[ HH:MM])").grid(row=2, column=0, sticky=tk.W)
+        ttk.Entry(container, textvariable=until_var, width=20).grid(row=2, column=1, sticky=tk.W)
+        ttk.Checkbutton(container, text="每个渠道一个工作表", variable=per_channel_var).grid(row=3, column=1, sticky=tk.W)
+
+        def iter_query():
+            ch = channel_var.get().strip()
+            return get_history_store().iter_items(
+                channel=None if ch == "全部" else ch,
+                since=since_var.get().strip() or None,
+                until=until_var.get().strip() or None,
+            )
+
+        def query() -> List[Dict]:
+            return list(iter_query())
+
+        def export_excel():
+            out = filedialog.asksaveasfilename(defaultextension=".xlsx", initialfile=f"hot_history_{today.replace('-', '')}.xlsx")
+            if not out:
+                return
+            per_channel = bool(per_channel_var.get())
+            dlg.destroy()
+
+            def run():
+                try:
+                    self.status_var.set("导出历史中...")
+                    # 直接流式导出查询结果，不在内存中汇总
+                    n = export_items_to_excel(iter_query(), out, sheet_per_channel=per_channel)
+                    if not n:
+                        try:
+                            os.remove(out)
+                        except OSError:
+                            pass
+                        self.status_var.set("所选范围内没有历史数据")
+                        return
+                    self.status_var.set(f"已导出 {n} 条历史: {out}")
+                    messagebox.showinfo("完成", f"已导出 {n} 条至\n{out}")
+                except Exception as e:
+                    self.status_var.set("错误")
+                    messagebox.showerror("错误", str(e))
+
+            threading.Thread(target=run, daemon=True).start()
+
+        def export_feishu():
+            try:
+                if not BASEOPENSDK_AVAILABLE:
+                    raise RuntimeError("BaseOpenSDK 未安装或不可用。")
+                app_token = self.app_token_var.get().strip()
+                table_id = self.table_id_var.get().strip()
+                pbt = self.pbt_var.get().strip()
+                if not app_token or not table_id or not pbt:
+                    raise RuntimeError("缺少 AppToken / TableId / PBT 配置，请先设置多维表参数。")
+                items = query()
+                if not items:
+                    messagebox.showwarning("提示", "所选范围内没有历史数据。")
+                    return
+                self.outbox.enqueue(items, {"app_token": app_token, "table_id": table_id, "pbt": pbt})
+                self.status_var.set(f"已提交 {len(items)} 条历史到飞书发件箱")
+                dlg.destroy()
+                threading.Thread(target=lambda: (self.outbox.drain(), self._refresh_outbox_status()), daemon=True).start()
+            except Exception as e:
+                messagebox.showerror("错误", str(e))
+
+        btns = ttk.Frame(container)
+        btns.grid(row=4, column=0, columnspan=2, sticky=tk.E, pady=(10, 0))
+        ttk.Button(btns, text="导出到Excel", command=export_excel).pack(side=tk.RIGHT, padx=6)
+        ttk.Button(btns, text="写入飞书", command=export_feishu).pack(side=tk.RIGHT)
+
     # ===== 多维表参数弹窗 =====
     def open_feishu_settings_dialog(self):
         dlg = tk.Toplevel(self.root)
@@ -1395,10 +1870,13 @@ class HotGUI:
 
 
 def main():
+    metrics.start_from_env()
     root = tk.Tk()
     HotGUI(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
+    # 打包版启动抓取进程池的工作进程时需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
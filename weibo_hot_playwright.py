@@ -1,11 +1,19 @@
 import os
-from datetime import datetime
-from typing import List, Dict
+import sys
+from typing import List, Dict, Iterable, Iterator, Optional
 
-from openpyxl import Workbook
-from urllib.parse import quote
 from playwright.sync_api import sync_playwright, BrowserType
 
+from excel_export import export_items_to_excel
+import endpoints
+import proxy_pool
+import cookie_pool
+from browser_request import request_json
+import adaptive_timeout
+from deadline import Deadline, unbounded
+from export_sinks import open_sink, sink_kind_for_path
+from hot_item import HotItem, make_item, iter_normalize_records
+
 
 def parse_cookie_string(cookie_str: str, domain: str) -> List[Dict]:
     cookies = []
@@ -28,140 +36,168 @@ def parse_cookie_string(cookie_str: str, domain: str) -> List[Dict]:
     return cookies
 
 
-def save_to_excel(items: List[Dict], path: str = "weibo_hot_top30.xlsx") -> str:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Top30"
-    ws.append(["排名", "标题", "链接", "渠道", "抓取时间"])
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for it in items:
-        ws.append([
-            it.get("rank"),
-            it.get("title"),
-            it.get("link"),
-            it.get("channel") or "微博",
-            ts,
-        ])
-    ws.freeze_panes = "A2"
-    dims = {}
-    for row in ws.rows:
-        for cell in row:
-            if cell.value:
-                dims[cell.column_letter] = max(dims.get(cell.column_letter, 0), len(str(cell.value)))
-    for col, width in dims.items():
-        ws.column_dimensions[col].width = min(width * 1.2, 80)
-    wb.save(path)
+def save_to_excel(items: Iterable[Dict], path: str = "weibo_hot_top30.xlsx", sheet_per_channel: bool = False) -> str:
+    """保存为 Excel（流式写出，items 可为迭代器）。"""
+    export_items_to_excel(items, path, sheet_per_channel=sheet_per_channel)
     return path
 
 
-def fetch_top_via_dom(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        ua = (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/129.0 Safari/537.36"
-        )
-        context = browser.new_context(
-            locale="zh-CN",
-            viewport={"width": 1280, "height": 800},
-            user_agent=ua,
-        )
-
-        cookie_str = os.environ.get("WEIBO_COOKIE")
-        if cookie_str:
-            # 注入到两域名，提升访问成功率
-            cookies = []
-            cookies.extend(parse_cookie_string(cookie_str, ".weibo.com"))
-            cookies.extend(parse_cookie_string(cookie_str, ".s.weibo.com"))
-            if cookies:
-                context.add_cookies(cookies)
-
-        page = context.new_page()
-        page.goto("https://s.weibo.com/top/summary?cate=realtimehot", wait_until="domcontentloaded")
-        page.wait_for_selector("#pl_top_realtimehot table tbody tr", timeout=8000)
-
-        rows = page.locator("#pl_top_realtimehot table tbody tr")
-        count = rows.count()
-        items: List[Dict] = []
-        for i in range(count):
-            tr = rows.nth(i)
-            tds = tr.locator("td")
-            if tds.count() < 3:
-                continue
-            rank_text = tds.nth(0).inner_text().strip()
-            # 跳过非数字排名（如置顶/标题行）
-            if not rank_text.isdigit():
-                continue
-            title_link = tds.nth(1).locator("a")
-            if title_link.count() == 0:
-                continue
-            title = title_link.inner_text().strip()
-            href = title_link.get_attribute("href") or ""
-            if href.startswith("//"):
-                link = "https:" + href
-            else:
-                link = href if href.startswith("http") else f"https://s.weibo.com{href}"
-            items.append({
-                "rank": int(rank_text),
-                "title": title,
-                "link": link,
-            })
-            if len(items) >= limit:
-                break
-
-        context.close()
-        return items
-
-
-def fetch_top_via_api(browser_type: BrowserType, headless: bool = True, limit: int = 30) -> List[Dict]:
-    proxy_url = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    proxy = {"server": proxy_url} if proxy_url else None
-
-    with browser_type.launch(headless=headless, proxy=proxy) as browser:
-        context = browser.new_context()
-        cookie_str = os.environ.get("WEIBO_COOKIE")
-        if cookie_str:
-            cookies = parse_cookie_string(cookie_str, ".weibo.com")
-            if cookies:
-                context.add_cookies(cookies)
-        # 用页面的 fetch 在浏览器环境内请求，继承上下文 Cookie
-        page = context.new_page()
-        page.goto("https://weibo.com", wait_until="domcontentloaded")
-        js = """
-        (async () => {
-          try {
-            const res = await fetch('https://weibo.com/ajax/side/hotSearch', {
-              headers: { 'Accept': 'application/json' }
-            });
-            if(!res.ok) return null;
-            return await res.json();
-          } catch(e){ return null }
-        })();
-        """
-        data = page.evaluate(js)
-        context.close()
-        results: List[Dict] = []
-        if not data or "realtime" not in data:
-            return results
-        for item in data.get("realtime", []):
-            if item.get("is_ad"):
-                continue
-            word = item.get("word") or ""
-            if not word:
-                continue
-            rank = item.get("rank")
-            link = f"https://s.weibo.com/weibo?q={quote(word)}"
-            results.append({
-                "rank": rank if rank else len(results) + 1,
-                "title": word,
-                "link": link,
-            })
-            if len(results) >= limit:
-                break
-        return results
+def iter_top_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
+    """逐行解析热搜页面，每解析出一条即产出。各步骤超时受 deadline 剩余预算约束。"""
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("微博")
+    cookie = cookie_pool.acquire()
+
+    with lease:
+        with adaptive_timeout.step("微博", "dom", "launch", lease.name, 30, deadline) as t:
+            browser = browser_type.launch(headless=headless, proxy=lease.playwright, timeout=t.timeout_ms)
+        with browser:
+            ua = (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/129.0 Safari/537.36"
+            )
+            context = browser.new_context(
+                locale="zh-CN",
+                viewport={"width": 1280, "height": 800},
+                user_agent=ua,
+            )
+
+            if cookie:
+                # 注入到两域名，提升访问成功率
+                cookies = []
+                cookies.extend(parse_cookie_string(cookie.cookie, ".weibo.com"))
+                cookies.extend(parse_cookie_string(cookie.cookie, ".s.weibo.com"))
+                if cookies:
+                    context.add_cookies(cookies)
+
+            page = context.new_page()
+            try:
+                with adaptive_timeout.step("微博", "dom", "goto", lease.name, 30, deadline) as t:
+                    page.goto(
+                        endpoints.url("weibo_s", "/top/summary?cate=realtimehot"),
+                        wait_until="domcontentloaded",
+                        timeout=t.timeout_ms,
+                    )
+                with adaptive_timeout.step("微博", "dom", "wait_for_selector", lease.name, 8, deadline) as t:
+                    page.wait_for_selector("#pl_top_realtimehot table tbody tr", timeout=t.timeout_ms)
+            except Exception as e:
+                if cookie:
+                    # 等不到热搜表格且停在登录页：问题在 Cookie 而不是网络
+                    if cookie_pool.is_login_url(page.url):
+                        cookie.bench("跳转到登录页")
+                    else:
+                        cookie.fail(str(e))
+                raise
+            lease.ok()
+            if cookie:
+                cookie.ok()
+
+            rows = page.locator("#pl_top_realtimehot table tbody tr")
+            count = rows.count()
+            n = 0
+            for i in range(count):
+                deadline.check("解析热搜表格")
+                tr = rows.nth(i)
+                tds = tr.locator("td")
+                if tds.count() < 3:
+                    continue
+                rank_text = tds.nth(0).inner_text().strip()
+                # 跳过非数字排名（如置顶/标题行）
+                if not rank_text.isdigit():
+                    continue
+                title_link = tds.nth(1).locator("a")
+                if title_link.count() == 0:
+                    continue
+                title = title_link.inner_text().strip()
+                href = title_link.get_attribute("href") or ""
+                if href.startswith("//"):
+                    link = "https:" + href
+                else:
+                    link = href if href.startswith("http") else f"https://s.weibo.com{href}"
+                yield make_item("微博", int(rank_text), title, link, "dom")
+                n += 1
+                if n >= limit:
+                    break
+
+            context.close()
+
+
+def fetch_top_via_dom(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_top_via_dom(browser_type, headless, limit, deadline))
+
+
+def iter_top_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> Iterator[HotItem]:
+    """
+    优先经浏览器上下文的请求接口获取热搜 JSON，失败时回退到页面内 fetch；
+    接口整体返回后关闭浏览器，再逐条标准化产出。各步骤超时受 deadline 剩余预算约束。
+    """
+    deadline = deadline or unbounded()
+    lease = proxy_pool.acquire("微博")
+    cookie = cookie_pool.acquire()
+
+    with lease:
+        with adaptive_timeout.step("微博", "api", "launch", lease.name, 30, deadline) as t:
+            browser = browser_type.launch(headless=headless, proxy=lease.playwright, timeout=t.timeout_ms)
+        with browser:
+            context = browser.new_context()
+            if cookie:
+                cookies = parse_cookie_string(cookie.cookie, ".weibo.com")
+                if cookies:
+                    context.add_cookies(cookies)
+            api_url = endpoints.url("weibo", "/ajax/side/hotSearch")
+            # 先经上下文的请求接口直接取 JSON（共享 Cookie 与代理，不创建页面）
+            data = request_json(
+                context, api_url, "微博", "api",
+                headers={"Referer": endpoints.url("weibo", "/")},
+                proxy=lease.name,
+                deadline=deadline,
+            )
+            if not isinstance(data, dict) or "realtime" not in data:
+                # 回退：打开首页获取访客 Cookie 后用页面的 fetch 请求
+                page = context.new_page()
+                with adaptive_timeout.step("微博", "api", "goto", lease.name, 30, deadline) as t:
+                    page.goto(endpoints.url("weibo"), wait_until="domcontentloaded", timeout=t.timeout_ms)
+                # 页面内 fetch 没有 Playwright 超时，用 AbortController 按剩余预算中止
+                js = """
+                async ([url, timeoutMs]) => {
+                  const ctl = new AbortController();
+                  const timer = setTimeout(() => ctl.abort(), timeoutMs);
+                  try {
+                    const res = await fetch(url, {
+                      headers: { 'Accept': 'application/json' },
+                      signal: ctl.signal
+                    });
+                    if(!res.ok) return null;
+                    return await res.json();
+                  } catch(e){ return null }
+                  finally { clearTimeout(timer) }
+                }
+                """
+                with adaptive_timeout.step("微博", "api", "evaluate", lease.name, 10, deadline) as t:
+                    data = page.evaluate(js, [api_url, t.timeout_ms])
+            context.close()
+        if cookie:
+            cookie_pool.report_hot_search(cookie, data)
+        # 只有请求本身失败（网络错误或非 2xx，两种取法都返回 None）才记为代理失败；
+        # 接口正常返回但 realtime 为空多半是 Cookie 或登录问题，已由 report_hot_search 冷却 Cookie
+        if data is None:
+            lease.fail("热搜接口请求失败")
+    if not data or "realtime" not in data:
+        return
+    yield from iter_normalize_records("微博", data.get("realtime", []), "api", limit)
+
+
+def fetch_top_via_api(
+    browser_type: BrowserType, headless: bool = True, limit: int = 30, deadline: Optional[Deadline] = None
+) -> List[HotItem]:
+    return list(iter_top_via_api(browser_type, headless, limit, deadline))
 
 
 def main() -> int:
@@ -176,8 +212,11 @@ def main() -> int:
         if not items:
             print("未获取到热搜数据，可能需要登录或网络受限。")
             return 1
-        out = save_to_excel(items)
-        print(out)
+        # 可通过命令行参数指定输出文件，格式由扩展名决定（.xlsx/.csv/.jsonl/.hotarc）
+        out = sys.argv[1] if len(sys.argv) > 1 else "weibo_hot_top30.xlsx"
+        with open_sink(sink_kind_for_path(out), out) as sink:
+            sink.write_many(items)
+        print(f"{sink.path}（{sink.summary()}）")
         return 0
 
 